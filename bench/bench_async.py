@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Compare the sync and async read paths under many concurrent clients.
+
+Seeds a throwaway database, then starts uvicorn twice (ASYNC_DB=0 and
+ASYNC_DB=1) and hammers the hot read endpoints with N concurrent
+clients, reporting throughput and latency percentiles for each mode.
+
+    python bench/bench_async.py --clients 500 --requests 10000
+    DATABASE_URL=postgresql+psycopg2://... python bench/bench_async.py
+
+Needs httpx, plus aiosqlite or asyncpg for the async run.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(env: dict, port: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+        # The sync run logs a traceback for every pool timeout
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline and process.poll() is None:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+def _seed(base_url: str, plans: int, tasks: int) -> list[int]:
+    plan_ids = []
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        for n in range(plans):
+            plan_id = client.post("/plans/", json={"name": f"Bench plan {n}"}).json()["id"]
+            phase = client.post(f"/plans/{plan_id}/phases", json={"name": "Shape", "sequence": 1}).json()
+            for i in range(tasks):
+                task = client.post(f"/plans/{plan_id}/tasks", json={"name": f"Task {i}"}).json()
+                client.post(
+                    f"/plans/{plan_id}/ttl",
+                    json={
+                        "task_id": task["id"],
+                        "phase_id": phase["id"],
+                        "coa_id": None,
+                        "area_id": None,
+                        "start_offset_hours": i,
+                        "end_offset_hours": i + 4,
+                    },
+                )
+            plan_ids.append(plan_id)
+    return plan_ids
+
+
+async def _load(base_url: str, plan_ids: list[int], clients: int, total: int, deadline: float) -> dict:
+    paths = [p for plan_id in plan_ids for p in (f"/plans/{plan_id}", f"/plans/{plan_id}/ttl", f"/plans/{plan_id}/tasks")]
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+
+        async def worker() -> None:
+            nonlocal errors
+            for n in counter:
+                if time.perf_counter() - load_started > deadline:
+                    return
+                started = time.perf_counter()
+                try:
+                    response = await client.get(paths[n % len(paths)])
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        load_started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - load_started
+
+    latencies.sort()
+    return {
+        "completed": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--plans", type=int, default=5)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--deadline", type=float, default=120, help="stop issuing requests after this many seconds")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=str(ROOT), AUDIT_RETENTION_DAYS="0", AUTO_MIGRATE="1")
+    tmpdir = tempfile.TemporaryDirectory()
+    if "DATABASE_URL" not in env:
+        env["DATABASE_URL"] = f"sqlite:///{tmpdir.name}/bench.db"
+
+    plan_ids = None
+    for mode in ("0", "1"):
+        port = _free_port()
+        server = _start_server(dict(env, ASYNC_DB=mode), port)
+        base_url = f"http://127.0.0.1:{port}/api"
+        try:
+            if plan_ids is None:
+                plan_ids = _seed(base_url, args.plans, args.tasks)
+            result = asyncio.run(_load(base_url, plan_ids, args.clients, args.requests, args.deadline))
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()  # requests stuck on the pool block graceful shutdown
+                server.wait()
+        label = "async" if mode == "1" else "sync "
+        print(
+            f"{label}  clients={args.clients}  done={result['completed']:6d}  {result['rps']:8.1f} req/s  "
+            f"p50={result['p50_ms']:7.1f} ms  p99={result['p99_ms']:7.1f} ms  errors={result['errors']}"
+        )
+    tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Time large list responses on the old and new serialization paths.
+
+Seeds one plan with N TTL rows in a throwaway SQLite database, then calls
+GET /plans/{id}/ttl through the app in-process:
+
+- old: the route as it was, with ``model_validate`` per row, then FastAPI
+  re-validating against ``response_model`` and encoding with the stdlib
+  JSON encoder. It is mounted on a copy of the app for comparison.
+- json: ``list_response``, which validates once and encodes with pydantic-core.
+- ndjson: the same route with ``Accept: application/x-ndjson``.
+
+It checks all three return the same rows. It then reports the median
+time of each path, with the serialization stage timed on its own as well.
+
+    python bench/bench_serialization.py --rows 50000 --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{tmpdir.name}/bench.db",
+        AUTO_MIGRATE="1",
+        AUDIT_RETENTION_DAYS="0",
+        AUDIT_CHANGES="0",
+    )
+    sys.path.insert(0, str(ROOT))
+
+    from fastapi import Depends, FastAPI, Request
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert
+    from sqlmodel import Session
+
+    from server.api.responses import list_response
+    from server.db.base import engine, get_session, init_db
+    from server.db.models import TTL, Plan, Task
+    from server.domain import schemas
+    from server.domain.services.plan_service import PlanningService
+    from server.main import app
+
+    init_db()
+    with Session(engine) as session:
+        plan = Plan(name="Serialization bench")
+        session.add(plan)
+        session.commit()
+        tasks = [Task(plan_id=plan.id, name=f"Task {i}") for i in range(100)]
+        session.add_all(tasks)
+        session.commit()
+        session.execute(
+            insert(TTL),
+            [
+                {
+                    "plan_id": plan.id,
+                    "task_id": tasks[i % len(tasks)].id,
+                    "start_offset_hours": i % 96,
+                    "end_offset_hours": i % 96 + 4,
+                    "relative_to": "D-Day",
+                    "status": "PLANNED",
+                }
+                for i in range(args.rows)
+            ],
+        )
+        session.commit()
+        plan_id = plan.id
+
+    old_app = FastAPI()
+
+    @old_app.get("/api/plans/{plan_id}/ttl", response_model=list[schemas.TTLRead])
+    def list_ttl_old(plan_id: int, session: Session = Depends(get_session)):
+        return [schemas.TTLRead.model_validate(ttl) for ttl in PlanningService(session).list_ttl_for_plan(plan_id)]
+
+    path = f"/api/plans/{plan_id}/ttl"
+    cases = {
+        "old": (TestClient(old_app), {}),
+        "json": (TestClient(app), {}),
+        "ndjson": (TestClient(app), {"Accept": "application/x-ndjson"}),
+    }
+
+    bodies = {}
+    for name, (client, headers) in cases.items():
+        response = client.get(path, headers=headers)
+        response.raise_for_status()
+        if name == "ndjson":
+            bodies[name] = [json.loads(line) for line in response.text.splitlines()]
+        else:
+            bodies[name] = response.json()
+    assert bodies["old"] == bodies["json"] == bodies["ndjson"], "serialization paths disagree"
+    assert len(bodies["old"]) == args.rows
+
+    # The database read is common to every path; time it on its own
+    with Session(engine) as session:
+        started = time.perf_counter()
+        PlanningService(session).list_ttl_for_plan(plan_id)
+        query_ms = (time.perf_counter() - started) * 1000
+
+    # Serialization alone, on rows already loaded: FastAPI's own
+    # response handling for the old route against list_response
+    old_route = next(route for route in old_app.routes if getattr(route, "name", None) == "list_ttl_old")
+    request = Request({"type": "http", "method": "GET", "headers": []})
+    with Session(engine) as session:
+        rows = PlanningService(session).list_ttl_for_plan(plan_id)
+
+        async def old_serialize() -> bytes:
+            content = await serialize_response(
+                field=old_route.response_field, response_content=[schemas.TTLRead.model_validate(row) for row in rows]
+            )
+            return JSONResponse(content).body
+
+        stages = {}
+        for name, run in (
+            ("old", lambda: asyncio.run(old_serialize())),
+            ("json", lambda: list_response(request, schemas.TTLRead, rows).body),
+        ):
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - started)
+            stages[name] = statistics.median(timings) * 1000
+
+    results = {}
+    for name, (client, headers) in cases.items():
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            client.get(path, headers=headers).read()
+            timings.append(time.perf_counter() - started)
+        results[name] = statistics.median(timings) * 1000
+
+    print(f"rows={args.rows}  query alone={query_ms:7.1f} ms")
+    print("serialization only:")
+    for name, elapsed in stages.items():
+        print(f"  {name:7s} {elapsed:8.1f} ms  ({stages['old'] / elapsed:4.1f}x)")
+    print("full request:")
+    for name, elapsed in results.items():
+        print(f"  {name:7s} {elapsed:8.1f} ms  ({results['old'] / elapsed:4.1f}x)")
+    tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
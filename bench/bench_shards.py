@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Writers on other plans while one plan takes a heavy import.
+
+Runs the same workload against one SQLite file and against per-plan
+shards (``STORAGE_MODE=sharded``), each in a fresh process:
+
+- importer: bulk-inserts tasks into plan 1 in large transactions, the way
+  a seed or TTR import does.
+- writers: one thread per other plan, each committing one task at a time.
+
+Reports writer commits/s and commit latency percentiles, plus the
+importer's rows/s. With one file every writer queues behind the import's
+write lock. With shards only the importer's own plan is locked.
+
+    python bench/bench_shards.py --writers 8 --seconds 10
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def run(args: argparse.Namespace) -> dict:
+    sys.path.insert(0, str(ROOT))
+    from sqlalchemy import insert
+    from sqlmodel import Session
+
+    from server.db.base import engine, init_db, session_scope
+    from server.db.models import Plan, Task
+
+    init_db()
+    with Session(engine) as session:
+        plans = [Plan(name=f"Shard bench {i}") for i in range(args.writers + 1)]
+        session.add_all(plans)
+        session.commit()
+        plan_ids = [plan.id for plan in plans]
+
+    stop = threading.Event()
+    latencies: list[float] = []
+    imported = 0
+    errors = 0
+    lock = threading.Lock()
+
+    def importer(plan_id: int) -> None:
+        nonlocal imported, errors
+        while not stop.is_set():
+            try:
+                with session_scope(plan_id) as session:
+                    for start in range(0, args.import_rows, 1000):
+                        rows = [{"plan_id": plan_id, "name": f"Imported {start + i}"} for i in range(1000)]
+                        session.execute(insert(Task), rows)
+                    session.commit()
+                imported += args.import_rows
+            except Exception:  # noqa: BLE001 - counted, the run goes on
+                with lock:
+                    errors += 1
+
+    def writer(plan_id: int) -> None:
+        nonlocal errors
+        count = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with session_scope(plan_id) as session:
+                    session.add(Task(plan_id=plan_id, name=f"Task {count}"))
+                    session.commit()
+            except Exception:  # noqa: BLE001 - counted, the run goes on
+                with lock:
+                    errors += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+            count += 1
+
+    threads = [threading.Thread(target=importer, args=(plan_ids[0],))]
+    threads += [threading.Thread(target=writer, args=(plan_id,)) for plan_id in plan_ids[1:]]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        "commits_per_s": len(latencies) / args.seconds,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000 if latencies else 0.0,
+        "import_rows_per_s": imported / args.seconds,
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8, help="plans written besides the imported one")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--import-rows", type=int, default=20000, help="rows per import transaction")
+    parser.add_argument("--mode", choices=["single", "sharded"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run(args)))
+        return
+
+    results = {}
+    for mode in ("single", "sharded"):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            env = dict(
+                os.environ,
+                STORAGE_MODE=mode,
+                SHARD_DIR=f"{tmpdir}/shards",
+                DATABASE_URL=f"sqlite:///{tmpdir}/bench.db",
+                AUTO_MIGRATE="1",
+                AUDIT_RETENTION_DAYS="0",
+                AUDIT_CHANGES="0",
+                # Long enough that queued writers wait rather than fail
+                SQLITE_BUSY_TIMEOUT_MS="60000",
+            )
+            command = [sys.executable, __file__, "--mode", mode, "--writers", str(args.writers),
+                       "--seconds", str(args.seconds), "--import-rows", str(args.import_rows)]
+            output = subprocess.run(command, env=env, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"writers={args.writers}  import={args.import_rows} rows/txn  {args.seconds:.0f}s each")
+    for mode, result in results.items():
+        print(
+            f"  {mode:8s} {result['commits_per_s']:8.1f} commits/s  p50={result['p50_ms']:7.1f} ms  "
+            f"p99={result['p99_ms']:7.1f} ms  import={result['import_rows_per_s']:8.0f} rows/s  errors={result['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Cold start of a uvicorn worker, from process launch to ready.
+
+Starts the app in a fresh process against an already-migrated SQLite
+database, the way a worker restart does. It polls the health endpoints
+every few milliseconds and records:
+
+- import: ``import server.main`` on its own, in a separate interpreter.
+- live: launch until ``/health/live`` answers.
+- ready: launch until ``/health/ready`` answers 200, with the warm-up done.
+- first request: the latency of ``GET /api/plans/`` once ready.
+
+Each figure is the median over ``--repeat`` launches.
+
+    python bench/bench_startup.py --repeat 5
+
+Needs httpx.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url: str, deadline: float, process: subprocess.Popen) -> float:
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited during start-up")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"{url} did not answer in time")
+
+
+def _launch(env: dict) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + 60
+        live = _wait_for(f"{base}/health/live", deadline, process)
+        ready = _wait_for(f"{base}/health/ready", deadline, process)
+        request_started = time.perf_counter()
+        httpx.get(f"{base}/api/plans/").raise_for_status()
+        first = time.perf_counter() - request_started
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return {"live": live - started, "ready": ready - started, "first_request": first}
+
+
+def _import_time(env: dict) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import server.main"], cwd=ROOT, env=env, check=True, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--plans", type=int, default=50, help="plans in the database")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = dict(
+            os.environ,
+            PYTHONPATH=str(ROOT),
+            DATABASE_URL=f"sqlite:///{tmpdir}/bench.db",
+            AUDIT_RETENTION_DAYS="0",
+        )
+        # Migrate and seed once, as a deploy would before workers start
+        subprocess.run([sys.executable, "-m", "server.db.migrations", "upgrade"], cwd=ROOT, env=env, check=True, capture_output=True)
+        seed = (
+            "from sqlmodel import Session\n"
+            "from server.db.base import engine\n"
+            "from server.db.models import Plan\n"
+            "with Session(engine) as session:\n"
+            f"    session.add_all([Plan(name=f'Plan {{i}}') for i in range({args.plans})])\n"
+            "    session.commit()\n"
+        )
+        subprocess.run([sys.executable, "-c", seed], cwd=ROOT, env=env, check=True, capture_output=True)
+
+        imports = [_import_time(env) for _ in range(args.repeat)]
+        launches = [_launch(env) for _ in range(args.repeat)]
+
+    def median_ms(values) -> float:
+        return statistics.median(values) * 1000
+
+    print(f"repeat={args.repeat}  (median)")
+    print(f"  import server.main  {median_ms(imports):8.1f} ms")
+    print(f"  live                {median_ms([run['live'] for run in launches]):8.1f} ms")
+    print(f"  ready               {median_ms([run['ready'] for run in launches]):8.1f} ms")
+    print(f"  first request       {median_ms([run['first_request'] for run in launches]):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
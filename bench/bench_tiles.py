@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Serve a synthetic offline basemap from the app and pan across it.
+
+Writes an .mbtiles file with gzipped tiles of realistic size over the
+Zurich area, points TILESERVER_CONFIG at it and starts uvicorn. Each
+client then pans a 6x4 tile viewport across the map, zooming in and out,
+requesting every visible tile the way MapLibre does. Reports throughput,
+latency percentiles and the server's tile cache hit rate.
+
+    python bench/bench_tiles.py --clients 20 --steps 200
+
+Needs httpx.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import json
+import math
+import os
+import random
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+CENTER = (8.54, 47.37)
+MIN_ZOOM, MAX_ZOOM = 8, 14
+VIEWPORT = (6, 4)
+
+
+def _tile_of(lon: float, lat: float, z: int) -> tuple[int, int]:
+    n = 2**z
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return x, y
+
+
+def _write_mbtiles(path: Path, span: int, tile_kb: int) -> int:
+    """Tiles for ``span`` tiles around the centre at every zoom."""
+    rng = random.Random(1)
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+    connection.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
+    connection.execute("CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)")
+    metadata = {"name": "bench", "format": "pbf", "minzoom": MIN_ZOOM, "maxzoom": MAX_ZOOM, "json": json.dumps({"vector_layers": []})}
+    connection.executemany("INSERT INTO metadata VALUES (?, ?)", [(k, str(v)) for k, v in metadata.items()])
+    count = 0
+    for z in range(MIN_ZOOM, MAX_ZOOM + 1):
+        cx, cy = _tile_of(*CENTER, z)
+        rows = []
+        for x in range(cx - span, cx + span + 1):
+            for y in range(cy - span, cy + span + 1):
+                # Half random, half repetitive: compresses like a vector tile
+                body = rng.randbytes(tile_kb * 512) + bytes(tile_kb * 512)
+                rows.append((z, x, (1 << z) - 1 - y, gzip.compress(body)))
+        connection.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)", rows)
+        count += len(rows)
+    connection.commit()
+    connection.close()
+    return count
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(env: dict, port: int, workers: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline and process.poll() is None:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+def _pan(seed: int, steps: int, span: int) -> list[str]:
+    """Tile paths requested while panning and zooming around the centre."""
+    rng = random.Random(seed)
+    z = rng.randint(MIN_ZOOM + 2, MAX_ZOOM)
+    x, y = _tile_of(*CENTER, z)
+    paths = []
+    for _ in range(steps):
+        move = rng.random()
+        if move < 0.1 and z < MAX_ZOOM:
+            z, x, y = z + 1, x * 2, y * 2
+        elif move < 0.2 and z > MIN_ZOOM:
+            z, x, y = z - 1, x // 2, y // 2
+        else:
+            x += rng.choice((-1, 0, 1))
+            y += rng.choice((-1, 0, 1))
+        cx, cy = _tile_of(*CENTER, z)
+        limit = min(span, 2 ** (z - MIN_ZOOM) * 2)
+        x = max(cx - limit, min(cx + limit, x))
+        y = max(cy - limit, min(cy + limit, y))
+        for dx in range(VIEWPORT[0]):
+            for dy in range(VIEWPORT[1]):
+                paths.append(f"/tiles/bench/{z}/{x + dx - VIEWPORT[0] // 2}/{y + dy - VIEWPORT[1] // 2}.pbf")
+    return paths
+
+
+async def _load(base_url: str, clients: int, steps: int, span: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=clients * 6, max_keepalive_connections=clients * 6)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+
+        async def fetch(path: str) -> None:
+            nonlocal errors
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code not in (200, 204):
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+        async def user(seed: int) -> None:
+            paths = _pan(seed, steps, span)
+            per_view = VIEWPORT[0] * VIEWPORT[1]
+            # Browsers fetch a viewport's tiles over ~6 parallel connections
+            for start in range(0, len(paths), per_view):
+                view = paths[start : start + per_view]
+                for chunk in range(0, len(view), 6):
+                    await asyncio.gather(*(fetch(path) for path in view[chunk : chunk + 6]))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(seed) for seed in range(clients)))
+        elapsed = time.perf_counter() - started
+        stats = (await client.get("/tiles/stats")).json()
+
+    latencies.sort()
+    return {
+        "completed": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+        "stats": stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--steps", type=int, default=200, help="viewport moves per client")
+    parser.add_argument("--span", type=int, default=24, help="tiles each side of the centre in the file")
+    parser.add_argument("--tile-kb", type=int, default=40, help="uncompressed tile size")
+    parser.add_argument("--cache-mb", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tiles = _write_mbtiles(Path(tmpdir) / "bench.mbtiles", args.span, args.tile_kb)
+        config = Path(tmpdir) / "tileserver.json"
+        config.write_text(json.dumps({"tilesets": [{"id": "bench", "type": "baselayer", "mbtiles": "bench.mbtiles"}]}))
+        env = dict(
+            os.environ,
+            PYTHONPATH=str(ROOT),
+            AUDIT_RETENTION_DAYS="0",
+            AUTO_MIGRATE="1",
+            DATABASE_URL=f"sqlite:///{tmpdir}/bench.db",
+            TILESERVER_CONFIG=str(config),
+            MBTILES_CACHE_MB=str(args.cache_mb),
+        )
+        port = _free_port()
+        server = _start_server(env, port, args.workers)
+        try:
+            result = asyncio.run(_load(f"http://127.0.0.1:{port}/api", args.clients, args.steps, args.span))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    stats = result["stats"]
+    lookups = stats["hits"] + stats["misses"]
+    print(
+        f"tiles in file={tiles}  clients={args.clients}  done={result['completed']:6d}  {result['rps']:8.1f} req/s  "
+        f"p50={result['p50_ms']:6.1f} ms  p99={result['p99_ms']:6.1f} ms  errors={result['errors']}  "
+        f"cache hit={stats['hits'] / max(lookups, 1):.0%} ({stats['bytes'] / 1e6:.1f} MB)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+#!/bin/bash
+# Runs once, when the primary's data volume is initialised: lets the
+# replica profile's standby stream WAL from it.
+set -e
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-EOSQL
+	CREATE ROLE replicator WITH REPLICATION LOGIN PASSWORD 'replicator';
+EOSQL
+echo "host replication replicator all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,11 @@
+#!/bin/bash
+# Hot standby of the compose "db" service: cloned with pg_basebackup on
+# first start, then kept up to date by streaming replication.
+set -e
+export PGDATA=/var/lib/postgresql/data
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+  until pg_isready -h db -U replicator; do sleep 1; done
+  PGPASSWORD=replicator pg_basebackup -h db -U replicator -D "$PGDATA" -R -X stream
+  chmod 700 "$PGDATA"
+fi
+exec postgres -D "$PGDATA" -c hot_standby=on
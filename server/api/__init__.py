@@ -1,2 +1,2 @@
-from . import planning, forces, ttr, exports, audit, factors  # noqa: F401
+from . import planning, forces, ttr, exports, audit, factors, seed  # noqa: F401
 
@@ -0,0 +1,111 @@
+"""Async versions of the hot read endpoints.
+
+Mounted ahead of the sync routers when ``ASYNC_DB`` is enabled, so these
+paths are served from the async engine while every other route is
+unchanged. Response shapes match the sync routes exactly.
+"""
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from server.api.responses import list_response
+from server.db.async_base import get_async_session
+from server.domain import schemas
+from server.domain.services.async_read_service import AsyncPlanningReadService
+
+router = APIRouter(tags=["Async reads"])
+
+_DETAIL_SCHEMAS = {
+    "phases": schemas.PhaseRead,
+    "coas": schemas.COARead,
+    "tasks": schemas.TaskRead,
+    "ttl": schemas.TTLRead,
+    "risks": schemas.RiskRead,
+    "decisive_conditions": schemas.DecisiveConditionRead,
+    "decision_points": schemas.DecisionPointRead,
+    "constraints": schemas.ConstraintRead,
+    "assumptions": schemas.AssumptionRead,
+    "ccirs": schemas.CCIRRead,
+}
+
+
+def _service(session: AsyncSession) -> AsyncPlanningReadService:
+    return AsyncPlanningReadService(session)
+
+
+@router.get("/plans/", response_model=list[schemas.PlanRead])
+async def list_plans(request: Request, session: AsyncSession = Depends(get_async_session)):
+    return list_response(request, schemas.PlanRead, await _service(session).list_plans())
+
+
+@router.get("/plans/{plan_id}")
+async def get_plan(plan_id: int, session: AsyncSession = Depends(get_async_session)):
+    service = _service(session)
+    try:
+        plan = await service.get_plan(plan_id)
+        sections = await service.get_plan_detail(plan_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    detail = {"plan": schemas.PlanRead.model_validate(plan)}
+    for name, rows in sections.items():
+        detail[name] = [_DETAIL_SCHEMAS[name].model_validate(row) for row in rows]
+    return detail
+
+
+@router.get("/plans/{plan_id}/phases", response_model=list[schemas.PhaseRead])
+async def list_phases(plan_id: int, session: AsyncSession = Depends(get_async_session)):
+    try:
+        phases = await _service(session).list_phases(plan_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return [schemas.PhaseRead.model_validate(phase) for phase in phases]
+
+
+@router.get("/plans/{plan_id}/coas", response_model=list[schemas.COARead])
+async def list_coas(plan_id: int, session: AsyncSession = Depends(get_async_session)):
+    try:
+        coas = await _service(session).list_coas(plan_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return [schemas.COARead.model_validate(coa) for coa in coas]
+
+
+@router.get("/plans/{plan_id}/tasks", response_model=list[schemas.TaskRead])
+async def list_tasks(plan_id: int, request: Request, session: AsyncSession = Depends(get_async_session)):
+    try:
+        tasks = await _service(session).list_tasks(plan_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return list_response(request, schemas.TaskRead, tasks)
+
+
+@router.get("/plans/{plan_id}/ttl", response_model=list[schemas.TTLRead])
+async def list_ttl(plan_id: int, request: Request, session: AsyncSession = Depends(get_async_session)):
+    try:
+        ttl_items = await _service(session).list_ttl(plan_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return list_response(request, schemas.TTLRead, ttl_items)
+
+
+@router.get("/plans/ttl/{ttl_id}", response_model=schemas.TTLRead)
+async def get_ttl(ttl_id: int, session: AsyncSession = Depends(get_async_session)):
+    try:
+        ttl = await _service(session).get_ttl(ttl_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return schemas.TTLRead.model_validate(ttl)
+
+
+@router.get("/factors", response_model=list[schemas.FactorRead])
+@router.get("/factors/", response_model=list[schemas.FactorRead])
+async def list_factors(
+    request: Request, plan_id: int | None = Query(default=None), session: AsyncSession = Depends(get_async_session)
+):
+    return list_response(request, schemas.FactorRead, await _service(session).list_factors(plan_id=plan_id))
+
+
+@router.get("/decisions", response_model=list[schemas.DecisionRead])
+async def list_decisions(request: Request, plan_id: int | None = None, session: AsyncSession = Depends(get_async_session)):
+    return list_response(request, schemas.DecisionRead, await _service(session).list_decisions(plan_id=plan_id))
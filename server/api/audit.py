@@ -1,11 +1,16 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
+from datetime import datetime
 
-from server.db.base import get_session
-from server.db.models import AuditLog
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlmodel import Session
+
+from server.api.responses import list_response
+from server.db.base import get_catalogue_session, get_session, require_plan_id
 from server.domain import schemas
+from server.domain.services.audit_archive import get_audit_archive, get_audit_retention
+from server.domain.services.audit_service import AUDIT_MAX_PAGE_SIZE, AUDIT_PAGE_SIZE, AuditService
+from server.domain.services.audit_writer import get_audit_writer
 from server.domain.services.decision_service import DecisionService
 
 router = APIRouter(tags=["Decisions & Audit"])
@@ -15,20 +20,52 @@ def _decision_service(session: Session) -> DecisionService:
     return DecisionService(session)
 
 
-@router.post("/decisions", response_model=schemas.DecisionRead)
+@router.post("/decisions", response_model=schemas.DecisionRead, dependencies=[Depends(require_plan_id)])
 def create_decision(payload: schemas.DecisionCreate, session: Session = Depends(get_session)):
     service = _decision_service(session)
     decision = service.create_decision(payload)
     return schemas.DecisionRead.model_validate(decision)
 
 
-@router.get("/decisions", response_model=list[schemas.DecisionRead])
-def list_decisions(plan_id: int | None = None, session: Session = Depends(get_session)):
+@router.get("/decisions", response_model=list[schemas.DecisionRead], dependencies=[Depends(require_plan_id)])
+def list_decisions(request: Request, plan_id: int | None = None, session: Session = Depends(get_session)):
     service = _decision_service(session)
-    decisions = service.list_decisions(plan_id=plan_id)
-    return [schemas.DecisionRead.model_validate(decision) for decision in decisions]
+    return list_response(request, schemas.DecisionRead, service.list_decisions(plan_id=plan_id))
+
+
+@router.get("/audit/logs", response_model=schemas.AuditLogPage)
+def list_audit_logs(
+    plan_id: int | None = None,
+    action: str | None = None,
+    actor: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=AUDIT_PAGE_SIZE, ge=1, le=AUDIT_MAX_PAGE_SIZE),
+    include_archived: bool = True,
+    session: Session = Depends(get_catalogue_session),
+):
+    try:
+        return AuditService(session).list_logs(
+            plan_id=plan_id,
+            action=action,
+            actor=actor,
+            since=since,
+            until=until,
+            cursor=cursor,
+            limit=limit,
+            include_archived=include_archived,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.post("/audit/retention/run", response_model=schemas.AuditRetentionResult)
+def run_audit_retention(session: Session = Depends(get_catalogue_session)):
+    get_audit_writer().flush()
+    return get_audit_retention().run(session)
 
 
-@router.get("/audit/logs")
-def list_audit_logs(session: Session = Depends(get_session)):
-    return session.exec(select(AuditLog).order_by(AuditLog.created_at.desc()).limit(100)).all()
+@router.get("/audit/archive")
+def list_audit_archive():
+    return [manifest.as_dict() for manifest in get_audit_archive().segments()]
@@ -1,23 +1,111 @@
 from __future__ import annotations
 
+from typing import List
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlmodel import Session
 
-from server.db.base import get_session
+from server.db.base import get_primary_session, get_session, require_plan_id
 from server.domain import schemas
+from server.domain.rendering import FORMATS
+from server.domain.services.archive_service import ArchiveService
+from server.domain.services.export_jobs import ExportJobService, job_filename
 from server.domain.services.export_service import ExportService
 
 router = APIRouter(prefix="/exports", tags=["Exports"])
+# Everything but the archive, which names its plans in ``plan_ids``
+_PLAN_ROUTE = [Depends(require_plan_id)]
 
 
 def _service(session: Session) -> ExportService:
     return ExportService(session)
 
 
-@router.post("/conops", response_model=schemas.ConopsExportResponse)
+@router.post("/conops", response_model=schemas.ConopsExportResponse, dependencies=_PLAN_ROUTE)
 def generate_conops(payload: schemas.ConopsExportRequest, session: Session = Depends(get_session)):
     service = _service(session)
     try:
         return service.generate_conops(payload)
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
+@router.post("/conops/stream", dependencies=_PLAN_ROUTE)
+def stream_conops(payload: schemas.ConopsExportRequest, session: Session = Depends(get_session)):
+    service = _service(session)
+    try:
+        product, filename, chunks = service.start_conops_stream(payload)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Product-Id": str(product.id),
+        "X-Export-Cache": "hit" if product.content_id else "miss",
+    }
+    return StreamingResponse(chunks, media_type="text/markdown; charset=utf-8", headers=headers)
+
+
+@router.post("/archive")
+def stream_archive(payload: schemas.ArchiveRequest, session: Session = Depends(get_session)):
+    try:
+        filename, chunks = ArchiveService(session).start_archive(payload.plan_ids)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    return StreamingResponse(chunks, media_type="application/zip", headers=headers)
+
+
+@router.get("/products", response_model=List[schemas.ProductRead], dependencies=_PLAN_ROUTE)
+def list_products(plan_id: int, session: Session = Depends(get_session)):
+    return _service(session).list_products(plan_id)
+
+
+@router.get("/products/{product_id}/content", dependencies=_PLAN_ROUTE)
+def get_product_content(product_id: int, session: Session = Depends(get_session)):
+    service = _service(session)
+    try:
+        product = service.get_product(product_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return StreamingResponse(service.iter_product_content(product), media_type="text/markdown; charset=utf-8")
+
+
+@router.get("/products/{product_id}/diff/{other_id}", dependencies=_PLAN_ROUTE)
+def diff_products(product_id: int, other_id: int, session: Session = Depends(get_session)):
+    try:
+        lines = _service(session).diff_products(product_id, other_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return StreamingResponse(iter(lines), media_type="text/x-diff; charset=utf-8")
+
+
+@router.post("/jobs", response_model=schemas.ExportJobRead, status_code=202, dependencies=_PLAN_ROUTE)
+def submit_export_job(payload: schemas.ExportJobCreate, session: Session = Depends(get_session)):
+    try:
+        job = ExportJobService(session).submit(payload)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return schemas.ExportJobRead.model_validate(job)
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.ExportJobRead, dependencies=_PLAN_ROUTE)
+def get_export_job(job_id: int, session: Session = Depends(get_primary_session)):
+    try:
+        job = ExportJobService(session).get_job(job_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return schemas.ExportJobRead.model_validate(job)
+
+
+@router.get("/jobs/{job_id}/download", dependencies=_PLAN_ROUTE)
+def download_export_job(job_id: int, session: Session = Depends(get_primary_session)):
+    service = ExportJobService(session)
+    try:
+        job, path = service.get_download(job_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except LookupError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    _, media_type = FORMATS[job.format]
+    return FileResponse(path, media_type=media_type, filename=job_filename(job))
@@ -1,13 +1,14 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlmodel import Session
 
-from server.db.base import get_session
+from server.api.responses import list_response
+from server.db.base import get_session, require_plan_id
 from server.domain import schemas
 from server.domain.services.factor_service import FactorService
 
-router = APIRouter(prefix="/factors", tags=["Factor Analysis"])
+router = APIRouter(prefix="/factors", tags=["Factor Analysis"], dependencies=[Depends(require_plan_id)])
 
 
 def _service(session: Session) -> FactorService:
@@ -23,10 +24,9 @@ def create_factor(payload: schemas.FactorCreate, session: Session = Depends(get_
 
 @router.get("", response_model=list[schemas.FactorRead])
 @router.get("/", response_model=list[schemas.FactorRead])
-def list_factors(plan_id: int | None = Query(default=None), session: Session = Depends(get_session)):
+def list_factors(request: Request, plan_id: int | None = Query(default=None), session: Session = Depends(get_session)):
     service = _service(session)
-    factors = service.list_factors(plan_id=plan_id)
-    return [schemas.FactorRead.model_validate(f) for f in factors]
+    return list_response(request, schemas.FactorRead, service.list_factors(plan_id=plan_id))
 
 
 @router.get("/{factor_id}/full")
@@ -1,19 +1,17 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session
 
 from server.db.base import get_session
+from server.domain import schemas
 from server.domain.services.force_service import ForceService
+from server.domain.services.ric_catalogue import RICCatalogue, get_ric_catalogue
 
 router = APIRouter(prefix="/forces", tags=["Forces"])
 
-# Placeholder RIC library for demo purposes
-_SAMPLE_RIC_LIBRARY = {
-    "INF-BN": {"name": "Infantry Battalion", "personnel": 720, "vehicles": 120},
-    "ARM-CO": {"name": "Armored Company", "personnel": 160, "vehicles": 60},
-}
-
 
 def _service(session: Session) -> ForceService:
     return ForceService(session)
@@ -26,7 +24,19 @@ def list_generic_units(session: Session = Depends(get_session)):
 
 @router.post("/units/generic")
 def create_generic_unit(payload: dict, session: Session = Depends(get_session)):
-    return _service(session).create_generic_unit(payload)
+    try:
+        return _service(session).create_generic_unit(payload)
+    except LookupError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+
+@router.get("/units/generic/{unit_id}/ric")
+def get_generic_unit_ric(unit_id: int, session: Session = Depends(get_session)):
+    try:
+        entry = _service(session).resolve_generic_ric(unit_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return entry.as_dict()
 
 
 @router.get("/units/real")
@@ -36,12 +46,84 @@ def list_real_units(session: Session = Depends(get_session)):
 
 @router.post("/units/real")
 def create_real_unit(payload: dict, session: Session = Depends(get_session)):
-    return _service(session).create_real_unit(payload)
+    try:
+        return _service(session).create_real_unit(payload)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except LookupError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+
+@router.patch("/units/real/{unit_id}")
+def update_real_unit(unit_id: int, payload: dict, session: Session = Depends(get_session)):
+    try:
+        return _service(session).update_real_unit(unit_id, payload)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except LookupError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+
+@router.delete("/units/real/{unit_id}")
+def delete_real_unit(unit_id: int, session: Session = Depends(get_session)):
+    try:
+        _service(session).delete_real_unit(unit_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except LookupError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    return {"deleted": unit_id}
+
+
+@router.get("/units/real/{unit_id}/children")
+def list_child_units(unit_id: int, session: Session = Depends(get_session)):
+    try:
+        return _service(session).list_child_units(unit_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
+@router.get("/units/real/{unit_id}/rollup", response_model=schemas.UnitRollupRead)
+def get_unit_rollup(unit_id: int, session: Session = Depends(get_session)):
+    try:
+        return _service(session).get_rollup(unit_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
+@router.post("/units/real/rollups/rebuild")
+def rebuild_unit_rollups(session: Session = Depends(get_session)):
+    return {"rows": _service(session).rebuild_rollups()}
+
+
+@router.get("/equipment/ric")
+def search_equipment_ric(
+    prefix: str = Query(default="", max_length=32),
+    limit: int = Query(default=50, ge=1, le=1000),
+    catalogue: RICCatalogue = Depends(get_ric_catalogue),
+):
+    return [entry.as_dict() for entry in catalogue.prefix(prefix, limit)]
+
+
+@router.post("/equipment/ric/batch")
+def batch_equipment_ric(codes: List[str], catalogue: RICCatalogue = Depends(get_ric_catalogue)):
+    if len(codes) > 10000:
+        raise HTTPException(status_code=400, detail="At most 10000 codes per batch")
+    resolved = catalogue.batch(codes)
+    return {
+        "found": {code: entry.as_dict() for code, entry in resolved.items() if entry},
+        "missing": [code for code, entry in resolved.items() if not entry],
+    }
+
+
+@router.get("/equipment/ric-catalogue")
+def get_ric_catalogue_stats(catalogue: RICCatalogue = Depends(get_ric_catalogue)):
+    return catalogue.stats()
 
 
 @router.get("/equipment/ric/{code}")
-def get_equipment_ric(code: str):
-    info = _SAMPLE_RIC_LIBRARY.get(code.upper())
-    if not info:
+def get_equipment_ric(code: str, catalogue: RICCatalogue = Depends(get_ric_catalogue)):
+    entry = catalogue.get(code)
+    if not entry:
         raise HTTPException(status_code=404, detail="RIC code not found")
-    return info
+    return entry.as_dict()
@@ -0,0 +1,219 @@
+"""Liveness, readiness and start-up warm-up.
+
+``/health/live`` only shows that the process answers. Use it as the
+restart probe. ``/health/ready`` checks the database round trip and the
+schema version, and reports the warm-up and the audit write-behind
+backlog. It answers 503 until the checks pass and warm-up has finished
+with every step the worker depends on good, so a load balancer keeps new
+workers out of rotation until they can serve. The legacy ``/health``
+gives the same answer.
+
+Warm-up runs in a background thread once the schema check has passed. It
+configures the ORM mappers, fills the connection pools, loads the RIC
+catalogue and tileset metadata, builds the list response adapters and,
+with sharded storage, the shard template. Requests are served meanwhile;
+the first ones to need something not yet warm pay for it themselves, as
+they did before.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import configure_mappers
+
+from server.api.responses import list_adapter
+from server.db.async_base import ASYNC_DB, get_async_engine
+from server.db.base import engine, replica_engine, shards
+from server.db.migrations import HEAD, current_version
+from server.domain import schemas
+from server.domain.services.audit_writer import get_audit_writer
+from server.domain.services.mbtiles import get_tileset_catalogue
+from server.domain.services.ric_catalogue import get_ric_catalogue
+
+logger = logging.getLogger(__name__)
+
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "4"))
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", "2"))
+
+# Models served through list_response
+_LIST_MODELS = (
+    schemas.PlanRead,
+    schemas.TaskRead,
+    schemas.TTLRead,
+    schemas.FactorRead,
+    schemas.DecisionRead,
+)
+
+# Steps whose failure means the worker cannot serve; the rest only warm caches
+_REQUIRED_STEPS = ("orm_mappers", "database", "replica", "async_database", "shard_template")
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+class Warmup:
+    """Runs the warm-up steps once, in order, and records how each went."""
+
+    def __init__(self) -> None:
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: Dict[str, dict] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def ok(self) -> bool:
+        """Finished, and no step the worker depends on failed."""
+        return self.done and all(step["ok"] for name, step in self.steps.items() if name in _REQUIRED_STEPS)
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._loop = loop
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread:
+            self._thread.join(timeout)
+        return self.done
+
+    def _run(self) -> None:
+        for name, step in self._steps():
+            started = time.perf_counter()
+            try:
+                step()
+                self.steps[name] = {"ok": True}
+            except Exception as exc:  # noqa: BLE001 - readiness decides which failures matter
+                logger.warning("Warm-up step %s failed: %s", name, exc)
+                self.steps[name] = {"ok": False, "error": str(exc)}
+            self.steps[name]["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self.finished_at = time.time()
+        logger.info("Warm-up finished in %.0f ms", (self.finished_at - self.started_at) * 1000)
+
+    def _steps(self) -> List[Tuple[str, Callable[[], None]]]:
+        # Mapper configuration otherwise lands on the first ORM query
+        steps = [("orm_mappers", configure_mappers), ("database", lambda: _fill_pool(engine))]
+        if replica_engine is not None:
+            steps.append(("replica", lambda: _fill_pool(replica_engine)))
+        if ASYNC_DB and self._loop is not None:
+            # Async connections belong to the loop that opened them
+            steps.append(("async_database", lambda: asyncio.run_coroutine_threadsafe(_fill_async_pool(), self._loop).result()))
+        if shards:
+            steps.append(("shard_template", shards.warm))
+        steps += [
+            ("ric_catalogue", lambda: get_ric_catalogue().stats()),
+            ("tilesets", _load_tilesets),
+            ("list_adapters", lambda: [list_adapter(model) for model in _LIST_MODELS]),
+        ]
+        return steps
+
+    def as_dict(self) -> dict:
+        return {
+            "done": self.done,
+            "ok": self.ok,
+            "ms": round((self.finished_at - self.started_at) * 1000, 1) if self.done else None,
+            "steps": dict(self.steps),
+        }
+
+
+def _fill_pool(target: Engine) -> None:
+    """Open up to ``WARMUP_CONNECTIONS`` at once so they all stay pooled."""
+    connections = []
+    try:
+        for _ in range(WARMUP_CONNECTIONS):
+            connection = target.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+async def _fill_async_pool() -> None:
+    connections = []
+    try:
+        for _ in range(WARMUP_CONNECTIONS):
+            connection = await get_async_engine().connect()
+            connections.append(connection)
+            await connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            await connection.close()
+
+
+def _load_tilesets() -> None:
+    for tileset in get_tileset_catalogue().tilesets.values():
+        tileset.metadata
+
+
+@lru_cache(maxsize=1)
+def get_warmup() -> Warmup:
+    return Warmup()
+
+
+def _check_database(target: Engine) -> dict:
+    started = time.perf_counter()
+    with target.connect() as connection:
+        version = current_version(connection)
+    return {
+        "ok": version == HEAD,
+        "schema_version": version,
+        "ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+async def _timed_check(target: Engine) -> dict:
+    try:
+        return await asyncio.wait_for(run_in_threadpool(_check_database, target), READY_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"ok": False, "error": f"no answer within {READY_TIMEOUT:g}s"}
+    except Exception as exc:  # noqa: BLE001 - reported, not raised
+        return {"ok": False, "error": str(exc)}
+
+
+@router.get("/live")
+async def liveness() -> dict:
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def readiness():
+    checks = {"database": await _timed_check(engine)}
+    if replica_engine is not None:
+        checks["replica"] = await _timed_check(replica_engine)
+    warmup = get_warmup()
+    ready = warmup.ok and all(check["ok"] for check in checks.values())
+    body = {
+        "status": "ready" if ready else "unavailable",
+        "checks": checks,
+        "warmup": warmup.as_dict(),
+        # Events waiting for the database, and any dropped because the queue was full
+        "audit": get_audit_writer().stats(),
+        # Only caches already built: readiness must not build them itself
+        "caches": {
+            "ric_catalogue": get_ric_catalogue().stats() if get_ric_catalogue.cache_info().currsize else None,
+            "tiles": get_tileset_catalogue().cache.stats() if get_tileset_catalogue.cache_info().currsize else None,
+        },
+    }
+    if shards:
+        body["caches"]["shards"] = shards.stats()
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+__all__ = ["Warmup", "get_warmup", "router"]
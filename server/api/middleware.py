@@ -0,0 +1,245 @@
+"""HTTP caching and compression for the API, as pure ASGI middleware.
+
+``ETagMiddleware`` gives complete GET and HEAD responses a strong ETag (a
+hash of the body) and answers a matching ``If-None-Match`` with 304.
+Streamed responses, such as NDJSON lists and export downloads, pass
+through unbuffered and without an ETag: a hash is only known after the
+last chunk, by which time the headers have been sent.
+
+``CompressionMiddleware`` compresses responses with zstd (when the
+``zstandard`` package is installed) or gzip, whichever the client's
+``Accept-Encoding`` prefers. Complete bodies are compressed only above
+``COMPRESS_MIN_BYTES``. Streamed bodies are compressed chunk by chunk,
+each flushed so a slow stream still arrives promptly. A compressed
+response's ETag gets an encoding suffix, since strong ETags must differ
+per representation, and the suffix is stripped from ``If-None-Match``
+before the request reaches the app.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip only
+    zstandard = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_ZSTD_LEVEL = int(os.getenv("COMPRESS_ZSTD_LEVEL", "3"))
+
+_COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "application/x-protobuf",
+    "application/vnd.mapbox-vector-tile",
+    "image/svg+xml",
+)
+# Headers a 304 keeps from the response it stands in for (RFC 9110 15.4.5)
+_NOT_MODIFIED_HEADERS = {b"cache-control", b"content-location", b"date", b"etag", b"expires", b"vary"}
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+def _header(headers: Headers, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _without(headers: Headers, *names: bytes) -> Headers:
+    return [(key, value) for key, value in headers if key.lower() not in names]
+
+
+def _etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    if if_none_match.strip() == b"*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    return etag.removeprefix(b"W/") in {tag.strip().removeprefix(b"W/") for tag in if_none_match.split(b",")}
+
+
+class ETagMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        if_none_match = _header(scope["headers"], b"if-none-match")
+        start: Dict = {}
+        streaming = False
+
+        async def send_with_etag(message) -> None:
+            nonlocal streaming
+            if message["type"] == "http.response.start":
+                start.update(message)
+                return
+            if message["type"] != "http.response.body" or streaming or not start:
+                await send(message)
+                return
+            if message.get("more_body", False):
+                streaming = True
+                await send(start)
+                start.clear()
+                await send(message)
+                return
+
+            headers = list(start.get("headers", []))
+            etag = _header(headers, b"etag")
+            if etag is None and start["status"] == 200:
+                etag = b'"' + hashlib.blake2b(message.get("body", b""), digest_size=16).hexdigest().encode() + b'"'
+                headers.append((b"etag", etag))
+            if etag is not None and if_none_match is not None and start["status"] == 200 and _etag_matches(if_none_match, etag):
+                headers = [(key, value) for key, value in headers if key.lower() in _NOT_MODIFIED_HEADERS]
+                await send({"type": "http.response.start", "status": 304, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send({**start, "headers": headers})
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _choose_encoding(_header(scope["headers"], b"accept-encoding") or b"")
+        if_none_match = _header(scope["headers"], b"if-none-match")
+        # A 304 for a compressed representation must carry its suffixed ETag
+        revalidating = encoding is not None and if_none_match is not None and f'-{encoding}"'.encode() in if_none_match
+        if revalidating:
+            # The app only knows the identity ETags. Only this request's coding
+            # is stripped: a tag for another coding names a representation this
+            # request would not get, so it must not match.
+            stripped = if_none_match.replace(f'-{encoding}"'.encode(), b'"')
+            scope = {**scope, "headers": [*_without(scope["headers"], b"if-none-match"), (b"if-none-match", stripped)]}
+        start: Dict = {}
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message) -> None:
+            nonlocal compressor, passthrough
+            if message["type"] == "http.response.start":
+                start.update(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = list(start.get("headers", []))
+                if start["status"] == 304:
+                    # Caches must key the 304 like the 200 it revalidates
+                    headers = _add_vary(headers)
+                    if revalidating:
+                        headers = _with_etag_suffix(headers, encoding)
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                compressible = (
+                    start["status"] not in (204, 304)
+                    and _header(headers, b"content-encoding") is None
+                    and content_type.startswith(_COMPRESSIBLE_TYPES)
+                )
+                if compressible:
+                    headers = _add_vary(headers)
+                if not compressible or encoding is None or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send({**start, "headers": headers})
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers = _without(headers, b"content-length")
+                headers.append((b"content-encoding", encoding.encode()))
+                headers = _with_etag_suffix(headers, encoding)
+                if not more_body:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send({**start, "headers": headers})
+
+            data = compressor.compress(body) + (compressor.finish() if not more_body else compressor.flush())
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class _Compressor:
+    def __init__(self, encoding: str) -> None:
+        if encoding == "zstd":
+            self._zstd = zstandard.ZstdCompressor(level=COMPRESS_ZSTD_LEVEL).compressobj()
+            self._gzip = None
+        else:
+            self._zstd = None
+            self._gzip = zlib.compressobj(COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._zstd.compress(data) if self._zstd else self._gzip.compress(data)
+
+    def flush(self) -> bytes:
+        if self._zstd:
+            return self._zstd.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._zstd.flush() if self._zstd else self._gzip.flush()
+
+
+def _choose_encoding(accept_encoding: bytes) -> Optional[str]:
+    """The supported coding with the highest q-value; zstd wins ties."""
+    offered: Dict[str, float] = {}
+    for part in accept_encoding.decode("latin-1").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            offered[name] = quality
+    candidates = [("zstd", 1)] if zstandard is not None else []
+    candidates.append(("gzip", 0))
+    best = None
+    for name, preference in candidates:
+        quality = offered.get(name, offered.get("*", 0.0))
+        if quality > 0 and (best is None or (quality, preference) > best[0]):
+            best = ((quality, preference), name)
+    return best[1] if best else None
+
+
+def _with_etag_suffix(headers: Headers, encoding: str) -> Headers:
+    etag = _header(headers, b"etag")
+    if etag is None or not etag.endswith(b'"'):
+        return headers
+    return [*_without(headers, b"etag"), (b"etag", etag[:-1] + f'-{encoding}"'.encode())]
+
+
+def _add_vary(headers: Headers) -> Headers:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return [*headers, (b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower() or vary.strip() == b"*":
+        return headers
+    return [*_without(headers, b"vary"), (b"vary", vary + b", Accept-Encoding")]
+
+
+__all__ = ["COMPRESS_MIN_BYTES", "CompressionMiddleware", "ETagMiddleware"]
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlmodel import Session
 
-from server.db.base import get_session
+from server.api.responses import list_response
+from server.db.base import get_session, require_plan_id
 from server.domain import schemas
+from server.domain.geo import parse_bbox, parse_geojson
+from server.domain.services.mbtiles import get_tileset_catalogue
 from server.domain.services.plan_service import PlanningService
+from server.domain.services.spatial_service import SpatialService
+from server.domain.services.tile_service import AreaTileService
 
 router = APIRouter(prefix="/plans", tags=["Planning"])
 
@@ -21,9 +28,9 @@ def create_plan(plan_in: schemas.PlanCreate, session: Session = Depends(get_sess
 
 
 @router.get("/", response_model=list[schemas.PlanRead])
-def list_plans(session: Session = Depends(get_session)):
+def list_plans(request: Request, session: Session = Depends(get_session)):
     service = _service(session)
-    return [schemas.PlanRead.model_validate(plan) for plan in service.list_plans()]
+    return list_response(request, schemas.PlanRead, service.list_plans())
 
 
 @router.get("/{plan_id}")
@@ -102,6 +109,10 @@ def list_coas(plan_id: int, session: Session = Depends(get_session)):
 
 @router.post("/{plan_id}/areas")
 def create_area(plan_id: int, data: schemas.AreaCreate, session: Session = Depends(get_session)):
+    try:
+        parse_geojson(data.geojson)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     service = _service(session)
     try:
         area = service.create_area(plan_id, data)
@@ -110,6 +121,73 @@ def create_area(plan_id: int, data: schemas.AreaCreate, session: Session = Depen
     return area
 
 
+@router.get("/{plan_id}/areas/search", response_model=schemas.AreaSearchResult)
+def search_areas(
+    plan_id: int,
+    bbox: Optional[str] = None,
+    lon: Optional[float] = None,
+    lat: Optional[float] = None,
+    include_geojson: bool = True,
+    session: Session = Depends(get_session),
+):
+    """Areas intersecting ``bbox`` (min_lon,min_lat,max_lon,max_lat) or
+    containing ``lon``/``lat``, with the TTL items placed in them. Without
+    either filter every area of the plan is returned."""
+    try:
+        box = parse_bbox(bbox) if bbox else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if (lon is None) != (lat is None):
+        raise HTTPException(status_code=400, detail="lon and lat must be given together")
+    point = (lon, lat) if lon is not None else None
+    try:
+        return SpatialService(session).search(plan_id, bbox=box, point=point, include_geojson=include_geojson)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
+@router.get("/{plan_id}/areas/tiles/{z}/{x}/{y}.pbf")
+def area_tile(
+    plan_id: int, z: int, x: int, y: int, request: Request, v: Optional[str] = None, session: Session = Depends(get_session)
+):
+    """Mapbox Vector Tile of the plan's areas, simplified for zoom ``z``.
+    ``v`` is the area version from the TileJSON; tiles requested with the
+    current version may be cached by the browser indefinitely."""
+    try:
+        version, data = AreaTileService(session).tile(plan_id, z, x, y)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    etag = f'"{version}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable" if v == version else "no-cache",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    if not data:
+        return Response(status_code=204, headers=headers)
+    return Response(data, media_type="application/vnd.mapbox-vector-tile", headers=headers)
+
+
+@router.get("/{plan_id}/areas/tiles.json")
+def area_tilejson(plan_id: int, request: Request, session: Session = Depends(get_session)):
+    tiles_url = str(request.url_for("area_tilejson", plan_id=plan_id)).replace("tiles.json", "tiles/{z}/{x}/{y}.pbf")
+    try:
+        return AreaTileService(session).tilejson(plan_id, tiles_url)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
+@router.get("/{plan_id}/areas/style.json")
+def area_style(plan_id: int, request: Request, session: Session = Depends(get_session)):
+    """MapLibre style with the offline basemap and the plan's areas."""
+    basemap = get_tileset_catalogue().basemap_tilejson_url(str(request.url_for("list_tilesets")))
+    try:
+        return AreaTileService(session).style(plan_id, str(request.url_for("area_tilejson", plan_id=plan_id)), basemap)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
 @router.post("/{plan_id}/tasks", response_model=schemas.TaskRead)
 def create_task(plan_id: int, data: schemas.TaskCreate, session: Session = Depends(get_session)):
     service = _service(session)
@@ -121,13 +199,13 @@ def create_task(plan_id: int, data: schemas.TaskCreate, session: Session = Depen
 
 
 @router.get("/{plan_id}/tasks", response_model=list[schemas.TaskRead])
-def list_tasks(plan_id: int, session: Session = Depends(get_session)):
+def list_tasks(plan_id: int, request: Request, session: Session = Depends(get_session)):
     service = _service(session)
     try:
         service.get_plan(plan_id)
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
-    return [schemas.TaskRead.model_validate(task) for task in service.list_tasks(plan_id)]
+    return list_response(request, schemas.TaskRead, service.list_tasks(plan_id))
 
 
 @router.post("/{plan_id}/ttl", response_model=schemas.TTLRead)
@@ -141,17 +219,16 @@ def create_ttl(plan_id: int, data: schemas.TTLCreate, session: Session = Depends
 
 
 @router.get("/{plan_id}/ttl", response_model=list[schemas.TTLRead])
-def list_ttl(plan_id: int, session: Session = Depends(get_session)):
+def list_ttl(plan_id: int, request: Request, session: Session = Depends(get_session)):
     service = _service(session)
     try:
         service.get_plan(plan_id)
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
-    ttl_items = service.list_ttl_for_plan(plan_id)
-    return [schemas.TTLRead.model_validate(ttl) for ttl in ttl_items]
+    return list_response(request, schemas.TTLRead, service.list_ttl_for_plan(plan_id))
 
 
-@router.get("/ttl/{ttl_id}", response_model=schemas.TTLRead)
+@router.get("/ttl/{ttl_id}", response_model=schemas.TTLRead, dependencies=[Depends(require_plan_id)])
 def get_ttl(ttl_id: int, session: Session = Depends(get_session)):
     service = _service(session)
     try:
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import Session
+
+from server.db.base import get_session
+from server.domain import schemas
+from server.domain.services.seed_service import SEED_KINDS, SeedService
+
+router = APIRouter(prefix="/seed", tags=["Seed Data"])
+
+
+def _service(session: Session) -> SeedService:
+    return SeedService(session)
+
+
+@router.post("/load", response_model=list[schemas.SeedLoadResult])
+def load_seed_data(payload: schemas.SeedLoadRequest, session: Session = Depends(get_session)):
+    unknown = set(payload.kinds) - set(SEED_KINDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown seed kinds: {', '.join(sorted(unknown))}")
+    return _service(session).load_directory(kinds=payload.kinds)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+
+from server.domain.services.mbtiles import MBTILES_MAX_AGE, TilesetCatalogue, get_tileset_catalogue
+
+router = APIRouter(prefix="/tiles", tags=["Tiles"])
+
+
+def _catalogue() -> TilesetCatalogue:
+    return get_tileset_catalogue()
+
+
+@router.get("/")
+def list_tilesets(request: Request):
+    """Offline tilesets from ``infra/tiles/tileserver.json`` that are present
+    on disk, with their TileJSON URLs."""
+    catalogue = _catalogue()
+    return [
+        {
+            "id": tileset.id,
+            "name": tileset.name or tileset.id,
+            "format": tileset.format,
+            "basemap": tileset.id == catalogue.basemap_id,
+            "tilejson": str(request.url_for("tileset_tilejson", tileset_id=tileset.id)),
+        }
+        for tileset in catalogue.tilesets.values()
+    ]
+
+
+@router.get("/stats")
+def tile_cache_stats():
+    return _catalogue().cache.stats()
+
+
+@router.get("/{tileset_id}.json")
+def tileset_tilejson(tileset_id: str, request: Request):
+    try:
+        tileset = _catalogue().get(tileset_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    tiles_url = str(request.url_for("tileset_tilejson", tileset_id=tileset_id))[: -len(".json")]
+    return tileset.tilejson(f"{tiles_url}/{{z}}/{{x}}/{{y}}.{tileset.format}")
+
+
+@router.get("/{tileset_id}/{z}/{x}/{y}.{ext}")
+async def tileset_tile(tileset_id: str, z: int, x: int, y: int, ext: str, request: Request):
+    # Cache hits are answered on the event loop; only SQLite reads need a thread
+    catalogue = _catalogue()
+    try:
+        found, tile = catalogue.cached(tileset_id, z, x, y)
+        if not found:
+            tile = await run_in_threadpool(catalogue.load, tileset_id, z, x, y)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    cache_control = f"public, max-age={MBTILES_MAX_AGE}"
+    if tile is None:
+        return Response(status_code=204, headers={"Cache-Control": cache_control})
+    headers = {"ETag": tile.etag, "Cache-Control": cache_control}
+    if request.headers.get("if-none-match") == tile.etag:
+        return Response(status_code=304, headers=headers)
+    if tile.encoding:
+        headers["Content-Encoding"] = tile.encoding
+    return Response(tile.data, media_type=tile.content_type, headers=headers)
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import Session
+
+from server.db.base import get_session
+from server.domain import schemas
+from server.domain.services.trigger_service import TriggerService
+
+router = APIRouter(prefix="/plans", tags=["Decision Point Triggers"])
+
+
+def _service(session: Session) -> TriggerService:
+    return TriggerService(session)
+
+
+@router.post("/{plan_id}/decision-points/evaluate", response_model=schemas.TriggerEvaluation)
+def evaluate_position_reports(
+    plan_id: int, reports: List[schemas.PositionReport], session: Session = Depends(get_session)
+):
+    """Match a batch of position reports against the plan's geospatial
+    triggers and return the decision points that fired."""
+    try:
+        return _service(session).evaluate(plan_id, reports)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
+@router.get("/{plan_id}/decision-points/triggers", response_model=List[schemas.DecisionPointTriggerRead])
+def list_trigger_status(plan_id: int, session: Session = Depends(get_session)):
+    try:
+        return _service(session).status(plan_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
@@ -3,11 +3,11 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session
 
-from server.db.base import get_session
+from server.db.base import get_session, require_plan_id
 from server.domain import schemas
 from server.domain.services.ttr_service import TTRService
 
-router = APIRouter(prefix="/ttr", tags=["Troop-to-Task"])
+router = APIRouter(prefix="/ttr", tags=["Troop-to-Task"], dependencies=[Depends(require_plan_id)])
 
 
 def _service(session: Session) -> TTRService:
@@ -0,0 +1,87 @@
+"""Optional async database path.
+
+With ``ASYNC_DB=1`` the hot read endpoints run on an async engine derived
+from ``DATABASE_URL`` (asyncpg for Postgres, aiosqlite for SQLite) instead
+of occupying a worker thread while they wait on the database. Writes and
+everything else keep using the sync engine in ``server.db.base``.
+
+Reads are routed like ``get_session`` routes them: with a replica
+configured they use an async engine on ``DATABASE_REPLICA_URL``, unless the
+client's read-your-writes cookie says the replica may not have its last
+write yet. The path is off by default; it changes where requests wait, not
+how fast the database answers, so enable it only where measurements show
+it helps.
+"""
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from typing import AsyncIterator
+
+from fastapi import Request
+from starlette.concurrency import run_in_threadpool
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from server.db.base import DATABASE_REPLICA_URL, DATABASE_URL, replicas
+from server.db.profiles import configure_engine, engine_options
+from server.db.replica import REPLICA_COOKIE
+
+ASYNC_DB = os.getenv("ASYNC_DB", "0") in ("1", "true", "True")
+
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    """Swap the sync driver in ``url`` for its async counterpart."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = _ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"No async driver configured for {backend} URLs")
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+def _create_async_engine(sync_url: str) -> AsyncEngine:
+    url = async_database_url(sync_url)
+    engine = create_async_engine(url, **engine_options(url, is_async=True))
+    configure_engine(engine.sync_engine, url)
+    return engine
+
+
+@lru_cache(maxsize=1)
+def get_async_engine() -> AsyncEngine:
+    return _create_async_engine(DATABASE_URL)
+
+
+@lru_cache(maxsize=1)
+def get_async_replica_engine() -> AsyncEngine:
+    return _create_async_engine(DATABASE_REPLICA_URL)
+
+
+@lru_cache(maxsize=2)
+def _session_factory(replica: bool = False) -> async_sessionmaker:
+    engine = get_async_replica_engine() if replica else get_async_engine()
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def get_async_session(request: Request) -> AsyncIterator[AsyncSession]:
+    replica = False
+    if replicas:
+        # The position check may query the replica, so keep it off the loop
+        bind = await run_in_threadpool(replicas.engine_for, request.method, request.cookies.get(REPLICA_COOKIE))
+        replica = bind is replicas.replica
+    async with _session_factory(replica)() as session:
+        yield session
+
+
+async def dispose_async_engine() -> None:
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+    if get_async_replica_engine.cache_info().currsize:
+        await get_async_replica_engine().dispose()
+
+
+__all__ = ["ASYNC_DB", "async_database_url", "dispose_async_engine", "get_async_engine", "get_async_replica_engine", "get_async_session"]
@@ -1,21 +1,117 @@
 import os
-from typing import Any, Iterator
+from contextlib import contextmanager
+from typing import Iterator, Optional
 
-from sqlmodel import Session, SQLModel, create_engine
+from fastapi import Depends, HTTPException, Request
+from sqlmodel import Session, create_engine
+
+from server.db import events  # noqa: F401  (registers session hooks)
+from server.db.migrations import ensure_schema
+from server.db.profiles import configure_engine, engine_options
+from server.db.replica import REPLICA_COOKIE, ReplicaRouter
+from server.db.shards import ShardRouter, sharded
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./copdify.db")
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+
+def _create_engine(url: str):
+    return configure_engine(create_engine(url, echo=False, **engine_options(url)), url)
 
-connect_args: dict[str, Any] = {}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
 
-engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args)
+engine = _create_engine(DATABASE_URL)
+replica_engine = _create_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+replicas: Optional[ReplicaRouter] = ReplicaRouter(engine, replica_engine) if replica_engine else None
+if replicas:
+    replicas.track_writes()
+
+shards: Optional[ShardRouter] = None
+if sharded(DATABASE_URL):
+    if replicas:
+        raise RuntimeError("STORAGE_MODE=sharded does not support read replicas")
+    shards = ShardRouter(engine)
+    shards.track_plans()
 
 
 def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
+    """Check the schema is current; migrations themselves run at deploy
+    time (``python -m server.db.migrations upgrade``)."""
+    ensure_schema(engine)
+
+
+def _int_or_none(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def request_plan_id(request: Request) -> Optional[int]:
+    """The plan a request is about, with sharded storage: the ``plan_id``
+    path parameter, else the query string, else the JSON body. Always None
+    with a single database, where nothing depends on it."""
+    if not shards:
+        return None
+    plan_id = _int_or_none(request.path_params.get("plan_id"))
+    if plan_id is None:
+        plan_id = _int_or_none(request.query_params.get("plan_id"))
+    if plan_id is None and request.method in ("POST", "PUT", "PATCH"):
+        if request.headers.get("content-type", "").startswith("application/json"):
+            try:
+                # FastAPI has already read and parsed the body; this is cached
+                body = await request.json()
+            except ValueError:
+                body = None
+            if isinstance(body, dict):
+                plan_id = _int_or_none(body.get("plan_id"))
+    return plan_id
+
+
+def require_plan_id(plan_id: Optional[int] = Depends(request_plan_id)) -> None:
+    """Guard for plan content routes. Their rows live in the plan's shard,
+    so with sharded storage a request that does not name its plan would
+    silently read and write the catalogue instead."""
+    if shards and plan_id is None:
+        raise HTTPException(status_code=400, detail="plan_id is required with sharded storage")
+
+
+def get_session(request: Request, plan_id: Optional[int] = Depends(request_plan_id)) -> Iterator[Session]:
+    """Request session: safe methods read from the replica when one is
+    configured and the client has no write it might not see there yet.
+    With sharded storage, requests that name a plan use its own database."""
+    if shards:
+        bind = shards.engine_for(plan_id)
+    elif replicas:
+        bind = replicas.engine_for(request.method, request.cookies.get(REPLICA_COOKIE))
+    else:
+        bind = engine
+    with Session(bind) as session:
+        yield session
+
+
+def get_catalogue_session(request: Request) -> Iterator[Session]:
+    """For catalogue-only tables such as the audit log, whose routes may
+    filter by ``plan_id`` but whose rows never live in a plan's shard."""
+    if shards:
+        bind = engine
+    elif replicas:
+        bind = replicas.engine_for(request.method, request.cookies.get(REPLICA_COOKIE))
+    else:
+        bind = engine
+    with Session(bind) as session:
+        yield session
+
+
+def get_primary_session(plan_id: Optional[int] = Depends(request_plan_id)) -> Iterator[Session]:
+    """For reads that must see writes made outside the request, e.g. job
+    status updated by a background worker."""
+    with Session(shards.engine_for(plan_id) if shards else engine) as session:
+        yield session
 
 
-def get_session() -> Iterator[Session]:
-    with Session(engine) as session:
+@contextmanager
+def session_scope(plan_id: Optional[int] = None) -> Iterator[Session]:
+    """Session for work that outlives a request, e.g. streamed responses;
+    ``plan_id`` picks the plan's shard when storage is sharded."""
+    with Session(shards.engine_for(plan_id) if shards else engine) as session:
         yield session
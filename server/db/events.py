@@ -0,0 +1,221 @@
+"""Session hooks shared by every engine.
+
+Any flush that touches plan-scoped rows bumps ``Plan.revision`` so caches
+keyed by plan content (CONOPS exports, spatial indexes) can tell when they
+are stale without comparing the content itself.
+
+The same flushes are audited: every ORM insert, update and delete on a
+tracked table becomes one ``AuditLog`` event (``<table>.<op>``) carrying a
+compact JSON diff. Events are built at flush time, held on the session
+until commit and handed to the write-behind audit writer in one batch; a
+rollback discards them.
+
+An event's actor is whoever made the request, as named by the
+``AUDIT_ACTOR_HEADER`` request header; ``AuditActorMiddleware`` puts it in
+a context variable that the flush hooks read. Text values longer than
+``AUDIT_MAX_TEXT`` (area GeoJSON, rule scripts) are recorded as their
+length and SHA-256 rather than in full.
+"""
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import json
+import os
+from datetime import date, datetime
+from enum import Enum
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Mapper, Session
+
+from server.db.models.core import Plan
+
+AUDIT_CHANGES = os.getenv("AUDIT_CHANGES", "1") not in ("0", "false", "False")
+AUDIT_ACTOR_HEADER = os.getenv("AUDIT_ACTOR_HEADER", "X-Actor")
+AUDIT_MAX_TEXT = int(os.getenv("AUDIT_MAX_TEXT", "1024"))
+
+# Derived or bookkeeping tables whose writes do not change plan content
+UNTRACKED_TABLES = {"auditlog", "exportjob", "productconops", "productcontent", "productcontentsegment"}
+# Tracked for revisions but rebuilt from other tables, so not worth auditing
+UNAUDITED_TABLES = UNTRACKED_TABLES | {"unitrollup"}
+# Bookkeeping columns that never appear in a change diff
+_UNAUDITED_COLUMNS = {"revision"}
+
+_PENDING_REVISIONS = "pending_plan_revisions"
+_PENDING_CHANGES = "pending_audit_changes"
+_PENDING_EVENTS = "pending_audit_events"
+
+# Who the current request acts for, set by AuditActorMiddleware
+_request_actor: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_actor", default=None)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_plan_revisions(session: Session, flush_context, instances) -> None:
+    plan_ids = session.info.setdefault(_PENDING_REVISIONS, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table is None or table in UNTRACKED_TABLES:
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, Plan):
+            if obj.id is not None and obj not in session.new:
+                plan_ids.add(obj.id)
+            continue
+        plan_id = getattr(obj, "plan_id", None)
+        if plan_id is not None:
+            plan_ids.add(plan_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_plan_revisions(session: Session, flush_context) -> None:
+    plan_ids = session.info.pop(_PENDING_REVISIONS, None)
+    if not plan_ids:
+        return
+    table = Plan.__table__
+    session.connection().execute(
+        update(table).where(table.c.id.in_(plan_ids)).values(revision=table.c.revision + 1)
+    )
+
+
+# Change auditing -----------------------------------------------------
+_column_keys: Dict[Mapper, Tuple[str, ...]] = {}
+
+
+def _audited_columns(mapper: Mapper) -> Tuple[str, ...]:
+    keys = _column_keys.get(mapper)
+    if keys is None:
+        keys = tuple(attr.key for attr in mapper.column_attrs if attr.key not in _UNAUDITED_COLUMNS)
+        _column_keys[mapper] = keys
+    return keys
+
+
+def _audited(obj) -> bool:
+    table = getattr(obj, "__tablename__", None)
+    return table is not None and table not in UNAUDITED_TABLES
+
+
+def _plan_id(obj):
+    return obj.id if isinstance(obj, Plan) else getattr(obj, "plan_id", None)
+
+
+def _event(obj, op: str, body: dict) -> dict:
+    return {
+        "plan_id": _plan_id(obj),
+        "action": f"{obj.__tablename__}.{op}",
+        "actor": _request_actor.get(),
+        "payload": body,
+    }
+
+
+def _compact(value):
+    if isinstance(value, str) and len(value) > AUDIT_MAX_TEXT:
+        return {"length": len(value), "sha256": hashlib.sha256(value.encode("utf-8")).hexdigest()}
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    return str(value)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_changes(session: Session, flush_context, instances) -> None:
+    """Updates and deletes must be diffed before the flush clears history."""
+    if not AUDIT_CHANGES:
+        return
+    changes: List[dict] = session.info.setdefault(_PENDING_CHANGES, [])
+    for obj in session.dirty:
+        if not _audited(obj):
+            continue
+        state = inspect(obj)
+        new_values, old_values = {}, {}
+        for key in _audited_columns(state.mapper):
+            history = state.attrs[key].history
+            if not history.added:
+                continue
+            if history.deleted:
+                if history.deleted[0] == history.added[0]:
+                    continue
+                old_values[key] = _compact(history.deleted[0])
+            # No deleted value means the old one was never loaded (e.g. the
+            # object expired on commit); it is left out rather than guessed.
+            new_values[key] = _compact(history.added[0])
+        if new_values:
+            body = {"id": state.identity[0] if state.identity else None, "changes": new_values}
+            if old_values:
+                body["old"] = old_values
+            changes.append(_event(obj, "update", body))
+    for obj in session.deleted:
+        if _audited(obj):
+            state = inspect(obj)
+            changes.append(_event(obj, "delete", {"id": state.identity[0] if state.identity else None}))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_inserts(session: Session, flush_context) -> None:
+    """Inserts are recorded once the flush has assigned their ids, and the
+    whole flush is serialised in one pass."""
+    if not AUDIT_CHANGES:
+        return
+    changes: List[dict] = session.info.pop(_PENDING_CHANGES, [])
+    for obj in session.new:
+        if not _audited(obj):
+            continue
+        state = inspect(obj)
+        values = {}
+        for key in _audited_columns(state.mapper):
+            value = state.dict.get(key)
+            if value is not None:
+                values[key] = _compact(value)
+        changes.append(_event(obj, "insert", values))
+    if not changes:
+        return
+    events = session.info.setdefault(_PENDING_EVENTS, [])
+    for change in changes:
+        change["payload"] = json.dumps(change["payload"], default=_json_default, separators=(",", ":"))
+        events.append(change)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session: Session) -> None:
+    events = session.info.pop(_PENDING_EVENTS, None)
+    if not events:
+        return
+    # Imported lazily: the writer itself depends on server.db.base
+    from server.domain.services.audit_writer import get_audit_writer
+
+    get_audit_writer().record_many(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    session.info.pop(_PENDING_CHANGES, None)
+    session.info.pop(_PENDING_EVENTS, None)
+
+
+class AuditActorMiddleware:
+    """Makes the request's ``AUDIT_ACTOR_HEADER`` the actor of the change
+    events it causes."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._header = AUDIT_ACTOR_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        actor = next((value for key, value in scope["headers"] if key == self._header), b"")
+        token = _request_actor.set(actor.decode("latin-1").strip() or None)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_actor.reset(token)
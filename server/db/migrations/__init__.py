@@ -0,0 +1,124 @@
+"""Versioned schema migrations.
+
+Applied migrations are recorded in ``schema_version``, one row each. Run
+them at deploy time, before the new code starts serving:
+
+    python -m server.db.migrations upgrade
+    python -m server.db.migrations status
+
+At startup the app only compares versions and refuses to run against an
+older schema, unless ``AUTO_MIGRATE=1`` (handy for throwaway SQLite files).
+An empty database is the exception: it is created at ``HEAD`` on first
+start, so local runs and ``TestClient(app)`` work without either step.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, insert, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from server.db.migrations.versions import MIGRATIONS, Migration
+
+logger = logging.getLogger(__name__)
+
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "0") not in ("0", "false", "False")
+
+# Kept out of SQLModel.metadata so create_all never creates it unversioned
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+HEAD = MIGRATIONS[-1].version
+
+
+def current_version(conn: Connection) -> int:
+    if not conn.dialect.has_table(conn, schema_version.name):
+        return 0
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def applied(engine: Engine) -> Dict[int, datetime]:
+    with engine.connect() as conn:
+        if not conn.dialect.has_table(conn, schema_version.name):
+            return {}
+        return {row.version: row.applied_at for row in conn.execute(select(schema_version))}
+
+
+def pending(engine: Engine) -> List[Migration]:
+    with engine.connect() as conn:
+        version = current_version(conn)
+    return [migration for migration in MIGRATIONS if migration.version > version]
+
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    """Apply pending migrations up to ``target`` (default: all), each in its
+    own transaction; returns the ones applied."""
+    done: List[Migration] = []
+    _metadata.create_all(engine)
+    for migration in MIGRATIONS:
+        if target is not None and migration.version > target:
+            break
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # Two deploys racing: the second waits, then finds nothing to do
+                conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('copdify.schema_version'))"))
+            if migration.version <= current_version(conn):
+                continue
+            logger.info("Applying migration %03d %s", migration.version, migration.name)
+            migration.upgrade(conn)
+            conn.execute(
+                insert(schema_version).values(
+                    version=migration.version, name=migration.name, applied_at=datetime.utcnow()
+                )
+            )
+        done.append(migration)
+    return done
+
+
+def _is_empty(engine: Engine) -> bool:
+    """No tables at all: nothing a migration could be partway through."""
+    with engine.connect() as conn:
+        return not inspect(conn).get_table_names()
+
+
+# Databases this process has already found at HEAD, so reopened shards and
+# repeated startup checks skip the round trip
+_at_head: Set[str] = set()
+
+
+def ensure_schema(engine: Engine, auto_migrate: bool = AUTO_MIGRATE) -> None:
+    """Startup check: the database must be at ``HEAD``."""
+    key = engine.url.render_as_string(hide_password=False)
+    if key in _at_head:
+        return
+    missing = pending(engine)
+    if missing and not auto_migrate and not _is_empty(engine):
+        raise RuntimeError(
+            f"Database schema is at version {missing[0].version - 1}, this build needs {HEAD}; "
+            "run `python -m server.db.migrations upgrade` (or set AUTO_MIGRATE=1)"
+        )
+    if missing:
+        upgrade(engine)
+    _at_head.add(key)
+
+
+__all__ = [
+    "AUTO_MIGRATE",
+    "HEAD",
+    "MIGRATIONS",
+    "Migration",
+    "applied",
+    "current_version",
+    "ensure_schema",
+    "pending",
+    "upgrade",
+]
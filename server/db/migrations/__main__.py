@@ -0,0 +1,38 @@
+"""Apply or inspect schema migrations.
+
+Usage: python -m server.db.migrations [upgrade [--to VERSION] | status]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+
+from server.db.base import engine, shards
+from server.db.migrations import MIGRATIONS, applied, upgrade
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="COPDify schema migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade", help="Apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, default=None, help="Stop after this version")
+    commands.add_parser("status", help="List migrations and when they were applied")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        done = upgrade(engine, args.to)
+        print(f"Applied {len(done)} migration(s)" if done else "Schema is up to date")
+        if shards:
+            print(f"Upgraded {shards.upgrade_all()} plan shard(s)")
+        return
+
+    applied_at = applied(engine)
+    for migration in MIGRATIONS:
+        when = applied_at.get(migration.version)
+        state = when.isoformat(timespec="seconds") if when else "pending"
+        print(f"{migration.version:03d}  {migration.name:<32} {state}")
+
+
+if __name__ == "__main__":
+    main()
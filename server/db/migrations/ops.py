@@ -0,0 +1,95 @@
+"""Idempotent schema operations for migrations.
+
+Each helper inspects the live schema first and does nothing if the change
+is already there, so a migration interrupted half way can simply be run
+again, and databases created by ``create_all`` at any point in the past
+converge on the same schema.
+"""
+from __future__ import annotations
+
+import re
+from typing import Sequence
+
+from sqlalchemy import Column, Table, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateTable
+
+
+def has_table(conn: Connection, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(info["name"] == column for info in inspect(conn).get_columns(table))
+
+
+def add_column(conn: Connection, table: str, column: Column) -> None:
+    """``ALTER TABLE ... ADD COLUMN`` for a detached ``Column``. Non-nullable
+    columns need a ``server_default`` to fill existing rows."""
+    if has_column(conn, table, column.name):
+        return
+    preparer = conn.dialect.identifier_preparer
+    ddl = f"ALTER TABLE {preparer.quote(table)} ADD COLUMN {preparer.quote(column.name)} {column.type.compile(conn.dialect)}"
+    if column.server_default is not None:
+        ddl += f" DEFAULT {column.server_default.arg}"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    for foreign_key in column.foreign_keys:
+        target_table, target_column = foreign_key.target_fullname.split(".")
+        ddl += f" REFERENCES {preparer.quote(target_table)} ({preparer.quote(target_column)})"
+    conn.execute(text(ddl))
+
+
+def create_index(conn: Connection, name: str, table: str, columns: Sequence[str], unique: bool = False) -> None:
+    if any(index["name"] == name for index in inspect(conn).get_indexes(table)):
+        return
+    preparer = conn.dialect.identifier_preparer
+    quoted = ", ".join(preparer.quote(column) for column in columns)
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    conn.execute(text(f"CREATE {kind} {preparer.quote(name)} ON {preparer.quote(table)} ({quoted})"))
+
+
+def drop_index(conn: Connection, name: str, table: str) -> None:
+    if not any(index["name"] == name for index in inspect(conn).get_indexes(table)):
+        return
+    conn.execute(text(f"DROP INDEX {conn.dialect.identifier_preparer.quote(name)}"))
+
+
+def drop_not_null(conn: Connection, table: Table, column: str) -> None:
+    """Make ``column`` nullable. SQLite cannot alter a column in place, so
+    the table is rebuilt to ``table``, which must already have ``column``
+    nullable. Pass a definition frozen in the migration, not a model's
+    ``__table__``, so the rebuild does not change as the model does."""
+    info = next(info for info in inspect(conn).get_columns(table.name) if info["name"] == column)
+    if info["nullable"]:
+        return
+    preparer = conn.dialect.identifier_preparer
+    if conn.dialect.name != "sqlite":
+        conn.execute(text(f"ALTER TABLE {preparer.quote(table.name)} ALTER COLUMN {preparer.quote(column)} DROP NOT NULL"))
+        return
+    rebuild_sqlite_table(conn, table)
+
+
+def rebuild_sqlite_table(conn: Connection, table: Table) -> None:
+    """SQLite's documented twelve-step rebuild, reduced to the parts that
+    matter here: create the new shape under a temporary name, copy the
+    columns both shapes share, drop the old table and rename the new one.
+    Renaming the new table (rather than the old one) leaves foreign keys in
+    other tables pointing at the right name."""
+    preparer = conn.dialect.identifier_preparer
+    name = preparer.quote(table.name)
+    temp = preparer.quote(f"_new_{table.name}")
+    ddl = str(CreateTable(table).compile(dialect=conn.dialect))
+    ddl = re.sub(rf"^\s*CREATE TABLE {re.escape(name)}", f"CREATE TABLE {temp}", ddl, count=1)
+    conn.execute(text(ddl))
+
+    existing = {info["name"] for info in inspect(conn).get_columns(table.name)}
+    shared = ", ".join(preparer.quote(column.name) for column in table.columns if column.name in existing)
+    conn.execute(text(f"INSERT INTO {temp} ({shared}) SELECT {shared} FROM {name}"))
+    conn.execute(text(f"DROP TABLE {name}"))
+    conn.execute(text(f"ALTER TABLE {temp} RENAME TO {name}"))
+    for index in table.indexes:
+        create_index(conn, index.name, table.name, [column.name for column in index.columns], index.unique)
+
+
+__all__ = ["add_column", "create_index", "drop_index", "drop_not_null", "has_column", "has_table", "rebuild_sqlite_table"]
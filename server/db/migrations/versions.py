@@ -0,0 +1,284 @@
+"""The migration history, oldest first. Append new steps; never edit one
+that has shipped.
+
+Steps describe the columns, indexes and table shapes they need explicitly
+rather than reading them from the models, so a step means the same thing
+however the models change later.
+
+The baseline is the one deliberate exception: it creates missing tables
+from the current models, so a new database starts at today's shape and
+every later step, being idempotent, finds its work already done. A model
+change therefore changes what the baseline creates for new databases, and
+existing databases still need a step of their own.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, text
+from sqlalchemy.engine import Connection
+from sqlmodel import SQLModel
+
+from server.db.migrations.ops import add_column, create_index, drop_index, drop_not_null, has_column, has_table
+
+logger = logging.getLogger(__name__)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+def _baseline(conn: Connection) -> None:
+    """Create every table that does not exist yet.
+
+    Missing tables are created at their current shape, indexes included;
+    the steps below only have work to do on tables that predate them.
+    """
+    import server.db.models  # noqa: F401  (registers every table)
+
+    SQLModel.metadata.create_all(conn)
+
+
+def _productconops_v2() -> Table:
+    """``productconops`` as step 2 leaves it, for the SQLite table rebuild.
+    The referenced tables are stubs, only there to render the foreign keys."""
+    metadata = MetaData()
+    for name in ("plan", "coa", "productcontent"):
+        Table(name, metadata, Column("id", Integer, primary_key=True))
+    return Table(
+        "productconops",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("plan_id", Integer, ForeignKey("plan.id"), nullable=False),
+        Column("coa_id", Integer, ForeignKey("coa.id")),
+        Column("plan_revision", Integer),
+        Column("content_id", Integer, ForeignKey("productcontent.id")),
+        Column("generated_at", DateTime, nullable=False),
+        Column("summary", String),
+        Column("content", String),
+    )
+
+
+def _revisions_and_product_content(conn: Connection) -> None:
+    """Columns and indexes added for plan revisions, force roll-ups, the
+    CONOPS cache, the product content store and audit queries."""
+    add_column(conn, "plan", Column("revision", Integer, nullable=False, server_default="0"))
+    add_column(conn, "unitreal", Column("parent_id", Integer, ForeignKey("unitreal.id")))
+    add_column(conn, "unitreal", Column("personnel", Integer))
+    add_column(conn, "unitreal", Column("vehicles", Integer))
+    add_column(conn, "productconops", Column("plan_revision", Integer))
+    add_column(conn, "productconops", Column("content_id", Integer, ForeignKey("productcontent.id")))
+    # Bodies now live in productcontent; content only holds legacy products
+    drop_not_null(conn, _productconops_v2(), "content")
+
+    create_index(conn, "ix_productconops_cache_key", "productconops", ["plan_id", "coa_id", "plan_revision"])
+    create_index(conn, "ix_auditlog_created", "auditlog", ["created_at", "id"])
+    create_index(conn, "ix_auditlog_plan_created", "auditlog", ["plan_id", "created_at", "id"])
+    create_index(conn, "ix_auditlog_action_created", "auditlog", ["action", "created_at", "id"])
+    create_index(conn, "ix_auditlog_actor_created", "auditlog", ["actor", "created_at", "id"])
+
+
+# (table, column) pairs behind every plan-scoped and parent-child lookup.
+# productconops, exportjob and auditlog are looked up by plan through their
+# composite indexes, whose leading column is plan_id.
+_FOREIGN_KEY_INDEXES = [
+    ("phase", "plan_id"),
+    ("coa", "plan_id"),
+    ("area", "plan_id"),
+    ("task", "plan_id"),
+    ("task", "phase_id"),
+    ("task", "parent_id"),
+    ("ttl", "plan_id"),
+    ("ttl", "task_id"),
+    ("ttl", "phase_id"),
+    ("ttl", "coa_id"),
+    ("ttl", "area_id"),
+    ("factor", "plan_id"),
+    ("factor", "phase_id"),
+    ("factor", "coa_id"),
+    ("factordeduction", "factor_id"),
+    ("factorconclusion", "factor_id"),
+    ("factorconclusion", "deduction_id"),
+    ("conclusionlink", "conclusion_id"),
+    ("risk", "plan_id"),
+    ("risk", "phase_id"),
+    ("assumption", "plan_id"),
+    ("constraint", "plan_id"),
+    ("decisivecondition", "plan_id"),
+    ("decisivecondition", "phase_id"),
+    ("decisionpoint", "plan_id"),
+    ("decisionpoint", "phase_id"),
+    ("decisionpoint", "coa_id"),
+    ("decisionpoint", "location_area_id"),
+    ("ccir", "plan_id"),
+    ("syncrow", "plan_id"),
+    ("syncrow", "phase_id"),
+    ("inforequirement", "plan_id"),
+    ("cogitem", "plan_id"),
+    ("ttrresult", "ttl_id"),
+    ("ttrresult", "rule_id"),
+    ("unitreal", "generic_unit_id"),
+    ("unitreal", "parent_id"),
+    ("decision", "plan_id"),
+    ("productcontent", "base_id"),
+    ("productconops", "coa_id"),
+    ("productconops", "content_id"),
+    ("exportjob", "coa_id"),
+    ("exportjob", "product_id"),
+]
+
+
+def _foreign_key_indexes(conn: Connection) -> None:
+    for table, column in _FOREIGN_KEY_INDEXES:
+        if has_table(conn, table):
+            create_index(conn, f"ix_{table}_{column}", table, [column])
+    # Reverse lookups: which conclusions point at this risk / task / ...
+    create_index(conn, "ix_conclusionlink_target", "conclusionlink", ["target_kind", "target_id"])
+
+
+# Accepts a geometry, Feature or FeatureCollection, like the API does
+_PG_AREA_GEOM = """
+CREATE OR REPLACE FUNCTION area_geojson_geom(doc jsonb) RETURNS geometry AS $$
+    SELECT ST_SetSRID(CASE doc->>'type'
+        WHEN 'FeatureCollection' THEN (
+            SELECT ST_Collect(ST_GeomFromGeoJSON(feature->'geometry'))
+            FROM jsonb_array_elements(doc->'features') AS feature
+        )
+        WHEN 'Feature' THEN ST_GeomFromGeoJSON(doc->'geometry')
+        ELSE ST_GeomFromGeoJSON(doc)
+    END, 4326)
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION area_sync_geom() RETURNS trigger AS $$
+BEGIN
+    BEGIN
+        NEW.geom := area_geojson_geom(NEW.geojson::jsonb);
+    EXCEPTION WHEN others THEN
+        NEW.geom := NULL;
+    END;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS area_sync_geom ON area;
+CREATE TRIGGER area_sync_geom BEFORE INSERT OR UPDATE OF geojson ON area
+    FOR EACH ROW EXECUTE FUNCTION area_sync_geom();
+"""
+
+
+def _area_spatial(conn: Connection) -> None:
+    """Bounding boxes on every backend; a PostGIS geometry with a GiST index
+    where the extension is available."""
+    from server.domain.geo import parse_geojson
+
+    for column in ("min_x", "min_y", "max_x", "max_y"):
+        add_column(conn, "area", Column(column, Float))
+    rows = conn.execute(text("SELECT id, geojson FROM area WHERE min_x IS NULL")).all()
+    for area_id, geojson in rows:
+        try:
+            bbox = parse_geojson(geojson).bbox
+        except ValueError:
+            continue  # left without a bbox, so spatial queries skip it
+        conn.execute(
+            text("UPDATE area SET min_x = :a, min_y = :b, max_x = :c, max_y = :d WHERE id = :id"),
+            {"a": bbox[0], "b": bbox[1], "c": bbox[2], "d": bbox[3], "id": area_id},
+        )
+
+    if conn.dialect.name != "postgresql":
+        return
+    if not conn.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'postgis'")).first():
+        return
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+    if not has_column(conn, "area", "geom"):
+        conn.execute(text("ALTER TABLE area ADD COLUMN geom geometry(Geometry, 4326)"))
+    conn.execute(text(_PG_AREA_GEOM))
+    conn.execute(text("UPDATE area SET geojson = geojson WHERE geom IS NULL"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_area_geom ON area USING gist (geom)"))
+
+
+# Seeded tables: (table, natural key, columns elsewhere that reference it).
+# Real units are not listed: unit names legitimately repeat, so merging by
+# name would delete real units. They are keyed by ``uic`` (step 8).
+_NATURAL_KEYS = [
+    ("unitgeneric", "ric_code", [("unitreal", "generic_unit_id")]),
+    ("ttrrule", "name", [("ttrresult", "rule_id")]),
+]
+
+
+def _natural_key_uniques(conn: Connection) -> None:
+    """Unique indexes on the seed natural keys, so seed loads can upsert
+    with ``INSERT ... ON CONFLICT``. Duplicates made before the index
+    existed are merged into the oldest row first, references included."""
+    for table, key, references in _NATURAL_KEYS:
+        if not has_table(conn, table):
+            continue
+        groups = conn.execute(
+            text(f"SELECT {key}, MIN(id) FROM {table} WHERE {key} IS NOT NULL GROUP BY {key} HAVING COUNT(*) > 1")
+        ).all()
+        for value, keep in groups:
+            dropped = conn.execute(
+                text(f"SELECT id FROM {table} WHERE {key} = :value AND id <> :keep"), {"value": value, "keep": keep}
+            ).scalars().all()
+            for ref_table, ref_column in references:
+                if has_table(conn, ref_table):
+                    conn.execute(
+                        text(f"UPDATE {ref_table} SET {ref_column} = :keep WHERE {ref_column} = :dropped"),
+                        [{"keep": keep, "dropped": dropped_id} for dropped_id in dropped],
+                    )
+            conn.execute(text(f"DELETE FROM {table} WHERE id = :dropped"), [{"dropped": d} for d in dropped])
+        if groups:
+            logger.warning("Merged duplicate %s rows for %d %s values", table, len(groups), key)
+        create_index(conn, f"ux_{table}_{key}", table, [key], unique=True)
+
+
+def _export_job_worker(conn: Connection) -> None:
+    """Which process owns a queued or running export job, so a restarted
+    worker can tell its predecessor's orphaned jobs from live ones."""
+    add_column(conn, "exportjob", Column("worker", String))
+
+
+def _leases(conn: Connection) -> None:
+    """Named leases, so background jobs that must not overlap across
+    worker processes can claim their turn through the database."""
+    if has_table(conn, "lease"):
+        return
+    Table(
+        "lease",
+        MetaData(),
+        Column("name", String, primary_key=True),
+        Column("holder", String),
+        Column("expires_at", DateTime),
+    ).create(conn)
+
+
+def _unit_identification_codes(conn: Connection) -> None:
+    """Key real units by an explicit ``uic`` instead of a unique name.
+    Units whose name is unique get it as their ``uic``, so seed files keyed
+    by name keep updating the rows they created."""
+    drop_index(conn, "ux_unitreal_name", "unitreal")
+    add_column(conn, "unitreal", Column("uic", String))
+    conn.execute(
+        text(
+            "UPDATE unitreal SET uic = name WHERE uic IS NULL AND name IN "
+            "(SELECT name FROM unitreal GROUP BY name HAVING COUNT(*) = 1)"
+        )
+    )
+    create_index(conn, "ux_unitreal_uic", "unitreal", ["uic"], unique=True)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline", _baseline),
+    Migration(2, "revisions_and_product_content", _revisions_and_product_content),
+    Migration(3, "foreign_key_indexes", _foreign_key_indexes),
+    Migration(4, "area_spatial", _area_spatial),
+    Migration(5, "natural_key_uniques", _natural_key_uniques),
+    Migration(6, "export_job_worker", _export_job_worker),
+    Migration(7, "leases", _leases),
+    Migration(8, "unit_identification_codes", _unit_identification_codes),
+]
+
+
+__all__ = ["MIGRATIONS", "Migration"]
@@ -2,6 +2,7 @@ from datetime import datetime
 from enum import Enum
 from typing import List, Optional
 
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -15,6 +16,7 @@ class Plan(SQLModel, table=True):
     reference_c_day: Optional[datetime] = None
     reference_d_day: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    revision: int = Field(default=0, nullable=False, description="Bumped on every change to plan content")
 
     phases: List["Phase"] = Relationship(back_populates="plan")
     coas: List["COA"] = Relationship(back_populates="plan")
@@ -35,7 +37,7 @@ class Plan(SQLModel, table=True):
 
 class Phase(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
     name: str
     sequence: int = Field(default=1, ge=1)
     objectives: Optional[str] = None
@@ -54,7 +56,7 @@ class Phase(SQLModel, table=True):
 
 class COA(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
     name: str
     description: Optional[str] = None
     assumptions: Optional[str] = None
@@ -69,11 +71,19 @@ class COA(SQLModel, table=True):
 
 
 class Area(SQLModel, table=True):
+    """Control measure geometry. The bounding box is derived from ``geojson``
+    on write; on PostGIS a trigger also maintains a ``geom`` column with a
+    GiST index, which the model does not map."""
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
     name: str
     area_type: str = Field(default="AO")
     geojson: str
+    min_x: Optional[float] = None
+    min_y: Optional[float] = None
+    max_x: Optional[float] = None
+    max_y: Optional[float] = None
 
     ttl_items: List["TTL"] = Relationship(back_populates="area")
     decision_points: List["DecisionPoint"] = Relationship(back_populates="location_area")
@@ -87,9 +97,9 @@ class TaskCategory(str, Enum):
 
 class Task(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
-    phase_id: Optional[int] = Field(default=None, foreign_key="phase.id")
-    parent_id: Optional[int] = Field(default=None, foreign_key="task.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
+    phase_id: Optional[int] = Field(default=None, foreign_key="phase.id", index=True)
+    parent_id: Optional[int] = Field(default=None, foreign_key="task.id", index=True)
     name: str
     description: Optional[str] = None
     category: TaskCategory = Field(default=TaskCategory.ASSIGNED)
@@ -112,11 +122,11 @@ class TTLStatus(str, Enum):
 
 class TTL(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
-    task_id: int = Field(foreign_key="task.id")
-    phase_id: Optional[int] = Field(default=None, foreign_key="phase.id")
-    coa_id: Optional[int] = Field(default=None, foreign_key="coa.id")
-    area_id: Optional[int] = Field(default=None, foreign_key="area.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
+    task_id: int = Field(foreign_key="task.id", index=True)
+    phase_id: Optional[int] = Field(default=None, foreign_key="phase.id", index=True)
+    coa_id: Optional[int] = Field(default=None, foreign_key="coa.id", index=True)
+    area_id: Optional[int] = Field(default=None, foreign_key="area.id", index=True)
     start_offset_hours: Optional[int] = None
     end_offset_hours: Optional[int] = None
     relative_to: Optional[str] = Field(default="D-Day")
@@ -144,9 +154,9 @@ class FactorDomain(str, Enum):
 
 class Factor(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
-    phase_id: Optional[int] = Field(default=None, foreign_key="phase.id")
-    coa_id: Optional[int] = Field(default=None, foreign_key="coa.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
+    phase_id: Optional[int] = Field(default=None, foreign_key="phase.id", index=True)
+    coa_id: Optional[int] = Field(default=None, foreign_key="coa.id", index=True)
     title: str
     description: Optional[str] = None
     domain: FactorDomain = Field(default=FactorDomain.OTHER)
@@ -164,7 +174,7 @@ class Factor(SQLModel, table=True):
 
 class FactorDeduction(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    factor_id: int = Field(foreign_key="factor.id")
+    factor_id: int = Field(foreign_key="factor.id", index=True)
     text: str
     confidence: Optional[float] = Field(default=None, ge=0.0, le=1.0)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -194,8 +204,8 @@ class ConclusionStatus(str, Enum):
 
 class FactorConclusion(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    factor_id: int = Field(foreign_key="factor.id")
-    deduction_id: int = Field(foreign_key="factordeduction.id")
+    factor_id: int = Field(foreign_key="factor.id", index=True)
+    deduction_id: int = Field(foreign_key="factordeduction.id", index=True)
     type: ConclusionType
     text: str
     priority: Optional[int] = None
@@ -222,8 +232,10 @@ class ConclusionTarget(str, Enum):
 
 
 class ConclusionLink(SQLModel, table=True):
+    __table_args__ = (Index("ix_conclusionlink_target", "target_kind", "target_id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    conclusion_id: int = Field(foreign_key="factorconclusion.id")
+    conclusion_id: int = Field(foreign_key="factorconclusion.id", index=True)
     target_kind: ConclusionTarget
     target_id: Optional[int] = None
 
@@ -232,8 +244,8 @@ class ConclusionLink(SQLModel, table=True):
 
 class Risk(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
-    phase_id: Optional[int] = Field(default=None, foreign_key="phase.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
+    phase_id: Optional[int] = Field(default=None, foreign_key="phase.id", index=True)
     title: str
     severity: Optional[str] = None
     probability: Optional[str] = None
@@ -247,7 +259,7 @@ class Risk(SQLModel, table=True):
 
 class Assumption(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
     text: str
     to_be_validated_by: Optional[str] = None
     validity_window: Optional[str] = None
@@ -258,7 +270,7 @@ class Assumption(SQLModel, table=True):
 
 class Constraint(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
     text: str
     source: Optional[str] = None
     scope: Optional[str] = None
@@ -270,8 +282,8 @@ class Constraint(SQLModel, table=True):
 
 class DecisiveCondition(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
-    phase_id: Optional[int] = Field(default=None, foreign_key="phase.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
+    phase_id: Optional[int] = Field(default=None, foreign_key="phase.id", index=True)
     name: str
     description: Optional[str] = None
     success_criteria: Optional[str] = None
@@ -286,15 +298,15 @@ class DecisiveCondition(SQLModel, table=True):
 
 class DecisionPoint(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
-    phase_id: Optional[int] = Field(default=None, foreign_key="phase.id")
-    coa_id: Optional[int] = Field(default=None, foreign_key="coa.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
+    phase_id: Optional[int] = Field(default=None, foreign_key="phase.id", index=True)
+    coa_id: Optional[int] = Field(default=None, foreign_key="coa.id", index=True)
     name: str
     description: Optional[str] = None
     trigger_time: Optional[str] = Field(default=None, description="Time-based trigger (e.g., D+3)")
     trigger_event: Optional[str] = Field(default=None, description="Event-based trigger")
     trigger_geo: Optional[str] = Field(default=None, description="Geospatial expression")
-    location_area_id: Optional[int] = Field(default=None, foreign_key="area.id")
+    location_area_id: Optional[int] = Field(default=None, foreign_key="area.id", index=True)
     branches_sequels: Optional[str] = Field(default=None, description="JSON array of branch/sequel options")
     derived_from: Optional[str] = None
 
@@ -312,7 +324,7 @@ class CCIRKind(str, Enum):
 
 class CCIR(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
     kind: CCIRKind = Field(default=CCIRKind.PIR)
     text: str
     linked_rfi_id: Optional[int] = None
@@ -323,8 +335,8 @@ class CCIR(SQLModel, table=True):
 
 class SyncRow(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
-    phase_id: Optional[int] = Field(default=None, foreign_key="phase.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
+    phase_id: Optional[int] = Field(default=None, foreign_key="phase.id", index=True)
     lane: Optional[str] = None
     text: str
     link_ref: Optional[str] = None
@@ -336,7 +348,7 @@ class SyncRow(SQLModel, table=True):
 
 class InfoRequirement(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
     name: str
     description: Optional[str] = None
     derived_from: Optional[str] = None
@@ -352,7 +364,7 @@ class COGType(str, Enum):
 
 class COGItem(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
     actor_name: str = Field(description="Friendly/Enemy/Neutral actor")
     cog_type: COGType
     description: str
@@ -363,6 +375,8 @@ class COGItem(SQLModel, table=True):
 
 
 class TTRRule(SQLModel, table=True):
+    __table_args__ = (Index("ux_ttrrule_name", "name", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     description: Optional[str] = None
@@ -373,8 +387,8 @@ class TTRRule(SQLModel, table=True):
 
 class TTRResult(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    ttl_id: int = Field(foreign_key="ttl.id")
-    rule_id: Optional[int] = Field(default=None, foreign_key="ttrrule.id")
+    ttl_id: int = Field(foreign_key="ttl.id", index=True)
+    rule_id: Optional[int] = Field(default=None, foreign_key="ttrrule.id", index=True)
     recommended_force_package: str
     sensitivity_notes: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -384,6 +398,8 @@ class TTRResult(SQLModel, table=True):
 
 
 class UnitGeneric(SQLModel, table=True):
+    __table_args__ = (Index("ux_unitgeneric_ric_code", "ric_code", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     category: Optional[str] = None
@@ -393,19 +409,41 @@ class UnitGeneric(SQLModel, table=True):
 
 
 class UnitReal(SQLModel, table=True):
+    __table_args__ = (Index("ux_unitreal_uic", "uic", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    # Names repeat across an order of battle ("A Coy"); the external id does not
+    uic: Optional[str] = Field(default=None, description="Unit identification code, the seed key")
     name: str
     parent_service: Optional[str] = None
     echelon: Optional[str] = None
     home_station: Optional[str] = None
-    generic_unit_id: Optional[int] = Field(default=None, foreign_key="unitgeneric.id")
+    generic_unit_id: Optional[int] = Field(default=None, foreign_key="unitgeneric.id", index=True)
+    parent_id: Optional[int] = Field(default=None, foreign_key="unitreal.id", index=True)
+    personnel: Optional[int] = Field(default=None, description="Own strength, excluding subordinates")
+    vehicles: Optional[int] = Field(default=None, description="Own vehicles, excluding subordinates")
 
     generic_unit: Optional[UnitGeneric] = Relationship()
+    parent: Optional["UnitReal"] = Relationship(back_populates="children", sa_relationship_kwargs={"remote_side": "UnitReal.id"})
+    children: List["UnitReal"] = Relationship(back_populates="parent")
+
+
+class UnitRollup(SQLModel, table=True):
+    """Precomputed subtree totals for a real unit, one row per service."""
+
+    __table_args__ = (UniqueConstraint("unit_id", "service"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    unit_id: int = Field(foreign_key="unitreal.id", index=True)
+    service: str
+    personnel: int = Field(default=0)
+    vehicles: int = Field(default=0)
+    unit_count: int = Field(default=0)
 
 
 class Decision(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
     entity_ref: Optional[str] = None
     decision_text: str
     assumptions: Optional[str] = None
@@ -417,19 +455,83 @@ class Decision(SQLModel, table=True):
     plan: Plan = Relationship(back_populates="decisions")
 
 
+class ProductContent(SQLModel, table=True):
+    """Rendered document body, shared by every product with identical content.
+
+    ``encoding`` is ``zlib`` (compressed segments), ``delta`` (compressed line
+    ops against ``base_id``) or ``plain`` (uncompressed ``body``).
+    """
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    hash: Optional[str] = Field(default=None, index=True, description="SHA-256 of the body; NULL while streaming")
+    encoding: str = Field(default="plain")
+    base_id: Optional[int] = Field(default=None, foreign_key="productcontent.id", index=True)
+    depth: int = Field(default=0, description="Length of the delta chain down to a full body")
+    size: int = Field(default=0)
+    stored_size: int = Field(default=0)
+    body: Optional[str] = None
+
+
+class ProductContentSegment(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    content_id: int = Field(foreign_key="productcontent.id", index=True)
+    seq: int
+    data: bytes
+
+
 class ProductCONOPS(SQLModel, table=True):
+    # Also serves plan_id lookups, so plan_id has no index of its own
+    __table_args__ = (Index("ix_productconops_cache_key", "plan_id", "coa_id", "plan_revision"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     plan_id: int = Field(foreign_key="plan.id")
-    coa_id: Optional[int] = Field(default=None, foreign_key="coa.id")
+    coa_id: Optional[int] = Field(default=None, foreign_key="coa.id", index=True)
+    plan_revision: Optional[int] = None
+    content_id: Optional[int] = Field(default=None, foreign_key="productcontent.id", index=True)
     generated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
     summary: Optional[str] = None
-    content: str
+    content: Optional[str] = Field(default=None, description="Inline body of products exported before content_id")
 
     plan: Plan = Relationship()
     coa: Optional[COA] = Relationship()
+    stored_content: Optional[ProductContent] = Relationship()
+
+
+class ExportJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ExportJob(SQLModel, table=True):
+    # Also serves plan_id lookups, so plan_id has no index of its own
+    __table_args__ = (Index("ix_exportjob_reuse_key", "plan_id", "coa_id", "format", "plan_revision"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    plan_id: int = Field(foreign_key="plan.id")
+    coa_id: Optional[int] = Field(default=None, foreign_key="coa.id", index=True)
+    format: str
+    plan_revision: int
+    status: ExportJobStatus = Field(default=ExportJobStatus.QUEUED)
+    product_id: Optional[int] = Field(default=None, foreign_key="productconops.id", index=True)
+    file_path: Optional[str] = None
+    error: Optional[str] = None
+    worker: Optional[str] = Field(default=None, description="host:pid of the process running the job")
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    finished_at: Optional[datetime] = None
 
 
 class AuditLog(SQLModel, table=True):
+    # Every audit query orders by (created_at, id); each filter gets a
+    # composite index that serves the filter and the keyset order together.
+    __table_args__ = (
+        Index("ix_auditlog_created", "created_at", "id"),
+        Index("ix_auditlog_plan_created", "plan_id", "created_at", "id"),
+        Index("ix_auditlog_action_created", "action", "created_at", "id"),
+        Index("ix_auditlog_actor_created", "actor", "created_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     plan_id: Optional[int] = Field(default=None, foreign_key="plan.id")
     action: str
@@ -438,3 +540,12 @@ class AuditLog(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
 
     plan: Optional[Plan] = Relationship()
+
+
+class Lease(SQLModel, table=True):
+    """A named, expiring claim, for background work that only one worker
+    process may do at a time."""
+
+    name: str = Field(primary_key=True)
+    holder: Optional[str] = None
+    expires_at: Optional[datetime] = None
@@ -0,0 +1,167 @@
+"""Engine profiles chosen from the database URL.
+
+SQLite runs in WAL mode with ``synchronous=NORMAL`` so readers never block
+the writer and commits do not fsync the main file, plus a busy timeout so
+concurrent writers queue instead of failing, and a memory-mapped, larger
+page cache. Postgres gets a sized ``QueuePool`` with pre-ping, connection
+recycling and a server-side statement timeout.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from functools import partial
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", str(64 * 1024)))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+
+# Sync routes hold their session's connection while FastAPI waits for a
+# worker thread to validate the response, so once requests in flight exceed
+# the pool, threads block on connections held by queued requests until
+# DB_POOL_TIMEOUT. SQLite connections are cheap, so SQLite overflows
+# further than Postgres, but still within a bound: past it, requests wait
+# up to DB_POOL_TIMEOUT for a connection instead of each opening another
+# file handle and page cache. Size both for the expected concurrency.
+SQLITE_MAX_OVERFLOW = int(os.getenv("SQLITE_MAX_OVERFLOW", "60"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+PG_STATEMENT_TIMEOUT_MS = int(os.getenv("PG_STATEMENT_TIMEOUT_MS", "30000"))
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    database = make_url(url).database
+    return not database or database == ":memory:" or database.startswith("file::memory:")
+
+
+def engine_options(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """Keyword arguments for ``create_engine``/``create_async_engine``."""
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        if _is_memory_sqlite(url):
+            # Each pooled connection would get its own empty database
+            return {"connect_args": {"check_same_thread": False}} if not is_async else {}
+        options: Dict[str, Any] = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": SQLITE_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+        }
+        if is_async:
+            options["poolclass"] = AsyncAdaptedQueuePool
+        else:
+            options["poolclass"] = QueuePool
+            options["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+        return options
+    if backend == "postgresql":
+        options = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": True,
+        }
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(PG_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={PG_STATEMENT_TIMEOUT_MS}"}
+        return options
+    return {}
+
+
+def configure_engine(engine: Engine, url: str, cache_kb: int = SQLITE_CACHE_KB) -> Engine:
+    """Attach per-connection setup and pool metrics to a (sync) engine.
+    ``cache_kb`` is the SQLite page cache of each connection."""
+    if is_sqlite(url) and not _is_memory_sqlite(url):
+        event.listen(engine, "connect", partial(_apply_sqlite_pragmas, cache_kb=cache_kb))
+    track_pool(engine.pool)
+    return engine
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record, cache_kb: int = SQLITE_CACHE_KB) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{cache_kb}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+# Pool metrics --------------------------------------------------------
+class PoolMetrics:
+    """Cumulative counters fed by pool events."""
+
+    def __init__(self) -> None:
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def bump(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+        }
+
+
+_metrics: Dict[int, PoolMetrics] = {}
+
+
+def track_pool(pool: Pool) -> PoolMetrics:
+    metrics = _metrics.get(id(pool))
+    if metrics is not None:
+        return metrics
+    metrics = _metrics[id(pool)] = PoolMetrics()
+    event.listen(pool, "connect", lambda *_: metrics.bump("connects"))
+    event.listen(pool, "checkout", lambda *_: metrics.bump("checkouts"))
+    event.listen(pool, "checkin", lambda *_: metrics.bump("checkins"))
+    event.listen(pool, "invalidate", lambda *_: metrics.bump("invalidations"))
+    return metrics
+
+
+def forget_pool(pool: Pool) -> None:
+    """Drop a disposed pool's metrics so its id can be reused."""
+    _metrics.pop(id(pool), None)
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    pool = engine.pool
+    status: Dict[str, Any] = {"dialect": engine.dialect.name, "pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    metrics = _metrics.get(id(pool))
+    if metrics:
+        status.update(metrics.as_dict())
+    return status
+
+
+__all__ = ["configure_engine", "engine_options", "forget_pool", "is_sqlite", "pool_status", "track_pool"]
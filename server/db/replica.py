@@ -0,0 +1,189 @@
+"""Read-replica routing.
+
+With ``DATABASE_REPLICA_URL`` set, ``get_session`` binds GET and HEAD
+requests to the replica and everything else to the primary. Read-your-writes
+holds per client: when a request commits on the primary, the response sets
+a cookie carrying the primary's write position, and while that cookie is
+present reads go to the primary until the replica has replayed past it.
+
+Write positions are backend specific:
+
+* Postgres: the WAL LSN, compared with ``pg_last_wal_replay_lsn()``.
+* SQLite primary and replica: a local stand-in, ``SQLiteReplicator``, which
+  copies the primary file into the replica every ``REPLICA_SYNC_INTERVAL``
+  seconds; the position is the commit time, compared with the start of the
+  last completed copy.
+* Anything else: the commit time, trusted after ``REPLICA_MAX_LAG`` seconds.
+
+Local stand-in with two SQLite files:
+
+    DATABASE_REPLICA_URL=sqlite:///./copdify-replica.db uvicorn server.main:app
+
+and with two Postgres instances, the ``replica`` profile in
+``infra/docker-compose.yml``.
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+REPLICA_COOKIE = os.getenv("REPLICA_COOKIE", "copd_write_pos")
+# After this long the replica is assumed to have caught up regardless
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "60"))
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+REPLICA_SYNC_INTERVAL = float(os.getenv("REPLICA_SYNC_INTERVAL", "1"))
+
+_SAFE_METHODS = {"GET", "HEAD"}
+
+# Per-request holder for the write position of the request's last commit
+_request_writes: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("request_writes", default=None)
+
+
+class SQLiteReplicator:
+    """Stand-in for streaming replication between two SQLite files."""
+
+    def __init__(self, primary_path: str, replica_path: str, interval: float = REPLICA_SYNC_INTERVAL) -> None:
+        self.primary_path = primary_path
+        self.replica_path = replica_path
+        self.interval = interval
+        self.synced_through = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sync(self) -> None:
+        started = time.time()
+        source = sqlite3.connect(self.primary_path)
+        target = sqlite3.connect(self.replica_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        self.synced_through = started
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.sync()
+        self._thread = threading.Thread(target=self._loop, name="sqlite-replicator", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sync()
+            except Exception:  # noqa: BLE001 - retried on the next interval
+                logger.exception("Replica sync failed")
+
+
+class ReplicaRouter:
+    """Chooses the engine for a request and tracks write positions."""
+
+    def __init__(self, primary: Engine, replica: Engine) -> None:
+        self.primary = primary
+        self.replica = replica
+        self.backend = primary.dialect.name
+        self.replicator: Optional[SQLiteReplicator] = None
+        if self.backend == "sqlite" and replica.dialect.name == "sqlite":
+            self.replicator = SQLiteReplicator(make_url(str(primary.url)).database, make_url(str(replica.url)).database)
+
+    def engine_for(self, method: str, position: Optional[str]) -> Engine:
+        if method not in _SAFE_METHODS:
+            return self.primary
+        if position:
+            try:
+                if not self.caught_up(position):
+                    return self.primary
+            except Exception:  # noqa: BLE001 - an unreachable replica cannot be caught up
+                logger.warning("Replica position check failed; reading from the primary", exc_info=True)
+                return self.primary
+        return self.replica
+
+    def write_position(self) -> str:
+        if self.backend == "postgresql":
+            with self.primary.connect() as conn:
+                return conn.execute(text("SELECT pg_current_wal_lsn()::text")).scalar_one()
+        return repr(time.time())
+
+    def caught_up(self, position: str) -> bool:
+        if self.backend == "postgresql":
+            with self.replica.connect() as conn:
+                replayed = conn.execute(
+                    text("SELECT pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn)"), {"lsn": position}
+                ).scalar()
+            # NULL: the "replica" is not in recovery, so it has every write
+            return replayed is None or replayed
+        written = float(position)
+        if self.replicator is not None:
+            return self.replicator.synced_through >= written
+        return time.time() - written >= REPLICA_MAX_LAG
+
+    def start(self) -> None:
+        if self.replicator:
+            self.replicator.start()
+
+    def stop(self) -> None:
+        if self.replicator:
+            self.replicator.stop()
+
+    def track_writes(self) -> None:
+        """Record the primary's position after every commit that wrote,
+        for the request that made it."""
+        event.listen(Session, "after_flush", _mark_flushed)
+        event.listen(Session, "after_commit", self._after_commit)
+
+    def _after_commit(self, session: Session) -> None:
+        if not session.info.pop("replica_wrote", False):
+            return
+        writes = _request_writes.get()
+        if writes is not None:
+            writes["position"] = self.write_position()
+
+
+def _mark_flushed(session: Session, flush_context) -> None:
+    session.info["replica_wrote"] = True
+
+
+class ReadYourWritesMiddleware:
+    """Sets the write-position cookie on responses to requests that wrote."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        writes: dict = {}
+        token = _request_writes.set(writes)
+
+        async def send_with_cookie(message) -> None:
+            if message["type"] == "http.response.start" and "position" in writes:
+                cookie = f"{REPLICA_COOKIE}={writes['position']}; Max-Age={REPLICA_STICKY_SECONDS}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _request_writes.reset(token)
+
+
+__all__ = ["REPLICA_COOKIE", "ReadYourWritesMiddleware", "ReplicaRouter", "SQLiteReplicator"]
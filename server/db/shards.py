@@ -0,0 +1,219 @@
+"""Per-plan database shards.
+
+With ``STORAGE_MODE=sharded`` each plan's content lives in its own SQLite
+file under ``SHARD_DIR``. A heavy import into one plan then holds only that
+file's write lock, and writes to other plans carry on in parallel.
+``DATABASE_URL`` becomes the catalogue. It lists the plans and keeps
+everything that is not plan content: units, TTR rules and the audit log.
+
+A plan is created in the catalogue, which assigns its id. When that commit
+lands, the plan row is copied into a new shard under the same id. The new
+shard is cloned from an empty, fully migrated template, so the migrations
+run once per process rather than once per plan.
+
+``get_session`` sends a request to the shard of the plan it names, in the
+path, the ``plan_id`` query parameter or the JSON body's ``plan_id``.
+Requests that name no plan use the catalogue. Plan content routes addressed
+by a child id (``/factors/{factor_id}``, ``/ttr/apply``, export products and
+jobs, ...) must then pass ``?plan_id=``: child ids are only unique within a
+shard, and without it they answer 400 rather than read the catalogue.
+Catalogue rows keep the plan's name and reference times. The revision
+counter is only bumped in the shard, so anything that needs it (the CONOPS
+cache key, archive manifests) reads it there.
+
+Shard engines are cached up to ``SHARD_CACHE_SIZE``. The least recently
+used one is disposed to make room. With that many engines open, each gets
+a small profile: ``SHARD_POOL_SIZE`` connections plus ``SHARD_MAX_OVERFLOW``,
+each with a ``SHARD_CACHE_KB`` page cache. The large pool and cache of
+``server.db.profiles`` are for the catalogue only. Shards opened after a deploy are
+migrated on first use, and ``python -m server.db.migrations upgrade`` also
+upgrades every shard on disk.
+
+    STORAGE_MODE=sharded SHARD_DIR=./shards uvicorn server.main:app
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from server.db.migrations import ensure_schema, upgrade
+from server.db.models.core import Plan
+from server.db.profiles import configure_engine, engine_options, forget_pool, is_sqlite
+
+logger = logging.getLogger(__name__)
+
+STORAGE_MODE = os.getenv("STORAGE_MODE", "single")
+SHARD_DIR = os.getenv("SHARD_DIR", "./shards")
+SHARD_CACHE_SIZE = int(os.getenv("SHARD_CACHE_SIZE", "64"))
+# Per shard engine; worst case SHARD_CACHE_SIZE x (pool + overflow) connections
+SHARD_POOL_SIZE = int(os.getenv("SHARD_POOL_SIZE", "4"))
+SHARD_MAX_OVERFLOW = int(os.getenv("SHARD_MAX_OVERFLOW", "4"))
+SHARD_CACHE_KB = int(os.getenv("SHARD_CACHE_KB", str(4 * 1024)))
+
+_TEMPLATE = "_template.db"
+_NEW_PLANS = "shard_new_plans"
+
+
+class ShardRouter:
+    """Maps plan ids to shard engines and provisions shards for new plans."""
+
+    def __init__(self, catalogue: Engine, directory: str = SHARD_DIR, capacity: int = SHARD_CACHE_SIZE) -> None:
+        self.catalogue = catalogue
+        self.directory = Path(directory)
+        self.capacity = max(capacity, 1)
+        self.opened = 0
+        self.evicted = 0
+        self._engines: "OrderedDict[int, Engine]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._template_lock = threading.Lock()
+        self._template_ready = False
+
+    def path(self, plan_id: int) -> Path:
+        return self.directory / f"plan-{plan_id}.db"
+
+    def plan_ids(self) -> List[int]:
+        """Plans with a shard on disk."""
+        return sorted(int(path.stem.split("-", 1)[1]) for path in self.directory.glob("plan-*.db"))
+
+    def engine_for(self, plan_id: Optional[int]) -> Engine:
+        if plan_id is None:
+            return self.catalogue
+        with self._lock:
+            engine = self._engines.get(plan_id)
+            if engine is not None:
+                self._engines.move_to_end(plan_id)
+                return engine
+        if not self.path(plan_id).exists():
+            # Unknown plan: the catalogue answers, with a 404
+            return self.catalogue
+        return self._open(plan_id)
+
+    def _open(self, plan_id: int, check_schema: bool = True) -> Engine:
+        url = f"sqlite:///{self.path(plan_id)}"
+        options = {**engine_options(url), "pool_size": SHARD_POOL_SIZE, "max_overflow": SHARD_MAX_OVERFLOW}
+        engine = configure_engine(create_engine(url, echo=False, **options), url, cache_kb=SHARD_CACHE_KB)
+        if check_schema:
+            ensure_schema(engine, auto_migrate=True)
+        evicted: List[Engine] = []
+        with self._lock:
+            existing = self._engines.get(plan_id)
+            if existing is not None:
+                # Another thread opened it first
+                self._engines.move_to_end(plan_id)
+                evicted.append(engine)
+                engine = existing
+            else:
+                self._engines[plan_id] = engine
+                self.opened += 1
+                while len(self._engines) > self.capacity:
+                    evicted.append(self._engines.popitem(last=False)[1])
+                    self.evicted += 1
+        for old in evicted:
+            # Connections still checked out close when they are returned
+            forget_pool(old.pool)
+            old.dispose()
+        return engine
+
+    # Provisioning ----------------------------------------------------
+    def track_plans(self) -> None:
+        """Create a shard for every plan committed to the catalogue."""
+        event.listen(Session, "after_flush", self._collect_new_plans)
+        event.listen(Session, "after_commit", self._provision_new_plans)
+        event.listen(Session, "after_rollback", lambda session: session.info.pop(_NEW_PLANS, None))
+
+    def _collect_new_plans(self, session: Session, flush_context) -> None:
+        if session.bind is not self.catalogue:
+            return
+        rows = session.info.setdefault(_NEW_PLANS, [])
+        for obj in session.new:
+            if isinstance(obj, Plan):
+                rows.append({column.key: getattr(obj, column.key) for column in Plan.__table__.columns})
+
+    def _provision_new_plans(self, session: Session) -> None:
+        for row in session.info.pop(_NEW_PLANS, []):
+            self.provision(row)
+
+    def provision(self, plan_row: Dict) -> Engine:
+        """Clone the template into a shard for ``plan_row`` and insert it."""
+        plan_id = plan_row["id"]
+        path = self.path(plan_id)
+        if not path.exists():
+            template = self._template()
+            source = sqlite3.connect(template)
+            target = sqlite3.connect(path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+        engine = self._open(plan_id, check_schema=False)
+        with engine.begin() as conn:
+            conn.execute(insert(Plan.__table__).values(**plan_row).prefix_with("OR IGNORE"))
+        logger.info("Provisioned shard for plan %s", plan_id)
+        return engine
+
+    def warm(self) -> None:
+        """Migrate the template ahead of the first new plan."""
+        self._template()
+
+    def _template(self) -> Path:
+        path = self.directory / _TEMPLATE
+        with self._template_lock:
+            if not self._template_ready:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                url = f"sqlite:///{path}"
+                engine = create_engine(url, echo=False)
+                try:
+                    upgrade(engine)
+                finally:
+                    engine.dispose()
+                self._template_ready = True
+        return path
+
+    def upgrade_all(self) -> int:
+        """Bring every shard on disk up to the current schema."""
+        plan_ids = self.plan_ids()
+        for plan_id in plan_ids:
+            ensure_schema(self.engine_for(plan_id), auto_migrate=True)
+        return len(plan_ids)
+
+    def dispose(self) -> None:
+        with self._lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+        for engine in engines:
+            forget_pool(engine.pool)
+            engine.dispose()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            cached = len(self._engines)
+        return {
+            "shards": len(self.plan_ids()),
+            "cached": cached,
+            "capacity": self.capacity,
+            "opened": self.opened,
+            "evicted": self.evicted,
+        }
+
+
+def sharded(url: str) -> bool:
+    if STORAGE_MODE == "single":
+        return False
+    if STORAGE_MODE != "sharded":
+        raise RuntimeError(f"Unknown STORAGE_MODE {STORAGE_MODE!r}; use 'single' or 'sharded'")
+    if not is_sqlite(url):
+        raise RuntimeError("STORAGE_MODE=sharded needs a SQLite DATABASE_URL")
+    return True
+
+
+__all__ = ["SHARD_DIR", "STORAGE_MODE", "ShardRouter", "sharded"]
@@ -0,0 +1,292 @@
+"""Planar geometry for area queries, in plain Python.
+
+Areas are GeoJSON in lon/lat (EPSG:4326) and only ever need bounding boxes,
+intersection with a box, point containment and short distances, so
+coordinates are treated as planar. ``Shape`` is a parsed GeoJSON document flattened into polygons
+(lists of rings), lines and points; ``RTree`` is a static, STR-packed
+R-tree over bounding boxes.
+"""
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Generic, Iterable, List, Optional, Sequence, Tuple, TypeVar, Union
+
+Point = Tuple[float, float]
+Ring = List[Point]
+BBox = Tuple[float, float, float, float]  # min_x, min_y, max_x, max_y
+
+T = TypeVar("T")
+
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LON = 111.320
+
+
+@dataclass
+class Shape:
+    polygons: List[List[Ring]] = field(default_factory=list)
+    lines: List[List[Point]] = field(default_factory=list)
+    points: List[Point] = field(default_factory=list)
+    bbox: Optional[BBox] = None
+
+    def is_empty(self) -> bool:
+        return not (self.polygons or self.lines or self.points)
+
+    def intersects_bbox(self, box: BBox) -> bool:
+        if self.bbox is None or not bboxes_overlap(self.bbox, box):
+            return False
+        if any(_point_in_box(point, box) for point in self.points):
+            return True
+        for line in self.lines:
+            if any(_segment_hits_box(a, b, box) for a, b in zip(line, line[1:])):
+                return True
+        corner = (box[0], box[1])
+        for rings in self.polygons:
+            for ring in rings:
+                if any(_segment_hits_box(a, b, box) for a, b in zip(ring, ring[1:])):
+                    return True
+            # No edge touches the box: it is wholly inside or outside
+            if _point_in_rings(corner, rings):
+                return True
+        return False
+
+    def contains_point(self, x: float, y: float) -> bool:
+        return self.intersects_bbox((x, y, x, y))
+
+    def distance_km(self, lon: float, lat: float) -> float:
+        """Approximate ground distance from a lon/lat position, 0 inside.
+
+        Uses an equirectangular projection centred on the position, which
+        is accurate to well under a percent over the tens of kilometres
+        triggers deal in.
+        """
+        if self.contains_point(lon, lat):
+            return 0.0
+        kx = KM_PER_DEGREE_LON * math.cos(math.radians(lat))
+        ky = KM_PER_DEGREE_LAT
+        best = math.inf
+        for x, y in self.points:
+            best = min(best, math.hypot((x - lon) * kx, (y - lat) * ky))
+        for path in chain(self.lines, (ring for rings in self.polygons for ring in rings)):
+            for (x1, y1), (x2, y2) in zip(path, path[1:]):
+                best = min(best, _segment_distance((x1 - lon) * kx, (y1 - lat) * ky, (x2 - lon) * kx, (y2 - lat) * ky))
+        return best
+
+    def buffered_bbox(self, km: float) -> BBox:
+        """``bbox`` grown by ``km`` on every side, for index lookups."""
+        min_x, min_y, max_x, max_y = self.bbox
+        widest = min(max(abs(min_y), abs(max_y)) + km / KM_PER_DEGREE_LAT, 89.0)
+        dx = km / (KM_PER_DEGREE_LON * math.cos(math.radians(widest)))
+        dy = km / KM_PER_DEGREE_LAT
+        return min_x - dx, min_y - dy, max_x + dx, max_y + dy
+
+
+def parse_geojson(document: Union[str, dict]) -> Shape:
+    """Flatten a GeoJSON geometry, Feature or FeatureCollection. Raises
+    ``ValueError`` for anything that is not valid GeoJSON geometry."""
+    if isinstance(document, str):
+        try:
+            document = json.loads(document)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Invalid GeoJSON: {exc}") from exc
+    shape = Shape()
+    _collect(document, shape)
+    if shape.is_empty():
+        raise ValueError("GeoJSON contains no geometry")
+    shape.bbox = _bbox(shape)
+    return shape
+
+
+def _collect(node, shape: Shape) -> None:
+    if not isinstance(node, dict):
+        raise ValueError("Invalid GeoJSON: expected an object")
+    kind = node.get("type")
+    coords = node.get("coordinates")
+    try:
+        if kind == "FeatureCollection":
+            for feature in node.get("features") or []:
+                _collect(feature, shape)
+        elif kind == "Feature":
+            if node.get("geometry"):
+                _collect(node["geometry"], shape)
+        elif kind == "GeometryCollection":
+            for geometry in node.get("geometries") or []:
+                _collect(geometry, shape)
+        elif kind == "Point":
+            shape.points.append(_point(coords))
+        elif kind == "MultiPoint":
+            shape.points.extend(_point(point) for point in coords)
+        elif kind == "LineString":
+            shape.lines.append([_point(point) for point in coords])
+        elif kind == "MultiLineString":
+            shape.lines.extend([_point(point) for point in line] for line in coords)
+        elif kind == "Polygon":
+            shape.polygons.append(_rings(coords))
+        elif kind == "MultiPolygon":
+            shape.polygons.extend(_rings(polygon) for polygon in coords)
+        else:
+            raise ValueError(f"Unsupported GeoJSON type {kind!r}")
+    except (TypeError, IndexError) as exc:
+        raise ValueError(f"Invalid {kind} coordinates") from exc
+
+
+def _point(coords: Sequence) -> Point:
+    x, y = float(coords[0]), float(coords[1])
+    if not (math.isfinite(x) and math.isfinite(y)):
+        raise ValueError("Coordinates must be finite")
+    return x, y
+
+
+def _rings(coords: Sequence) -> List[Ring]:
+    rings = []
+    for ring_coords in coords:
+        ring = [_point(point) for point in ring_coords]
+        if len(ring) < 3:
+            raise ValueError("Polygon rings need at least three positions")
+        if ring[0] != ring[-1]:
+            ring.append(ring[0])
+        rings.append(ring)
+    if not rings:
+        raise ValueError("Polygon has no rings")
+    return rings
+
+
+def _bbox(shape: Shape) -> BBox:
+    xs: List[float] = []
+    ys: List[float] = []
+    for x, y in shape.points:
+        xs.append(x)
+        ys.append(y)
+    for line in shape.lines:
+        xs.extend(x for x, _ in line)
+        ys.extend(y for _, y in line)
+    for rings in shape.polygons:
+        # Holes lie inside the outer ring
+        xs.extend(x for x, _ in rings[0])
+        ys.extend(y for _, y in rings[0])
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def bboxes_overlap(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def parse_bbox(value: str) -> BBox:
+    """``min_x,min_y,max_x,max_y`` as used in query strings."""
+    try:
+        min_x, min_y, max_x, max_y = (float(part) for part in value.split(","))
+    except ValueError as exc:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat") from exc
+    if min_x > max_x or min_y > max_y:
+        raise ValueError("bbox minimum exceeds maximum")
+    return min_x, min_y, max_x, max_y
+
+
+def _point_in_box(point: Point, box: BBox) -> bool:
+    return box[0] <= point[0] <= box[2] and box[1] <= point[1] <= box[3]
+
+
+def _point_in_rings(point: Point, rings: List[Ring]) -> bool:
+    """Even-odd rule over all rings, so holes are excluded."""
+    x, y = point
+    inside = False
+    for ring in rings:
+        for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+            if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+                inside = not inside
+    return inside
+
+
+def _segment_distance(x1: float, y1: float, x2: float, y2: float) -> float:
+    """Distance from the origin to segment (x1, y1)-(x2, y2)."""
+    dx, dy = x2 - x1, y2 - y1
+    length = dx * dx + dy * dy
+    t = 0.0 if length == 0 else max(0.0, min(1.0, -(x1 * dx + y1 * dy) / length))
+    return math.hypot(x1 + t * dx, y1 + t * dy)
+
+
+def _segment_hits_box(a: Point, b: Point, box: BBox) -> bool:
+    """Liang-Barsky: does segment ``ab`` touch the closed box?"""
+    x0, y0 = a
+    dx, dy = b[0] - x0, b[1] - y0
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x0 - box[0]), (dx, box[2] - x0), (-dy, y0 - box[1]), (dy, box[3] - y0)):
+        if p == 0:
+            if q < 0:
+                return False
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return False
+            t0 = max(t0, t)
+        else:
+            if t < t0:
+                return False
+            t1 = min(t1, t)
+    return True
+
+
+class RTree(Generic[T]):
+    """Static R-tree bulk-loaded with Sort-Tile-Recursive packing.
+
+    Built once from ``(bbox, item)`` pairs and never modified; ``search``
+    visits only nodes whose boxes overlap the query, so lookups are
+    logarithmic in the number of items for selective queries.
+    """
+
+    __slots__ = ("node_size", "_root", "size")
+
+    def __init__(self, entries: Iterable[Tuple[BBox, T]], node_size: int = 16) -> None:
+        self.node_size = node_size
+        level: List[tuple] = [(bbox, True, item) for bbox, item in entries]
+        self.size = len(level)
+        if not level:
+            self._root = None
+            return
+        while len(level) > 1:
+            level = self._pack(level)
+        self._root = level[0]
+
+    def _pack(self, nodes: List[tuple]) -> List[tuple]:
+        size = self.node_size
+        leaf_count = math.ceil(len(nodes) / size)
+        slice_count = math.ceil(math.sqrt(leaf_count))
+        nodes = sorted(nodes, key=lambda node: node[0][0] + node[0][2])
+        slice_len = slice_count * size
+        parents = []
+        for start in range(0, len(nodes), slice_len):
+            vertical = sorted(nodes[start : start + slice_len], key=lambda node: node[0][1] + node[0][3])
+            for group_start in range(0, len(vertical), size):
+                children = vertical[group_start : group_start + size]
+                bbox = (
+                    min(child[0][0] for child in children),
+                    min(child[0][1] for child in children),
+                    max(child[0][2] for child in children),
+                    max(child[0][3] for child in children),
+                )
+                parents.append((bbox, False, children))
+        return parents
+
+    def search(self, box: BBox) -> List[T]:
+        found: List[T] = []
+        if self._root is None:
+            return found
+        stack = [self._root]
+        while stack:
+            bbox, is_leaf, payload = stack.pop()
+            if not bboxes_overlap(bbox, box):
+                continue
+            if is_leaf:
+                found.append(payload)
+            else:
+                stack.extend(payload)
+        return found
+
+    def __len__(self) -> int:
+        return self.size
+
+
+__all__ = ["BBox", "RTree", "Shape", "bboxes_overlap", "parse_bbox", "parse_geojson"]
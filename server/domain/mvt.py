@@ -0,0 +1,392 @@
+"""Mapbox Vector Tile (MVT 2.1) encoding for area geometry, in plain Python.
+
+Shapes are projected once to Web Mercator "world" coordinates (0..1 on
+both axes, y down), simplified with Douglas-Peucker at a tolerance of about
+one tile unit for the zoom level, then clipped to the tile plus a small
+buffer and quantized to the tile's integer grid. ``encode_layer`` writes
+the protobuf by hand; the format needs only varints and length-delimited
+fields.
+"""
+from __future__ import annotations
+
+import math
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from server.domain.geo import BBox, Point, Shape
+
+EXTENT = 4096
+BUFFER = 64  # tile units drawn beyond each edge so strokes meet across tiles
+MAX_LATITUDE = 85.0511287798
+
+POINT, LINESTRING, POLYGON = 1, 2, 3
+_MOVE_TO, _LINE_TO, _CLOSE_PATH = 1, 2, 7
+
+Value = Union[str, int, float, bool]
+
+
+@dataclass
+class MercatorShape:
+    """A ``Shape`` in world coordinates."""
+
+    polygons: List[List[List[Point]]] = field(default_factory=list)
+    lines: List[List[Point]] = field(default_factory=list)
+    points: List[Point] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not (self.polygons or self.lines or self.points)
+
+
+@dataclass
+class Feature:
+    id: int
+    shape: MercatorShape
+    properties: Dict[str, Value]
+
+
+def lonlat_to_world(lon: float, lat: float) -> Point:
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    sin_lat = math.sin(math.radians(lat))
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return x, y
+
+
+def tile_bounds(z: int, x: int, y: int, buffer: float = 0.0) -> BBox:
+    """Lon/lat box of a tile, grown by ``buffer`` tile units."""
+    n = 2**z
+    pad = buffer / EXTENT
+
+    def lon(tx: float) -> float:
+        return tx / n * 360.0 - 180.0
+
+    def lat(ty: float) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return lon(x - pad), lat(y + 1 + pad), lon(x + 1 + pad), lat(y - pad)
+
+
+def project(shape: Shape) -> MercatorShape:
+    return MercatorShape(
+        polygons=[[[lonlat_to_world(*p) for p in ring] for ring in rings] for rings in shape.polygons],
+        lines=[[lonlat_to_world(*p) for p in line] for line in shape.lines],
+        points=[lonlat_to_world(*p) for p in shape.points],
+    )
+
+
+def simplify_shape(shape: MercatorShape, tolerance: float) -> MercatorShape:
+    """Douglas-Peucker on every path; rings that collapse are dropped, and a
+    polygon whose outer ring collapses is dropped with its holes."""
+    polygons = []
+    for rings in shape.polygons:
+        simplified = [simplify(ring, tolerance) for ring in rings]
+        if len(simplified[0]) < 4:
+            continue
+        polygons.append([simplified[0]] + [ring for ring in simplified[1:] if len(ring) >= 4])
+    lines = [simplify(line, tolerance) for line in shape.lines]
+    return MercatorShape(polygons=polygons, lines=[line for line in lines if len(line) >= 2], points=shape.points)
+
+
+def simplify(path: Sequence[Point], tolerance: float) -> List[Point]:
+    if len(path) <= 2:
+        return list(path)
+    sq_tolerance = tolerance * tolerance
+    keep = [False] * len(path)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(path) - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = path[first]
+        bx, by = path[last]
+        worst, index = sq_tolerance, 0
+        for i in range(first + 1, last):
+            distance = _sq_segment_distance(path[i], ax, ay, bx, by)
+            if distance > worst:
+                worst, index = distance, i
+        if index:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [point for point, kept in zip(path, keep) if kept]
+
+
+def _sq_segment_distance(point: Point, ax: float, ay: float, bx: float, by: float) -> float:
+    px, py = point
+    dx, dy = bx - ax, by - ay
+    length = dx * dx + dy * dy
+    if length:
+        t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length))
+        ax, ay = ax + t * dx, ay + t * dy
+    return (px - ax) ** 2 + (py - ay) ** 2
+
+
+def encode_layer(name: str, features: Sequence[Feature], z: int, x: int, y: int) -> bytes:
+    """A one-layer tile; empty bytes when nothing survives clipping."""
+    scale = EXTENT * 2**z
+    box = (-BUFFER, -BUFFER, EXTENT + BUFFER, EXTENT + BUFFER)
+    keys: Dict[str, int] = {}
+    values: Dict[Tuple[type, Value], int] = {}
+    body = bytearray()
+    for feature in features:
+        for geom_type, geometry in _tile_geometries(feature.shape, scale, x * EXTENT, y * EXTENT, box):
+            tags = []
+            for key, value in feature.properties.items():
+                if value is None:
+                    continue
+                tags.append(keys.setdefault(key, len(keys)))
+                tags.append(values.setdefault((type(value), value), len(values)))
+            message = bytearray()
+            _field_varint(message, 1, feature.id)
+            _field_packed(message, 2, tags)
+            _field_varint(message, 3, geom_type)
+            _field_packed(message, 4, geometry)
+            _field_bytes(body, 2, message)
+    if not body:
+        return b""
+
+    layer = bytearray()
+    _field_varint(layer, 15, 2)
+    _field_bytes(layer, 1, name.encode())
+    layer += body
+    for key in keys:
+        _field_bytes(layer, 3, key.encode())
+    for (_, value) in values:
+        _field_bytes(layer, 4, _encode_value(value))
+    _field_varint(layer, 5, EXTENT)
+    tile = bytearray()
+    _field_bytes(tile, 3, layer)
+    return bytes(tile)
+
+
+def _tile_geometries(shape: MercatorShape, scale: float, offset_x: float, offset_y: float, box: BBox):
+    def to_tile(path: Sequence[Point]) -> List[Point]:
+        return [(px * scale - offset_x, py * scale - offset_y) for px, py in path]
+
+    polygons = []
+    for rings in shape.polygons:
+        quantized = []
+        for index, ring in enumerate(rings):
+            ring = _quantize(_clip_ring(to_tile(ring), box), closed=True)
+            area = _signed_area(ring) if len(ring) >= 3 else 0
+            if area == 0:
+                if index == 0:
+                    break
+                continue
+            if index and abs(area) >= abs(_signed_area(quantized[0])):
+                # A hole covering the whole clipped outline leaves nothing
+                quantized = []
+                break
+            # Exterior rings wind positive in tile coordinates, holes negative
+            if (area > 0) != (index == 0):
+                ring.reverse()
+            quantized.append(ring)
+        if quantized:
+            polygons.append(quantized)
+    if polygons:
+        yield POLYGON, _encode_paths([ring for rings in polygons for ring in rings], closed=True)
+
+    lines = []
+    for line in shape.lines:
+        for piece in _clip_line(to_tile(line), box):
+            piece = _quantize(piece, closed=False)
+            if len(piece) >= 2:
+                lines.append(piece)
+    if lines:
+        yield LINESTRING, _encode_paths(lines, closed=False)
+
+    points = [
+        (round(px), round(py))
+        for px, py in to_tile(shape.points)
+        if box[0] <= px <= box[2] and box[1] <= py <= box[3]
+    ]
+    if points:
+        geometry = [_command(_MOVE_TO, len(points))]
+        cx = cy = 0
+        for px, py in points:
+            geometry += [_zigzag(px - cx), _zigzag(py - cy)]
+            cx, cy = px, py
+        yield POINT, geometry
+
+
+def _clip_ring(ring: List[Point], box: BBox) -> List[Point]:
+    """Sutherland-Hodgman against each edge of ``box``; edges that run
+    along the box are harmless because they fall in the buffer."""
+    min_x, min_y, max_x, max_y = box
+    edges = (
+        (lambda p: p[0] >= min_x, lambda a, b: _cross_x(a, b, min_x)),
+        (lambda p: p[0] <= max_x, lambda a, b: _cross_x(a, b, max_x)),
+        (lambda p: p[1] >= min_y, lambda a, b: _cross_y(a, b, min_y)),
+        (lambda p: p[1] <= max_y, lambda a, b: _cross_y(a, b, max_y)),
+    )
+    points = ring[:-1] if ring and ring[0] == ring[-1] else ring
+    for inside, cross in edges:
+        if not points:
+            break
+        clipped = []
+        previous = points[-1]
+        previous_in = inside(previous)
+        for point in points:
+            point_in = inside(point)
+            if point_in != previous_in:
+                clipped.append(cross(previous, point))
+            if point_in:
+                clipped.append(point)
+            previous, previous_in = point, point_in
+        points = clipped
+    return points
+
+
+def _clip_line(line: List[Point], box: BBox) -> List[List[Point]]:
+    """Liang-Barsky per segment, joining consecutive visible segments."""
+    pieces: List[List[Point]] = []
+    current: List[Point] = []
+    for a, b in zip(line, line[1:]):
+        segment = _clip_segment(a, b, box)
+        if segment is None:
+            if current:
+                pieces.append(current)
+                current = []
+            continue
+        start, end = segment
+        if current and current[-1] != start:
+            pieces.append(current)
+            current = []
+        if not current:
+            current.append(start)
+        current.append(end)
+        if end != b:
+            pieces.append(current)
+            current = []
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _clip_segment(a: Point, b: Point, box: BBox) -> Optional[Tuple[Point, Point]]:
+    x0, y0 = a
+    dx, dy = b[0] - x0, b[1] - y0
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x0 - box[0]), (dx, box[2] - x0), (-dy, y0 - box[1]), (dy, box[3] - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return None
+            t0 = max(t0, t)
+        else:
+            if t < t0:
+                return None
+            t1 = min(t1, t)
+    start = a if t0 == 0.0 else (x0 + t0 * dx, y0 + t0 * dy)
+    end = b if t1 == 1.0 else (x0 + t1 * dx, y0 + t1 * dy)
+    return start, end
+
+
+def _cross_x(a: Point, b: Point, x: float) -> Point:
+    return x, a[1] + (b[1] - a[1]) * (x - a[0]) / (b[0] - a[0])
+
+
+def _cross_y(a: Point, b: Point, y: float) -> Point:
+    return a[0] + (b[0] - a[0]) * (y - a[1]) / (b[1] - a[1]), y
+
+
+def _quantize(path: Sequence[Point], closed: bool) -> List[Tuple[int, int]]:
+    quantized: List[Tuple[int, int]] = []
+    for px, py in path:
+        point = (round(px), round(py))
+        if not quantized or quantized[-1] != point:
+            quantized.append(point)
+    if closed:
+        while len(quantized) > 1 and quantized[0] == quantized[-1]:
+            quantized.pop()
+    return quantized
+
+
+def _signed_area(ring: Sequence[Tuple[int, int]]) -> int:
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]))
+
+
+def _encode_paths(paths: Sequence[Sequence[Tuple[int, int]]], closed: bool) -> List[int]:
+    geometry: List[int] = []
+    cx = cy = 0
+    for path in paths:
+        for index, (px, py) in enumerate(path):
+            if index == 0:
+                geometry.append(_command(_MOVE_TO, 1))
+            elif index == 1:
+                geometry.append(_command(_LINE_TO, len(path) - 1))
+            geometry += [_zigzag(px - cx), _zigzag(py - cy)]
+            cx, cy = px, py
+        if closed:
+            geometry.append(_command(_CLOSE_PATH, 1))
+    return geometry
+
+
+def _command(command: int, count: int) -> int:
+    return (command & 0x7) | (count << 3)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 31)
+
+
+def _encode_value(value: Value) -> bytes:
+    message = bytearray()
+    if isinstance(value, bool):
+        _field_varint(message, 7, int(value))
+    elif isinstance(value, int):
+        if value >= 0:
+            _field_varint(message, 5, value)
+        else:
+            _field_varint(message, 6, (value << 1) ^ (value >> 63))
+    elif isinstance(value, float):
+        _varint(message, 3 << 3 | 1)
+        message += struct.pack("<d", value)
+    else:
+        _field_bytes(message, 1, str(value).encode())
+    return bytes(message)
+
+
+def _varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _field_varint(out: bytearray, number: int, value: int) -> None:
+    _varint(out, number << 3)
+    _varint(out, value)
+
+
+def _field_bytes(out: bytearray, number: int, data: bytes) -> None:
+    _varint(out, number << 3 | 2)
+    _varint(out, len(data))
+    out += data
+
+
+def _field_packed(out: bytearray, number: int, values: Sequence[int]) -> None:
+    if not values:
+        return
+    packed = bytearray()
+    for value in values:
+        _varint(packed, value)
+    _field_bytes(out, number, packed)
+
+
+__all__ = [
+    "BUFFER",
+    "EXTENT",
+    "Feature",
+    "MercatorShape",
+    "encode_layer",
+    "lonlat_to_world",
+    "project",
+    "simplify",
+    "simplify_shape",
+    "tile_bounds",
+]
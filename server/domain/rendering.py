@@ -0,0 +1,185 @@
+"""Render CONOPS Markdown into office formats.
+
+Only the Markdown subset produced by ``ExportService`` is understood:
+``#``/``##`` headings, ``- `` bullets and plain lines. The writers have no
+third-party dependencies and no database imports so they can run in a
+spawned worker process.
+"""
+from __future__ import annotations
+
+import textwrap
+import zipfile
+import zlib
+from typing import BinaryIO, Iterator, List, Tuple
+from xml.sax.saxutils import escape
+
+FORMATS = {
+    "markdown": ("md", "text/markdown; charset=utf-8"),
+    "docx": ("docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    "pdf": ("pdf", "application/pdf"),
+}
+
+
+def render_document(fmt: str, markdown: str, path: str) -> None:
+    if fmt == "markdown":
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(markdown)
+    elif fmt == "docx":
+        render_docx(markdown, path)
+    elif fmt == "pdf":
+        with open(path, "wb") as handle:
+            render_pdf(markdown, handle)
+    else:
+        raise ValueError(f"Unsupported export format {fmt}")
+
+
+def _blocks(markdown: str) -> Iterator[Tuple[str, str]]:
+    """Classify each line as ('h1' | 'h2' | 'bullet' | 'text', text)."""
+    for line in markdown.splitlines():
+        if line.startswith("## "):
+            yield "h2", line[3:]
+        elif line.startswith("# "):
+            yield "h1", line[2:]
+        elif line.startswith("- "):
+            yield "bullet", line[2:]
+        else:
+            yield "text", line
+
+
+# DOCX ---------------------------------------------------------------
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+</Types>"""
+
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+_DOCUMENT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+_STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:rPr><w:sz w:val="21"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/><w:pPr><w:spacing w:before="240" w:after="120"/></w:pPr><w:rPr><w:b/><w:sz w:val="32"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/><w:basedOn w:val="Normal"/><w:pPr><w:spacing w:before="200" w:after="80"/></w:pPr><w:rPr><w:b/><w:sz w:val="26"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="ListBullet"><w:name w:val="List Bullet"/><w:basedOn w:val="Normal"/><w:pPr><w:ind w:left="360" w:hanging="240"/></w:pPr></w:style>
+</w:styles>"""
+
+_DOCX_STYLES = {"h1": "Heading1", "h2": "Heading2", "bullet": "ListBullet"}
+
+
+def render_docx(markdown: str, path: str) -> None:
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("word/_rels/document.xml.rels", _DOCUMENT_RELS)
+        archive.writestr("word/styles.xml", _STYLES)
+        with archive.open("word/document.xml", "w") as document:
+            document.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+            )
+            for kind, text in _blocks(markdown):
+                style = _DOCX_STYLES.get(kind)
+                if kind == "bullet":
+                    text = "• " + text
+                props = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+                paragraph = f'<w:p>{props}<w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+                document.write(paragraph.encode("utf-8"))
+            document.write(b"<w:sectPr/></w:body></w:document>")
+
+
+# PDF ----------------------------------------------------------------
+_PAGE_WIDTH, _PAGE_HEIGHT, _MARGIN = 595, 842, 50
+_PDF_STYLES = {
+    # kind: (font resource, size, leading, wrap width in characters)
+    "h1": ("F2", 16, 24, 55),
+    "h2": ("F2", 12, 20, 75),
+    "bullet": ("F1", 10, 14, 92),
+    "text": ("F1", 10, 14, 95),
+}
+
+
+def _pdf_text(text: str) -> str:
+    text = text.encode("cp1252", errors="replace").decode("cp1252")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _pdf_lines(markdown: str) -> Iterator[Tuple[str, int, int, str]]:
+    for kind, text in _blocks(markdown):
+        font, size, leading, width = _PDF_STYLES[kind]
+        wrapped = textwrap.wrap(text, width) or [""]
+        if kind == "bullet":
+            wrapped = ["\u2022 " + wrapped[0]] + ["   " + rest for rest in wrapped[1:]]
+        for piece in wrapped:
+            yield font, size, leading, piece
+
+
+def _pdf_pages(markdown: str) -> Iterator[bytes]:
+    commands: List[str] = []
+    y = _PAGE_HEIGHT - _MARGIN
+    for font, size, leading, text in _pdf_lines(markdown):
+        if y - leading < _MARGIN and commands:
+            yield "\n".join(commands).encode("cp1252")
+            commands, y = [], _PAGE_HEIGHT - _MARGIN
+        y -= leading
+        commands.append(f"BT /{font} {size} Tf {_MARGIN} {y} Td ({_pdf_text(text)}) Tj ET")
+    yield "\n".join(commands).encode("cp1252")
+
+
+class _PDFWriter:
+    def __init__(self, handle: BinaryIO) -> None:
+        self.handle = handle
+        self.offsets: dict[int, int] = {}
+        self.position = 0
+
+    def write(self, data: bytes) -> None:
+        self.handle.write(data)
+        self.position += len(data)
+
+    def obj(self, number: int, body: bytes) -> None:
+        self.offsets[number] = self.position
+        self.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+
+def render_pdf(markdown: str, handle: BinaryIO) -> None:
+    """Write a paginated, text-only PDF one page at a time."""
+    writer = _PDFWriter(handle)
+    writer.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    writer.obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    writer.obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    writer.obj(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+
+    kids: List[int] = []
+    number = 5
+    for content in _pdf_pages(markdown):
+        stream = zlib.compress(content)
+        writer.obj(number, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        writer.obj(
+            number + 1,
+            (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_PAGE_WIDTH} {_PAGE_HEIGHT}] "
+                f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {number} 0 R >>"
+            ).encode(),
+        )
+        kids.append(number + 1)
+        number += 2
+
+    writer.obj(2, f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(kids)} >>".encode())
+
+    xref_at = writer.position
+    writer.write(f"xref\n0 {number}\n0000000000 65535 f \n".encode())
+    for obj in range(1, number):
+        writer.write(f"{writer.offsets[obj]:010d} 00000 n \n".encode())
+    writer.write(f"trailer\n<< /Size {number} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode())
+
+
+__all__ = ["FORMATS", "render_document", "render_docx", "render_pdf"]
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -76,6 +76,21 @@ class AreaCreate(BaseModel):
     geojson: str
 
 
+class AreaRead(BaseModel):
+    id: int
+    plan_id: int
+    name: str
+    area_type: str
+    min_x: Optional[float] = None
+    min_y: Optional[float] = None
+    max_x: Optional[float] = None
+    max_y: Optional[float] = None
+    geojson: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
 class TaskCreate(BaseModel):
     name: str
     description: Optional[str] = None
@@ -123,6 +138,11 @@ class TTLRead(BaseModel):
         from_attributes = True
 
 
+class AreaSearchResult(BaseModel):
+    areas: List[AreaRead]
+    ttl: List[TTLRead]
+
+
 class FactorCreate(BaseModel):
     plan_id: int
     title: str
@@ -258,6 +278,31 @@ class DecisionRead(BaseModel):
         from_attributes = True
 
 
+class AuditLogRead(BaseModel):
+    id: int
+    plan_id: Optional[int]
+    action: str
+    actor: Optional[str]
+    payload: Optional[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class AuditLogPage(BaseModel):
+    items: List[AuditLogRead]
+    next_cursor: Optional[str] = None
+
+
+class AuditRetentionResult(BaseModel):
+    cutoff: datetime
+    archived: int
+    segments: List[str]
+    # True when another worker held the retention lease
+    skipped: bool = False
+
+
 class TTRApplyRequest(BaseModel):
     ttl_id: int
     context_overrides: dict = Field(default_factory=dict)
@@ -279,6 +324,46 @@ class ConopsExportResponse(BaseModel):
     product_id: int
     filename: str
     content: str
+    cached: bool = False
+
+
+class ArchiveRequest(BaseModel):
+    plan_ids: List[int]
+
+
+class ProductRead(BaseModel):
+    id: int
+    plan_id: int
+    coa_id: Optional[int]
+    plan_revision: Optional[int]
+    generated_at: datetime
+    summary: Optional[str]
+    # None while the product is still being streamed
+    encoding: Optional[str]
+    size: Optional[int]
+    stored_size: Optional[int]
+
+
+class ExportJobCreate(BaseModel):
+    plan_id: int
+    coa_id: Optional[int] = None
+    format: str = "docx"
+
+
+class ExportJobRead(BaseModel):
+    id: int
+    plan_id: int
+    coa_id: Optional[int]
+    format: str
+    plan_revision: int
+    status: str
+    product_id: Optional[int]
+    error: Optional[str]
+    created_at: datetime
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
 
 
 class RiskRead(BaseModel):
@@ -315,6 +400,39 @@ class DecisionPointRead(BaseModel):
         from_attributes = True
 
 
+class PositionReport(BaseModel):
+    unit: str
+    lat: float = Field(ge=-90, le=90)
+    lon: float = Field(ge=-180, le=180)
+    time: Optional[datetime] = None
+
+
+class TriggerEventRead(BaseModel):
+    decision_point_id: int
+    name: str
+    condition: str
+    unit: str
+    lat: float
+    lon: float
+    time: datetime
+
+
+class TriggerEvaluation(BaseModel):
+    processed: int
+    skipped: int = Field(description="Reports older than the unit's latest one")
+    events: List[TriggerEventRead]
+
+
+class DecisionPointTriggerRead(BaseModel):
+    decision_point_id: int
+    name: str
+    expression: Optional[str]
+    condition: Optional[str] = None
+    error: Optional[str] = None
+    units_inside: List[str] = Field(default_factory=list)
+    last_event: Optional[TriggerEventRead] = None
+
+
 class ConstraintRead(BaseModel):
     id: int
     text: str
@@ -339,3 +457,30 @@ class CCIRRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ForceTotals(BaseModel):
+    personnel: int = 0
+    vehicles: int = 0
+    unit_count: int = 0
+
+
+class UnitRollupRead(BaseModel):
+    unit_id: int
+    name: str
+    echelon: Optional[str]
+    totals: ForceTotals
+    by_service: Dict[str, ForceTotals]
+
+
+class SeedLoadRequest(BaseModel):
+    kinds: List[str] = Field(default_factory=lambda: ["units_generic", "units_real", "ttr_rules"])
+
+
+class SeedLoadResult(BaseModel):
+    kind: str
+    file: str
+    inserted: int
+    updated: int
+    skipped: int
+    seconds: float
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import queue
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from server.db.base import session_scope, shards
+from server.db.models import (
+    Area,
+    COA,
+    Decision,
+    Factor,
+    FactorConclusion,
+    FactorDeduction,
+    Phase,
+    Plan,
+    Task,
+    TTL,
+)
+from server.domain.services.content_store import ContentStore
+from server.domain.services.export_service import EXPORT_PAGE_SIZE, ExportService
+
+ARCHIVE_WORKERS = int(os.getenv("ARCHIVE_WORKERS", "4"))
+ARCHIVE_QUEUE_CHUNKS = int(os.getenv("ARCHIVE_QUEUE_CHUNKS", "8"))
+ARCHIVE_MAX_PLANS = int(os.getenv("ARCHIVE_MAX_PLANS", "200"))
+
+TTL_COLUMNS = [
+    "ttl_id", "task", "phase_sequence", "phase", "coa", "area", "area_type",
+    "relative_to", "start_offset_hours", "end_offset_hours", "status",
+]
+FACTOR_COLUMNS = [
+    "factor_id", "factor", "domain", "factor_confidence", "phase_id", "coa_id",
+    "deduction_id", "deduction", "deduction_confidence",
+    "conclusion_id", "conclusion_type", "conclusion", "priority", "status", "owner",
+]
+
+# A member producer writes its body as a sequence of byte chunks
+Producer = Callable[[Session, int], Iterator[bytes]]
+
+_DONE = object()
+
+
+class ArchiveService:
+    """Streams a ZIP of several plans without building it in memory.
+
+    Each plan contributes ``conops.md``, ``ttl.csv``, ``factors.csv`` and
+    ``decisions.jsonl``. Members are produced by a thread pool, each with its
+    own read-only session, into bounded queues; the response drains them in
+    archive order, so at most ``ARCHIVE_WORKERS`` members are in flight and
+    each holds at most ``ARCHIVE_QUEUE_CHUNKS`` pages.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def start_archive(self, plan_ids: List[int]) -> Tuple[str, Iterator[bytes]]:
+        plan_ids = list(dict.fromkeys(plan_ids))
+        if not plan_ids:
+            raise ValueError("At least one plan is required")
+        if len(plan_ids) > ARCHIVE_MAX_PLANS:
+            raise ValueError(f"At most {ARCHIVE_MAX_PLANS} plans can be archived at once")
+        plans = self.session.exec(select(Plan).where(Plan.id.in_(plan_ids))).all()
+        found = {plan.id: plan for plan in plans}
+        missing = [plan_id for plan_id in plan_ids if plan_id not in found]
+        if missing:
+            raise ValueError(f"Plans not found: {', '.join(str(plan_id) for plan_id in missing)}")
+
+        manifest = {
+            "generated_at": datetime.utcnow().isoformat(),
+            "plans": [
+                {"id": plan.id, "name": plan.name, "revision": _revision(plan), "directory": f"plan_{plan.id}"}
+                for plan in (found[plan_id] for plan_id in plan_ids)
+            ],
+        }
+        members: List[Tuple[str, int, Producer]] = []
+        for plan_id in plan_ids:
+            for name, producer in _PLAN_MEMBERS:
+                members.append((f"plan_{plan_id}/{name}", plan_id, producer))
+
+        filename = f"COPD_archive_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.zip"
+        return filename, _stream_archive(members, manifest)
+
+
+def _revision(plan: Plan) -> int:
+    """With sharded storage the revision counter only moves in the shard."""
+    if not shards:
+        return plan.revision
+    with session_scope(plan.id) as session:
+        return session.get(Plan, plan.id).revision
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, unseekable file object that ``zipfile`` writes into; the
+    response generator takes whatever has accumulated after each write."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _stream_archive(members: List[Tuple[str, int, Producer]], manifest: dict) -> Iterator[bytes]:
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=ARCHIVE_QUEUE_CHUNKS) for _ in members]
+    pool = ThreadPoolExecutor(max_workers=ARCHIVE_WORKERS, thread_name_prefix="archive")
+    try:
+        # FIFO start order plus in-order draining means a queued member can
+        # only be waiting on members that have already finished: no deadlock.
+        for (_, plan_id, producer), chunks in zip(members, queues):
+            pool.submit(_produce, producer, plan_id, chunks, stop)
+
+        sink = _ZipSink()
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for (name, _, _), chunks in zip(members, queues):
+                with archive.open(name, "w") as member:
+                    while (item := chunks.get()) is not _DONE:
+                        if isinstance(item, BaseException):
+                            raise item
+                        member.write(item)
+                        if data := sink.drain():
+                            yield data
+                if data := sink.drain():
+                    yield data
+            archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+        yield sink.drain()
+    finally:
+        # Client disconnects land here too: unblock producers and let them exit
+        stop.set()
+        for chunks in queues:
+            while not chunks.empty():
+                chunks.get_nowait()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _produce(producer: Producer, plan_id: int, chunks: queue.Queue, stop: threading.Event) -> None:
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        with session_scope(plan_id) as session:
+            for chunk in producer(session, plan_id):
+                if chunk and not put(chunk):
+                    return
+    except Exception as exc:  # noqa: BLE001 - surfaced to the response generator
+        put(exc)
+        return
+    put(_DONE)
+
+
+# Members -------------------------------------------------------------
+def _conops(session: Session, plan_id: int) -> Iterator[bytes]:
+    service = ExportService(session)
+    plan = session.get(Plan, plan_id)
+    cached = service.find_cached(plan, None)
+    if cached and cached.content_id:
+        chunks = ContentStore(session).iter_text(cached.content_id)
+    else:
+        chunks = service.iter_conops(plan=plan, coa=None)
+    for text in chunks:
+        yield text.encode("utf-8")
+
+
+def _ttl_csv(session: Session, plan_id: int) -> Iterator[bytes]:
+    statement = (
+        select(
+            TTL.id,
+            Task.name,
+            Phase.sequence,
+            Phase.name,
+            COA.name,
+            Area.name,
+            Area.area_type,
+            TTL.relative_to,
+            TTL.start_offset_hours,
+            TTL.end_offset_hours,
+            TTL.status,
+        )
+        .join(Task, Task.id == TTL.task_id)
+        .outerjoin(Phase, Phase.id == TTL.phase_id)
+        .outerjoin(COA, COA.id == TTL.coa_id)
+        .outerjoin(Area, Area.id == TTL.area_id)
+        .where(TTL.plan_id == plan_id)
+        .order_by(Phase.sequence, TTL.start_offset_hours, TTL.id)
+    )
+    yield from _csv_pages(session, statement, TTL_COLUMNS)
+
+
+def _factors_csv(session: Session, plan_id: int) -> Iterator[bytes]:
+    """One row per conclusion; factors and deductions without children still
+    get a row so the matrix shows every factor."""
+    statement = (
+        select(
+            Factor.id,
+            Factor.title,
+            Factor.domain,
+            Factor.confidence,
+            Factor.phase_id,
+            Factor.coa_id,
+            FactorDeduction.id,
+            FactorDeduction.text,
+            FactorDeduction.confidence,
+            FactorConclusion.id,
+            FactorConclusion.type,
+            FactorConclusion.text,
+            FactorConclusion.priority,
+            FactorConclusion.status,
+            FactorConclusion.owner,
+        )
+        .outerjoin(FactorDeduction, FactorDeduction.factor_id == Factor.id)
+        .outerjoin(FactorConclusion, FactorConclusion.deduction_id == FactorDeduction.id)
+        .where(Factor.plan_id == plan_id)
+        .order_by(Factor.id, FactorDeduction.id, FactorConclusion.id)
+    )
+    yield from _csv_pages(session, statement, FACTOR_COLUMNS)
+
+
+def _decisions_jsonl(session: Session, plan_id: int) -> Iterator[bytes]:
+    statement = select(Decision).where(Decision.plan_id == plan_id).order_by(Decision.created_at, Decision.id)
+    rows = session.exec(statement.execution_options(yield_per=EXPORT_PAGE_SIZE))
+    for page in rows.partitions():
+        lines = (json.dumps(decision.model_dump(mode="json"), ensure_ascii=False) for decision in page)
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _csv_pages(session: Session, statement, header: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    rows = session.exec(statement.execution_options(yield_per=EXPORT_PAGE_SIZE))
+    for page in rows.partitions():
+        writer.writerows([_csv_value(value) for value in row] for row in page)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _csv_value(value) -> Optional[object]:
+    return value.value if hasattr(value, "value") else value
+
+
+_PLAN_MEMBERS: List[Tuple[str, Producer]] = [
+    ("conops.md", _conops),
+    ("ttl.csv", _ttl_csv),
+    ("factors.csv", _factors_csv),
+    ("decisions.jsonl", _decisions_jsonl),
+]
+
+
+__all__ = ["ArchiveService", "ARCHIVE_WORKERS"]
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Type
+
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from server.db.models import (
+    CCIR,
+    COA,
+    Assumption,
+    Constraint,
+    Decision,
+    DecisionPoint,
+    DecisiveCondition,
+    Factor,
+    Phase,
+    Plan,
+    Risk,
+    Task,
+    TTL,
+)
+
+# Plan detail sections in response order, as returned by GET /plans/{id}
+PLAN_DETAIL_SECTIONS: Dict[str, Type[SQLModel]] = {
+    "phases": Phase,
+    "coas": COA,
+    "tasks": Task,
+    "ttl": TTL,
+    "risks": Risk,
+    "decisive_conditions": DecisiveCondition,
+    "decision_points": DecisionPoint,
+    "constraints": Constraint,
+    "assumptions": Assumption,
+    "ccirs": CCIR,
+}
+
+
+class AsyncPlanningReadService:
+    """Async counterparts of the hot read paths in ``PlanningService``,
+    ``FactorService`` and ``DecisionService``.
+
+    Relationships cannot lazy-load on an async session, so every collection
+    is fetched with an explicit query.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def list_plans(self) -> List[Plan]:
+        return list((await self.session.exec(select(Plan))).all())
+
+    async def get_plan(self, plan_id: int) -> Plan:
+        plan = await self.session.get(Plan, plan_id)
+        if not plan:
+            raise ValueError(f"Plan {plan_id} not found")
+        return plan
+
+    async def get_plan_detail(self, plan_id: int) -> Dict[str, list]:
+        await self.get_plan(plan_id)
+        return {name: await self._plan_rows(model, plan_id) for name, model in PLAN_DETAIL_SECTIONS.items()}
+
+    async def list_phases(self, plan_id: int) -> List[Phase]:
+        await self.get_plan(plan_id)
+        return await self._plan_rows(Phase, plan_id)
+
+    async def list_coas(self, plan_id: int) -> List[COA]:
+        await self.get_plan(plan_id)
+        return await self._plan_rows(COA, plan_id)
+
+    async def list_tasks(self, plan_id: int) -> List[Task]:
+        await self.get_plan(plan_id)
+        return await self._plan_rows(Task, plan_id)
+
+    async def list_ttl(self, plan_id: int) -> List[TTL]:
+        await self.get_plan(plan_id)
+        return await self._plan_rows(TTL, plan_id)
+
+    async def get_ttl(self, ttl_id: int) -> TTL:
+        ttl = await self.session.get(TTL, ttl_id)
+        if not ttl:
+            raise ValueError(f"TTL {ttl_id} not found")
+        return ttl
+
+    async def list_factors(self, plan_id: Optional[int] = None) -> List[Factor]:
+        statement = select(Factor)
+        if plan_id:
+            statement = statement.where(Factor.plan_id == plan_id)
+        return list((await self.session.exec(statement)).all())
+
+    async def list_decisions(self, plan_id: Optional[int] = None) -> List[Decision]:
+        statement = select(Decision)
+        if plan_id:
+            statement = statement.where(Decision.plan_id == plan_id)
+        return list((await self.session.exec(statement)).all())
+
+    async def _plan_rows(self, model: Type[SQLModel], plan_id: int) -> list:
+        statement = select(model).where(model.plan_id == plan_id).order_by(model.id)
+        return list((await self.session.exec(statement)).all())
+
+
+__all__ = ["AsyncPlanningReadService", "PLAN_DETAIL_SECTIONS"]
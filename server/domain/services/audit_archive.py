@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import socket
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from server.db.base import session_scope
+from server.db.models import AuditLog, Lease
+from server.domain import schemas
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "./audit-archive")
+AUDIT_RETENTION_DAYS = float(os.getenv("AUDIT_RETENTION_DAYS", "90"))
+AUDIT_RETENTION_INTERVAL = float(os.getenv("AUDIT_RETENTION_INTERVAL", "3600"))
+AUDIT_ARCHIVE_SEGMENT_ROWS = int(os.getenv("AUDIT_ARCHIVE_SEGMENT_ROWS", "10000"))
+AUDIT_ARCHIVE_CACHE_SEGMENTS = int(os.getenv("AUDIT_ARCHIVE_CACHE_SEGMENTS", "4"))
+# How long a retention run's claim lasts without renewal; renewed per segment
+AUDIT_RETENTION_LEASE = float(os.getenv("AUDIT_RETENTION_LEASE", "600"))
+
+_LEASE_NAME = "audit_retention"
+
+_COLUMNS = ("id", "plan_id", "action", "actor", "payload", "created_at")
+
+
+@dataclass(frozen=True)
+class SegmentManifest:
+    """Summary written next to each segment so searches can skip it unread."""
+
+    name: str
+    rows: int
+    first_created: datetime
+    last_created: datetime
+    first_id: int
+    last_id: int
+    plan_ids: frozenset
+    actions: frozenset
+    actors: frozenset
+
+    def may_match(
+        self,
+        plan_id: Optional[int],
+        action: Optional[str],
+        actor: Optional[str],
+        since: Optional[datetime],
+        until: Optional[datetime],
+        before: Optional[Tuple[datetime, int]],
+    ) -> bool:
+        if plan_id is not None and plan_id not in self.plan_ids:
+            return False
+        if action and action not in self.actions:
+            return False
+        if actor and actor not in self.actors:
+            return False
+        if since and self.last_created < since:
+            return False
+        if until and self.first_created >= until:
+            return False
+        if before and (self.first_created, self.first_id) >= before:
+            return False
+        return True
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "rows": self.rows,
+            "first_created": self.first_created.isoformat(),
+            "last_created": self.last_created.isoformat(),
+            "first_id": self.first_id,
+            "last_id": self.last_id,
+            "plan_ids": sorted(self.plan_ids),
+            "actions": sorted(self.actions),
+            "actors": sorted(self.actors),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SegmentManifest":
+        return cls(
+            name=data["name"],
+            rows=data["rows"],
+            first_created=datetime.fromisoformat(data["first_created"]),
+            last_created=datetime.fromisoformat(data["last_created"]),
+            first_id=data["first_id"],
+            last_id=data["last_id"],
+            plan_ids=frozenset(data["plan_ids"]),
+            actions=frozenset(data["actions"]),
+            actors=frozenset(data["actors"]),
+        )
+
+
+class AuditArchive:
+    """Append-only gzip JSONL segments of retired audit rows.
+
+    Each segment holds rows in ``(created_at, id)`` order and is immutable
+    once its ``.manifest.json`` exists; the manifest is written last, so a
+    segment without one is an interrupted write and is ignored.
+    """
+
+    def __init__(self, directory: str = AUDIT_ARCHIVE_DIR) -> None:
+        self.directory = Path(directory)
+        self._manifests: Dict[str, SegmentManifest] = {}
+        # Decoded segments, so paging through one segment decompresses it once
+        self._decoded: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def segments(self) -> List[SegmentManifest]:
+        """Manifests oldest first. Parsed manifests are cached; segment files
+        never change, so only new names are read."""
+        if not self.directory.exists():
+            return []
+        with self._lock:
+            for path in self.directory.glob("*.manifest.json"):
+                name = path.name[: -len(".manifest.json")]
+                if name not in self._manifests:
+                    self._manifests[name] = SegmentManifest.from_dict(json.loads(path.read_text()))
+            return sorted(self._manifests.values(), key=lambda manifest: (manifest.first_created, manifest.first_id))
+
+    def write_segment(self, rows: List[dict]) -> SegmentManifest:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        first, last = rows[0], rows[-1]
+        name = f"audit_{first['created_at'].strftime('%Y%m%dT%H%M%S')}_{first['id']}_{last['id']}"
+        manifest = SegmentManifest(
+            name=name,
+            rows=len(rows),
+            first_created=first["created_at"],
+            last_created=last["created_at"],
+            first_id=first["id"],
+            last_id=last["id"],
+            plan_ids=frozenset(row["plan_id"] for row in rows if row["plan_id"] is not None),
+            actions=frozenset(row["action"] for row in rows),
+            actors=frozenset(row["actor"] for row in rows if row["actor"]),
+        )
+
+        segment = self.directory / f"{name}.jsonl.gz"
+        tmp = segment.with_suffix(".gz.part")
+        with gzip.open(tmp, "wt", encoding="utf-8") as handle:
+            for row in rows:
+                handle.write(json.dumps({**row, "created_at": row["created_at"].isoformat()}, separators=(",", ":")))
+                handle.write("\n")
+        _fsync(tmp)
+        os.replace(tmp, segment)
+
+        manifest_path = self.directory / f"{name}.manifest.json"
+        tmp = manifest_path.with_suffix(".part")
+        tmp.write_text(json.dumps(manifest.as_dict()))
+        _fsync(tmp)
+        os.replace(tmp, manifest_path)
+        with self._lock:
+            self._manifests[name] = manifest
+        return manifest
+
+    def read_segment(self, manifest: SegmentManifest) -> Iterator[dict]:
+        with gzip.open(self.directory / f"{manifest.name}.jsonl.gz", "rt", encoding="utf-8") as handle:
+            for line in handle:
+                row = json.loads(line)
+                row["created_at"] = datetime.fromisoformat(row["created_at"])
+                yield row
+
+    def _decoded_rows(self, manifest: SegmentManifest) -> List[dict]:
+        with self._lock:
+            rows = self._decoded.get(manifest.name)
+            if rows is not None:
+                self._decoded.move_to_end(manifest.name)
+                return rows
+        rows = list(self.read_segment(manifest))
+        with self._lock:
+            self._decoded[manifest.name] = rows
+            while len(self._decoded) > AUDIT_ARCHIVE_CACHE_SEGMENTS:
+                self._decoded.popitem(last=False)
+        return rows
+
+    def search(
+        self,
+        limit: int,
+        plan_id: Optional[int] = None,
+        action: Optional[str] = None,
+        actor: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        before: Optional[Tuple[datetime, int]] = None,
+    ) -> List[schemas.AuditLogRead]:
+        """Newest-first rows strictly older than ``before``, continuing the
+        live table's keyset order."""
+        found: List[schemas.AuditLogRead] = []
+        for manifest in reversed(self.segments()):
+            if len(found) >= limit:
+                break
+            if since and manifest.last_created < since:
+                break  # every older segment is out of range too
+            if not manifest.may_match(plan_id, action, actor, since, until, before):
+                continue
+            rows = self._decoded_rows(manifest)
+            end = len(rows)
+            if before is not None:
+                end = bisect_left(rows, before, key=lambda row: (row["created_at"], row["id"]))
+            for row in reversed(rows[:end]):
+                if since and row["created_at"] < since:
+                    break
+                if (
+                    (plan_id is None or row["plan_id"] == plan_id)
+                    and (not action or row["action"] == action)
+                    and (not actor or row["actor"] == actor)
+                    and (not until or row["created_at"] < until)
+                ):
+                    found.append(schemas.AuditLogRead(**row))
+                    if len(found) >= limit:
+                        break
+        return found[:limit]
+
+
+class AuditRetention:
+    """Moves audit rows older than ``AUDIT_RETENTION_DAYS`` into the archive.
+
+    Rows are retired oldest first, one segment at a time: the segment and
+    its manifest are made durable before the rows are deleted, so a crash
+    can at worst leave rows in both places, and the next run deletes those.
+
+    Every worker process runs the loop, but a run first claims the
+    ``audit_retention`` lease row, so only one of them archives at a time.
+    """
+
+    def __init__(
+        self,
+        archive: Optional[AuditArchive] = None,
+        retention_days: float = AUDIT_RETENTION_DAYS,
+        interval: float = AUDIT_RETENTION_INTERVAL,
+        segment_rows: int = AUDIT_ARCHIVE_SEGMENT_ROWS,
+    ) -> None:
+        self.archive = archive or get_audit_archive()
+        self.retention_days = retention_days
+        self.interval = interval
+        self.segment_rows = segment_rows
+        self._run_lock = threading.Lock()
+        self._holder = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run(self, session: Session, now: Optional[datetime] = None) -> schemas.AuditRetentionResult:
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.retention_days)
+        segments: List[SegmentManifest] = []
+        with self._run_lock:
+            if not self._claim(session, now):
+                return schemas.AuditRetentionResult(cutoff=cutoff, archived=0, segments=[], skipped=True)
+            try:
+                self._archive(session, cutoff, segments, now)
+            finally:
+                self._release(session)
+        return schemas.AuditRetentionResult(
+            cutoff=cutoff,
+            archived=sum(manifest.rows for manifest in segments),
+            segments=[manifest.name for manifest in segments],
+        )
+
+    def _archive(self, session: Session, cutoff: datetime, segments: List[SegmentManifest], now: Optional[datetime]) -> None:
+        existing = self.archive.segments()
+        if existing and session.exec(select(AuditLog.id).where(AuditLog.id == existing[-1].last_id)).first():
+            # A run stopped between writing this segment and deleting its rows
+            self._purge(session, existing[-1])
+        while True:
+            statement = (
+                select(*(getattr(AuditLog, column) for column in _COLUMNS))
+                .where(AuditLog.created_at < cutoff)
+                .order_by(AuditLog.created_at, AuditLog.id)
+                .limit(self.segment_rows)
+            )
+            rows = [dict(row._mapping) for row in session.exec(statement)]
+            if not rows:
+                break
+            manifest = self.archive.write_segment(rows)
+            self._purge(session, manifest, [row["id"] for row in rows])
+            segments.append(manifest)
+            if len(rows) < self.segment_rows or not self._claim(session, now):
+                break
+
+    def start(self) -> None:
+        if self.retention_days <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="audit-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                with session_scope() as session:
+                    result = self.run(session)
+                if result.archived:
+                    logger.info("Archived %d audit rows into %d segments", result.archived, len(result.segments))
+            except Exception:  # noqa: BLE001 - retried on the next interval
+                logger.exception("Audit retention run failed")
+
+    def _purge(self, session: Session, manifest: SegmentManifest, ids: Optional[List[int]] = None) -> None:
+        """Delete exactly the rows in the segment, by id. A key range would
+        also catch rows the write-behind writer committed after the segment
+        was selected, with an older ``created_at``, and lose them."""
+        if ids is None:
+            ids = [row["id"] for row in self.archive.read_segment(manifest)]
+        for start in range(0, len(ids), 1000):
+            session.execute(delete(AuditLog).where(AuditLog.id.in_(ids[start : start + 1000])))
+        # One commit, so the segment's last row is gone only if all of them are
+        session.commit()
+
+    # Lease ------------------------------------------------------------
+    def _claim(self, session: Session, now: Optional[datetime] = None) -> bool:
+        """Take or renew the lease; False while another worker holds it."""
+        now = datetime.utcnow() if now is None else now
+        dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+        session.execute(dialect.insert(Lease).values(name=_LEASE_NAME).on_conflict_do_nothing(index_elements=["name"]))
+        claimed = session.execute(
+            update(Lease)
+            .where(
+                Lease.name == _LEASE_NAME,
+                or_(Lease.holder.is_(None), Lease.holder == self._holder, Lease.expires_at < now),
+            )
+            .values(holder=self._holder, expires_at=now + timedelta(seconds=AUDIT_RETENTION_LEASE))
+        ).rowcount
+        session.commit()
+        return claimed == 1
+
+    def _release(self, session: Session) -> None:
+        session.rollback()
+        session.execute(
+            update(Lease).where(Lease.name == _LEASE_NAME, Lease.holder == self._holder).values(holder=None, expires_at=None)
+        )
+        session.commit()
+
+
+def _fsync(path: Path) -> None:
+    with open(path, "rb") as handle:
+        os.fsync(handle.fileno())
+
+
+@lru_cache(maxsize=1)
+def get_audit_archive() -> AuditArchive:
+    return AuditArchive()
+
+
+@lru_cache(maxsize=1)
+def get_audit_retention() -> AuditRetention:
+    return AuditRetention()
+
+
+__all__ = ["AuditArchive", "AuditRetention", "SegmentManifest", "get_audit_archive", "get_audit_retention"]
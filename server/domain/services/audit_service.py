@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import os
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlmodel import Session, select
+
+from server.db.models import AuditLog
+from server.domain import schemas
+from server.domain.services.audit_archive import AuditArchive, get_audit_archive
+from server.domain.services.audit_writer import AuditWriter, get_audit_writer
+
+AUDIT_PAGE_SIZE = int(os.getenv("AUDIT_PAGE_SIZE", "100"))
+AUDIT_MAX_PAGE_SIZE = int(os.getenv("AUDIT_MAX_PAGE_SIZE", "1000"))
+# How long a read waits for queued events to be written before answering without them
+AUDIT_READ_SYNC_TIMEOUT = float(os.getenv("AUDIT_READ_SYNC_TIMEOUT", "1.0"))
+
+
+class AuditService:
+    """Newest-first audit queries with keyset pagination.
+
+    Pages are ordered by ``(created_at, id)`` descending and the cursor is
+    the last row's key, so each page is a single index range scan no matter
+    how deep the caller pages. Once the live table runs out, the same
+    cursor continues into the retention archive.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        writer: Optional[AuditWriter] = None,
+        archive: Optional[AuditArchive] = None,
+    ) -> None:
+        self.session = session
+        self.writer = writer or get_audit_writer()
+        self.archive = archive or get_audit_archive()
+
+    def list_logs(
+        self,
+        plan_id: Optional[int] = None,
+        action: Optional[str] = None,
+        actor: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = AUDIT_PAGE_SIZE,
+        include_archived: bool = True,
+    ) -> schemas.AuditLogPage:
+        limit = max(1, min(limit, AUDIT_MAX_PAGE_SIZE))
+        # Readers see every event recorded before the request, unless writing
+        # them takes longer than the timeout
+        self.writer.sync(AUDIT_READ_SYNC_TIMEOUT)
+        statement = select(AuditLog)
+        if plan_id is not None:
+            statement = statement.where(AuditLog.plan_id == plan_id)
+        if action:
+            statement = statement.where(AuditLog.action == action)
+        if actor:
+            statement = statement.where(AuditLog.actor == actor)
+        if since:
+            statement = statement.where(AuditLog.created_at >= since)
+        if until:
+            statement = statement.where(AuditLog.created_at < until)
+        before = decode_cursor(cursor) if cursor else None
+        if before:
+            statement = statement.where(tuple_(AuditLog.created_at, AuditLog.id) < tuple_(*before))
+
+        statement = statement.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit + 1)
+        items = [schemas.AuditLogRead.model_validate(row) for row in self.session.exec(statement)]
+        if len(items) <= limit and include_archived:
+            if items:
+                before = (items[-1].created_at, items[-1].id)
+            live_ids = {item.id for item in items}
+            archived = self.archive.search(
+                limit + 1 - len(items),
+                plan_id=plan_id,
+                action=action,
+                actor=actor,
+                since=since,
+                until=until,
+                before=before,
+            )
+            # Rows can sit in both places if retention stopped mid-run
+            items.extend(item for item in archived if item.id not in live_ids)
+
+        next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+        return schemas.AuditLogPage(items=items[:limit], next_cursor=next_cursor)
+
+
+def encode_cursor(row: schemas.AuditLogRead) -> str:
+    raw = json.dumps([row.created_at.isoformat(), row.id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, last_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(last_id)
+    except (binascii.Error, ValueError, TypeError) as exc:
+        raise ValueError("Invalid audit cursor") from exc
+
+
+__all__ = ["AuditService", "decode_cursor", "encode_cursor"]
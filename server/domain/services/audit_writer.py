@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from typing import Deque, List, Optional
+
+from sqlalchemy import insert
+
+from server.db.base import session_scope
+from server.db.models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+AUDIT_WRITE_BEHIND = os.getenv("AUDIT_WRITE_BEHIND", "1") not in ("0", "false", "False")
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.25"))
+AUDIT_FLUSH_BATCH = int(os.getenv("AUDIT_FLUSH_BATCH", "500"))
+AUDIT_MAX_PENDING = int(os.getenv("AUDIT_MAX_PENDING", "100000"))
+
+
+class AuditWriter:
+    """Write-behind buffer for ``AuditLog`` rows.
+
+    ``record`` only appends to an in-memory queue; a background thread
+    bulk-inserts the queue every ``AUDIT_FLUSH_INTERVAL`` seconds or as soon
+    as ``AUDIT_FLUSH_BATCH`` events are waiting. ``flush`` drains the queue
+    synchronously and is called on shutdown; audit reads instead ``sync``,
+    which waits a bounded time for the thread to catch up. Rows keep the
+    time they were recorded, not the time they were written.
+
+    While the database is unavailable the queue grows up to
+    ``AUDIT_MAX_PENDING`` events; past that the oldest are dropped and
+    counted in ``stats``, so an outage costs audit rows rather than memory.
+
+    With ``AUDIT_WRITE_BEHIND=0`` every event is written before ``record``
+    returns.
+    """
+
+    def __init__(
+        self,
+        interval: float = AUDIT_FLUSH_INTERVAL,
+        batch_size: int = AUDIT_FLUSH_BATCH,
+        write_behind: bool = AUDIT_WRITE_BEHIND,
+        max_pending: int = AUDIT_MAX_PENDING,
+    ) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        self.write_behind = write_behind
+        self.max_pending = max(max_pending, batch_size)
+        self.dropped = 0
+        self._pending: Deque[dict] = deque()
+        # Events queued and events written or dropped since start; sync waits
+        # for the second to catch up with the first
+        self._queued = 0
+        self._settled = 0
+        self._wakeup = threading.Condition()
+        # Serialises writers so batches land in the order they were drained
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def record(
+        self,
+        action: str,
+        plan_id: Optional[int] = None,
+        actor: Optional[str] = None,
+        payload: Optional[str] = None,
+    ) -> None:
+        self.record_many(
+            [{"plan_id": plan_id, "action": action, "actor": actor, "payload": payload}]
+        )
+
+    def record_many(self, events: List[dict]) -> None:
+        if not events:
+            return
+        now = datetime.utcnow()
+        rows = [{"created_at": now, **event} for event in events]
+        if not self.write_behind or self._stopping:
+            self._write(rows)
+            return
+        with self._wakeup:
+            self._pending.extend(rows)
+            self._queued += len(rows)
+            self._trim()
+            self._ensure_thread()
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.notify_all()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        return {"pending": self.pending(), "max_pending": self.max_pending, "dropped": self.dropped}
+
+    def sync(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for everything recorded so far to
+        be written; True if it was. Unlike ``flush`` this never blocks for
+        longer, however slow or unavailable the database is."""
+        with self._wakeup:
+            target = self._queued
+            if self._settled >= target:
+                return True
+            self._ensure_thread()
+            self._wakeup.notify_all()
+            return self._wakeup.wait_for(lambda: self._settled >= target, timeout)
+
+    def flush(self) -> int:
+        """Write everything queued so far; returns the number of rows written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._wakeup:
+                    if not self._pending:
+                        return written
+                    batch = [self._pending.popleft() for _ in range(min(len(self._pending), self.batch_size))]
+                try:
+                    self._write(batch)
+                except Exception:
+                    # Put the batch back in front so nothing is lost or reordered
+                    with self._wakeup:
+                        self._pending.extendleft(reversed(batch))
+                        self._trim()
+                    raise
+                written += len(batch)
+                with self._wakeup:
+                    self._settled += len(batch)
+                    self._wakeup.notify_all()
+
+    def shutdown(self) -> None:
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def _trim(self) -> None:
+        """Drop the oldest events beyond ``max_pending``; holds ``_wakeup``."""
+        excess = len(self._pending) - self.max_pending
+        if excess <= 0:
+            return
+        for _ in range(excess):
+            self._pending.popleft()
+        if not self.dropped:
+            logger.error("Audit queue full (%d events); dropping the oldest", self.max_pending)
+        self.dropped += excess
+        self._settled += excess
+        self._wakeup.notify_all()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._wakeup:
+                if not self._stopping and len(self._pending) < self.batch_size:
+                    self._wakeup.wait(self.interval)
+                if self._stopping:
+                    return
+            try:
+                self.flush()
+            except Exception:  # noqa: BLE001 - retried on the next tick
+                logger.exception("Audit flush failed; %d events still queued", self.pending())
+
+    def _write(self, rows: List[dict]) -> None:
+        with session_scope() as session:
+            session.execute(insert(AuditLog), rows)
+            session.commit()
+
+
+@lru_cache(maxsize=1)
+def get_audit_writer() -> AuditWriter:
+    writer = AuditWriter()
+    atexit.register(writer.shutdown)
+    return writer
+
+
+__all__ = ["AuditWriter", "get_audit_writer"]
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import codecs
+import difflib
+import hashlib
+import json
+import os
+import zlib
+from typing import Dict, Iterator, List, Optional, Union
+
+from sqlalchemy import delete, insert, update
+from sqlmodel import Session, select
+
+from server.db.models import ProductContent, ProductContentSegment
+
+CONTENT_SEGMENT_BYTES = int(os.getenv("CONTENT_SEGMENT_BYTES", str(256 * 1024)))
+CONTENT_MAX_DELTA_DEPTH = int(os.getenv("CONTENT_MAX_DELTA_DEPTH", "16"))
+
+# A delta is a list of ops: [start, end] copies base lines, a string inserts text
+DeltaOp = Union[List[int], str]
+
+
+class ContentStore:
+    """Compressed, content-addressed storage for rendered documents.
+
+    Bodies are zlib-compressed into ordered segments. A body may instead be
+    stored as a line delta against an earlier body when that is smaller;
+    delta chains are capped at ``CONTENT_MAX_DELTA_DEPTH`` so reading any
+    version only decompresses its own chain.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    # Writing ----------------------------------------------------------
+    def put(self, text: str, base_id: Optional[int] = None) -> ProductContent:
+        raw = text.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        existing = self.find(digest)
+        if existing:
+            return existing
+
+        encoding, data, depth = "zlib", zlib.compress(raw), 0
+        base = self.session.get(ProductContent, base_id) if base_id else None
+        if base and base.hash and base.depth < CONTENT_MAX_DELTA_DEPTH:
+            delta = zlib.compress(json.dumps(_delta_ops(self.read(base.id), text), separators=(",", ":")).encode("utf-8"))
+            if len(delta) < len(data):
+                encoding, data, depth = "delta", delta, base.depth + 1
+        if encoding != "delta":
+            base = None
+
+        stored = ProductContent(
+            hash=digest,
+            encoding=encoding,
+            base_id=base.id if base else None,
+            depth=depth,
+            size=len(raw),
+            stored_size=len(data),
+        )
+        self.session.add(stored)
+        self.session.flush()
+        self._write_segment(stored.id, 0, data)
+        return stored
+
+    def writer(self) -> "ContentWriter":
+        return ContentWriter(self)
+
+    def find(self, digest: str) -> Optional[ProductContent]:
+        return self.session.exec(select(ProductContent).where(ProductContent.hash == digest)).first()
+
+    def _write_segment(self, content_id: int, seq: int, data: bytes) -> None:
+        self.session.execute(insert(ProductContentSegment).values(content_id=content_id, seq=seq, data=data))
+
+    # Reading ----------------------------------------------------------
+    def read(self, content_id: int, memo: Optional[Dict[int, str]] = None) -> str:
+        """Materialise one body. ``memo`` lets callers share decoded bases
+        between several reads, e.g. both sides of a diff."""
+        memo = {} if memo is None else memo
+        if content_id in memo:
+            return memo[content_id]
+
+        stored = self.session.get(ProductContent, content_id)
+        if stored.encoding == "plain":
+            text = stored.body or ""
+        elif stored.encoding == "zlib":
+            text = "".join(self.iter_text(content_id))
+        else:
+            base_lines = self.read(stored.base_id, memo).splitlines(keepends=True)
+            ops = json.loads(zlib.decompress(b"".join(self._segments(content_id))))
+            text = "".join("".join(base_lines[op[0]:op[1]]) if isinstance(op, list) else op for op in ops)
+        memo[content_id] = text
+        return text
+
+    def iter_text(self, content_id: int) -> Iterator[str]:
+        """Yield a body incrementally; zlib bodies are decoded segment by segment."""
+        stored = self.session.get(ProductContent, content_id)
+        if stored.encoding != "zlib":
+            yield self.read(content_id)
+            return
+        decompressor = zlib.decompressobj()
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        for data in self._segments(content_id):
+            text = decoder.decode(decompressor.decompress(data))
+            if text:
+                yield text
+        tail = decoder.decode(decompressor.flush(), final=True)
+        if tail:
+            yield tail
+
+    def diff(self, old_id: int, new_id: int, old_label: str, new_label: str) -> Iterator[str]:
+        memo: Dict[int, str] = {}
+        old_lines = self.read(old_id, memo).splitlines(keepends=True)
+        new_lines = self.read(new_id, memo).splitlines(keepends=True)
+        for line in difflib.unified_diff(old_lines, new_lines, fromfile=old_label, tofile=new_label):
+            yield line if line.endswith("\n") else line + "\n"
+
+    def _segments(self, content_id: int) -> Iterator[bytes]:
+        statement = (
+            select(ProductContentSegment.data)
+            .where(ProductContentSegment.content_id == content_id)
+            .order_by(ProductContentSegment.seq)
+        )
+        yield from self.session.exec(statement.execution_options(yield_per=8))
+
+
+class ContentWriter:
+    """Incremental zlib writer used by streamed exports.
+
+    The content row and each segment are committed in their own short
+    transactions, so the write lock is never held while the caller waits,
+    e.g. on a slow client. The store needs a session of its own for that.
+    The body has no hash, and so is never found or reused, until ``close``
+    stamps it; the caller commits that. ``abort`` removes a partial body.
+    """
+
+    def __init__(self, store: ContentStore) -> None:
+        self.store = store
+        self.session = store.session
+        stored = ProductContent(encoding="zlib")
+        self.session.add(stored)
+        self.session.commit()
+        self.content_id = stored.id
+        self._compressor = zlib.compressobj()
+        self._digest = hashlib.sha256()
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self._seq = 0
+        self._size = 0
+        self._stored_size = 0
+
+    def write(self, text: str) -> None:
+        raw = text.encode("utf-8")
+        self._digest.update(raw)
+        self._size += len(raw)
+        self._push(self._compressor.compress(raw))
+        if self._buffered >= CONTENT_SEGMENT_BYTES:
+            self._flush_segment()
+
+    def close(self) -> int:
+        """Seal the body and return its id, reusing an identical stored body."""
+        self._push(self._compressor.flush())
+        self._flush_segment()
+
+        digest = self._digest.hexdigest()
+        existing = self.store.find(digest)
+        if existing is not None:
+            self.session.execute(delete(ProductContentSegment).where(ProductContentSegment.content_id == self.content_id))
+            self.session.execute(delete(ProductContent).where(ProductContent.id == self.content_id))
+            return existing.id
+        self.session.execute(
+            update(ProductContent)
+            .where(ProductContent.id == self.content_id)
+            .values(hash=digest, size=self._size, stored_size=self._stored_size)
+        )
+        return self.content_id
+
+    def abort(self) -> None:
+        self.session.rollback()
+        self.session.execute(delete(ProductContentSegment).where(ProductContentSegment.content_id == self.content_id))
+        self.session.execute(delete(ProductContent).where(ProductContent.id == self.content_id))
+        self.session.commit()
+
+    def _push(self, data: bytes) -> None:
+        if data:
+            self._buffer.append(data)
+            self._buffered += len(data)
+
+    def _flush_segment(self) -> None:
+        if not self._buffer:
+            return
+        data = b"".join(self._buffer)
+        self.store._write_segment(self.content_id, self._seq, data)
+        self.session.commit()
+        self._seq += 1
+        self._stored_size += len(data)
+        self._buffer, self._buffered = [], 0
+
+
+def _delta_ops(base: str, text: str) -> List[DeltaOp]:
+    base_lines = base.splitlines(keepends=True)
+    new_lines = text.splitlines(keepends=True)
+    ops: List[DeltaOp] = []
+    matcher = difflib.SequenceMatcher(None, base_lines, new_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(new_lines[j1:j2]))
+    return ops
+
+
+__all__ = ["ContentStore", "ContentWriter"]
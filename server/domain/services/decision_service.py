@@ -4,7 +4,7 @@ from typing import List
 
 from sqlmodel import Session, select
 
-from server.db.models import AuditLog, Decision
+from server.db.models import Decision
 from server.domain import schemas
 
 
@@ -16,11 +16,8 @@ class DecisionService:
         decision = Decision(**payload.model_dump())
         self.session.add(decision)
         self.session.commit()
+        # Audited by the session hook as decision.insert, author included
         self.session.refresh(decision)
-
-        audit = AuditLog(plan_id=decision.plan_id, action="decision_recorded", payload=decision.decision_text)
-        self.session.add(audit)
-        self.session.commit()
         return decision
 
     def list_decisions(self, plan_id: int | None = None) -> List[Decision]:
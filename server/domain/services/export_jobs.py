@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from server.db.base import session_scope, shards
+from server.db.models import ExportJob, ExportJobStatus
+from server.domain import schemas
+from server.domain.rendering import FORMATS, render_document
+from server.domain.services.export_service import ExportService
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", "./exports")
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+
+# Identifies this process in ExportJob.worker
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ExportJobRunner:
+    """Runs export jobs off the request path.
+
+    A small thread pool pulls the Markdown (through the CONOPS cache) and
+    records job state; the CPU-heavy DOCX/PDF rendering happens in a process
+    pool so it never holds the API's GIL.
+
+    Jobs only run in the process that queued them. On start, ``recover``
+    fails the queued and running jobs left behind by a process on this host
+    that is gone, so clients polling them stop waiting.
+    """
+
+    def __init__(self, workers: int = EXPORT_WORKERS, output_dir: str = EXPORT_DIR) -> None:
+        self.output_dir = Path(output_dir)
+        self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export-job")
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._workers = workers
+        self._active: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self.worker_id = WORKER_ID
+
+    def submit(self, job_id: int, plan_id: Optional[int] = None) -> None:
+        with self._lock:
+            if job_id in self._active:
+                return
+            future = self._threads.submit(self._run, job_id, plan_id)
+            self._active[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+
+    def is_active(self, job_id: int) -> bool:
+        return job_id in self._active
+
+    def start(self) -> None:
+        """Recover orphaned jobs in the background; shards can be many."""
+        self._threads.submit(self.recover)
+
+    def recover(self) -> int:
+        plan_ids = [None] + (shards.plan_ids() if shards else [])
+        failed = 0
+        for plan_id in plan_ids:
+            try:
+                with session_scope(plan_id) as session:
+                    failed += self._fail_orphans(session)
+            except Exception:  # noqa: BLE001 - one bad shard must not stop the rest
+                logger.exception("Export job recovery failed for plan %s", plan_id)
+        if failed:
+            logger.warning("Marked %d interrupted export jobs as failed", failed)
+        return failed
+
+    def _fail_orphans(self, session: Session) -> int:
+        statement = select(ExportJob).where(ExportJob.status.in_([ExportJobStatus.QUEUED, ExportJobStatus.RUNNING]))
+        orphans = [job for job in session.exec(statement) if not self._owner_alive(job)]
+        for job in orphans:
+            job.status = ExportJobStatus.FAILED
+            job.error = "Interrupted: the worker running this job stopped"
+            job.finished_at = datetime.utcnow()
+            session.add(job)
+        session.commit()
+        return len(orphans)
+
+    def _owner_alive(self, job: ExportJob) -> bool:
+        if job.worker == self.worker_id:
+            return self.is_active(job.id)
+        host, _, pid = (job.worker or "").rpartition(":")
+        if host != socket.gethostname():
+            # Another host's process, or a job from before workers were recorded
+            return bool(host)
+        try:
+            os.kill(int(pid), 0)
+        except (ValueError, ProcessLookupError):
+            return False
+        except PermissionError:
+            pass  # exists, owned by another user
+        return True
+
+    def shutdown(self) -> None:
+        self._threads.shutdown(wait=True, cancel_futures=False)
+        if self._processes:
+            self._processes.shutdown(wait=True)
+
+    def _forget(self, job_id: int) -> None:
+        with self._lock:
+            self._active.pop(job_id, None)
+
+    def _render_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                # spawn, not fork: the parent is multi-threaded
+                context = multiprocessing.get_context("spawn")
+                self._processes = ProcessPoolExecutor(max_workers=self._workers, mp_context=context)
+            return self._processes
+
+    def _run(self, job_id: int, plan_id: Optional[int] = None) -> None:
+        with session_scope(plan_id) as session:
+            job = session.get(ExportJob, job_id)
+            job.status = ExportJobStatus.RUNNING
+            session.add(job)
+            session.commit()
+
+            try:
+                export = ExportService(session).generate_conops(
+                    schemas.ConopsExportRequest(plan_id=job.plan_id, coa_id=job.coa_id)
+                )
+                path = self.output_dir / f"plan_{job.plan_id}" / job_filename(job)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix(path.suffix + ".part")
+                if job.format == "markdown":
+                    render_document(job.format, export.content, str(tmp_path))
+                else:
+                    self._render_pool().submit(render_document, job.format, export.content, str(tmp_path)).result()
+                os.replace(tmp_path, path)
+            except Exception as exc:  # noqa: BLE001
+                logger.exception("Export job %s failed", job_id)
+                session.rollback()
+                job.status = ExportJobStatus.FAILED
+                job.error = str(exc)
+            else:
+                job.status = ExportJobStatus.DONE
+                job.product_id = export.product_id
+                job.file_path = str(path)
+            job.finished_at = datetime.utcnow()
+            session.add(job)
+            session.commit()
+
+
+class ExportJobService:
+    def __init__(self, session: Session, runner: Optional[ExportJobRunner] = None) -> None:
+        self.session = session
+        self.runner = runner or get_export_runner()
+
+    def submit(self, payload: schemas.ExportJobCreate) -> ExportJob:
+        if payload.format not in FORMATS:
+            raise ValueError(f"Unsupported export format {payload.format}")
+        plan, coa = ExportService(self.session).resolve_request(
+            schemas.ConopsExportRequest(plan_id=payload.plan_id, coa_id=payload.coa_id)
+        )
+
+        reusable = self._find_reusable(plan.id, coa.id if coa else None, payload.format, plan.revision)
+        if reusable:
+            return reusable
+
+        job = ExportJob(
+            plan_id=plan.id,
+            coa_id=coa.id if coa else None,
+            format=payload.format,
+            plan_revision=plan.revision,
+            worker=self.runner.worker_id,
+        )
+        self.session.add(job)
+        self.session.commit()
+        self.session.refresh(job)
+        self.runner.submit(job.id, job.plan_id)
+        return job
+
+    def get_job(self, job_id: int) -> ExportJob:
+        job = self.session.get(ExportJob, job_id)
+        if not job:
+            raise ValueError(f"Export job {job_id} not found")
+        return job
+
+    def get_download(self, job_id: int) -> Tuple[ExportJob, Path]:
+        job = self.get_job(job_id)
+        if job.status != ExportJobStatus.DONE or not job.file_path:
+            raise LookupError(f"Export job {job_id} is {job.status.value}")
+        path = Path(job.file_path)
+        if not path.exists():
+            raise LookupError(f"Export file for job {job_id} is no longer available")
+        return job, path
+
+    def _find_reusable(self, plan_id: int, coa_id: Optional[int], fmt: str, revision: int) -> Optional[ExportJob]:
+        statement = (
+            select(ExportJob)
+            .where(
+                ExportJob.plan_id == plan_id,
+                ExportJob.coa_id == coa_id,
+                ExportJob.format == fmt,
+                ExportJob.plan_revision == revision,
+                ExportJob.status != ExportJobStatus.FAILED,
+            )
+            .order_by(ExportJob.id.desc())
+        )
+        for job in self.session.exec(statement):
+            if job.status == ExportJobStatus.DONE and job.file_path and Path(job.file_path).exists():
+                return job
+            if job.status in (ExportJobStatus.QUEUED, ExportJobStatus.RUNNING) and self.runner.is_active(job.id):
+                return job
+        return None
+
+
+def job_filename(job: ExportJob) -> str:
+    extension, _ = FORMATS[job.format]
+    coa_part = f"_coa_{job.coa_id}" if job.coa_id else ""
+    return f"CONOPS_plan_{job.plan_id}{coa_part}_r{job.plan_revision}.{extension}"
+
+
+@lru_cache(maxsize=1)
+def get_export_runner() -> ExportJobRunner:
+    return ExportJobRunner()
+
+
+__all__ = ["ExportJobRunner", "ExportJobService", "get_export_runner", "job_filename"]
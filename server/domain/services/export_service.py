@@ -1,19 +1,166 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import List
+import difflib
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
 
+from sqlalchemy import delete, or_, update
 from sqlmodel import Session, select
 
-from server.db.models import COA, Plan, ProductCONOPS, TTL
+from server.db.base import session_scope
+from server.db.models import Area, COA, Decision, Phase, Plan, ProductCONOPS, ProductContent, Task, TTL
 from server.domain import schemas
+from server.domain.services.content_store import ContentStore
+
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
 
 
 class ExportService:
     def __init__(self, session: Session) -> None:
         self.session = session
+        self.store = ContentStore(session)
 
     def generate_conops(self, payload: schemas.ConopsExportRequest) -> schemas.ConopsExportResponse:
+        plan, coa = self.resolve_request(payload)
+
+        cached = self.find_cached(plan, coa)
+        if cached:
+            return schemas.ConopsExportResponse(
+                product_id=cached.id, filename=self._filename(plan), content=self.read_content(cached), cached=True
+            )
+
+        revision = plan.revision
+        content = "".join(self.iter_conops(plan=plan, coa=coa))
+        stored = self.store.put(content, base_id=self._latest_content_id(plan, coa))
+        product = ProductCONOPS(
+            plan_id=plan.id,
+            coa_id=coa.id if coa else None,
+            plan_revision=revision,
+            content_id=stored.id,
+            summary=content[:200],
+        )
+        self.session.add(product)
+        self.session.commit()
+        self.session.refresh(product)
+
+        return schemas.ConopsExportResponse(product_id=product.id, filename=self._filename(plan), content=content)
+
+    def start_conops_stream(self, payload: schemas.ConopsExportRequest) -> Tuple[ProductCONOPS, str, Iterator[str]]:
+        """Validate the request and find or reserve a product row. The returned
+        iterator either replays the cached body or renders the document section
+        by section while appending it to storage.
+
+        The iterator opens its own session because it runs after the request
+        scoped session has been released.
+        """
+        plan, coa = self.resolve_request(payload)
+        cached = self.find_cached(plan, coa)
+        if cached and cached.content_id:
+            return cached, self._filename(plan), _stream_stored(cached.content_id, plan.id)
+
+        product = ProductCONOPS(plan_id=plan.id, coa_id=coa.id if coa else None, plan_revision=plan.revision)
+        self.session.add(product)
+        self.session.commit()
+        self.session.refresh(product)
+        return product, self._filename(plan), _stream_product(product.id, plan.id)
+
+    def find_cached(self, plan: Plan, coa: COA | None) -> Optional[ProductCONOPS]:
+        """Latest complete product rendered from the plan's current revision."""
+        statement = (
+            select(ProductCONOPS)
+            .where(
+                ProductCONOPS.plan_id == plan.id,
+                ProductCONOPS.coa_id == (coa.id if coa else None),
+                ProductCONOPS.plan_revision == plan.revision,
+                ProductCONOPS.content_id.is_not(None),
+            )
+            .order_by(ProductCONOPS.id.desc())
+            .limit(1)
+        )
+        return self.session.exec(statement).first()
+
+    def read_content(self, product: ProductCONOPS) -> str:
+        if product.content_id is None:
+            return product.content or ""
+        return self.store.read(product.content_id)
+
+    def list_products(self, plan_id: int) -> List[schemas.ProductRead]:
+        """Every product of the plan. Legacy products keep their body inline;
+        one still streaming has no body yet and reports no encoding or size."""
+        statement = (
+            select(ProductCONOPS, ProductContent)
+            .outerjoin(ProductContent, ProductContent.id == ProductCONOPS.content_id)
+            .where(ProductCONOPS.plan_id == plan_id)
+            .order_by(ProductCONOPS.id.desc())
+        )
+        products = []
+        for product, content in self.session.exec(statement):
+            if content is not None:
+                encoding, size, stored_size = content.encoding, content.size, content.stored_size
+            elif product.content is not None:
+                encoding, size = "plain", len(product.content.encode("utf-8"))
+                stored_size = size
+            else:
+                encoding = size = stored_size = None
+            products.append(
+                schemas.ProductRead(
+                    id=product.id,
+                    plan_id=product.plan_id,
+                    coa_id=product.coa_id,
+                    plan_revision=product.plan_revision,
+                    generated_at=product.generated_at,
+                    summary=product.summary or (product.content[:200] if product.content else None),
+                    encoding=encoding,
+                    size=size,
+                    stored_size=stored_size,
+                )
+            )
+        return products
+
+    def get_product(self, product_id: int) -> ProductCONOPS:
+        product = self.session.get(ProductCONOPS, product_id)
+        if not product or (product.content_id is None and product.content is None):
+            raise ValueError(f"Product {product_id} not found")
+        return product
+
+    def iter_product_content(self, product: ProductCONOPS) -> Iterator[str]:
+        """Body iterator that outlives this service's session."""
+        if product.content_id is None:
+            return iter([product.content or ""])
+        return _stream_stored(product.content_id, product.plan_id)
+
+    def diff_products(self, old_id: int, new_id: int) -> List[str]:
+        old, new = self.get_product(old_id), self.get_product(new_id)
+        old_label, new_label = f"product_{old.id}", f"product_{new.id}"
+        if old.content_id is None or new.content_id is None:
+            # Legacy inline products have no shared base; diff the texts directly
+            return [
+                line if line.endswith("\n") else line + "\n"
+                for line in difflib.unified_diff(
+                    self.read_content(old).splitlines(keepends=True),
+                    self.read_content(new).splitlines(keepends=True),
+                    fromfile=old_label,
+                    tofile=new_label,
+                )
+            ]
+        return list(self.store.diff(old.content_id, new.content_id, old_label, new_label))
+
+    def _latest_content_id(self, plan: Plan, coa: COA | None) -> Optional[int]:
+        """Previous version of this export, used as the delta base."""
+        statement = (
+            select(ProductCONOPS.content_id)
+            .where(
+                ProductCONOPS.plan_id == plan.id,
+                ProductCONOPS.coa_id == (coa.id if coa else None),
+                ProductCONOPS.content_id.is_not(None),
+            )
+            .order_by(ProductCONOPS.id.desc())
+            .limit(1)
+        )
+        return self.session.exec(statement).first()
+
+    def resolve_request(self, payload: schemas.ConopsExportRequest) -> Tuple[Plan, COA | None]:
         plan = self.session.get(Plan, payload.plan_id)
         if not plan:
             raise ValueError(f"Plan {payload.plan_id} not found")
@@ -23,21 +170,19 @@ class ExportService:
             coa = self.session.get(COA, payload.coa_id)
             if not coa or coa.plan_id != plan.id:
                 raise ValueError("COA not found for plan")
+        return plan, coa
 
-        ttl_items = self.session.exec(
-            select(TTL).where(TTL.plan_id == plan.id)
-        ).all()
-
-        content = self._build_markdown(plan=plan, coa=coa, ttl_items=ttl_items)
-        product = ProductCONOPS(plan_id=plan.id, coa_id=coa.id if coa else None, summary=content[:200], content=content)
-        self.session.add(product)
-        self.session.commit()
-        self.session.refresh(product)
-
-        filename = f"CONOPS_plan_{plan.id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.md"
-        return schemas.ConopsExportResponse(product_id=product.id, filename=filename, content=content)
+    def iter_conops(self, plan: Plan, coa: COA | None) -> Iterator[str]:
+        """Yield the Markdown document in chunks of at most one page of rows."""
+        first = True
+        for lines in self._iter_sections(plan, coa):
+            if not lines:
+                continue
+            text = "\n".join(lines)
+            yield text if first else "\n" + text
+            first = False
 
-    def _build_markdown(self, plan: Plan, coa: COA | None, ttl_items: List[TTL]) -> str:
+    def _iter_sections(self, plan: Plan, coa: COA | None) -> Iterator[List[str]]:
         header = ["# CONOPS", f"## Plan: {plan.name}"]
         if plan.scope:
             header.append(f"- Scope: {plan.scope}")
@@ -45,23 +190,138 @@ class ExportService:
             header.append(f"- Theater: {plan.theater}")
         if coa:
             header.append(f"- Selected COA: {coa.name}")
+        yield header
+
+        yield ["", "## Phases"]
+        phases = select(Phase).where(Phase.plan_id == plan.id).order_by(Phase.sequence, Phase.id)
+        yield from self._paged_lines(
+            phases,
+            lambda phase: f"- Phase {phase.sequence}: {phase.name} :: {phase.objectives or 'Objectives TBD'}",
+        )
+
+        yield ["", "## TTL Overview"]
+        references = _reference_days(plan)
+        yield from self._paged_lines(
+            self._ttl_overview_statement(plan, coa),
+            lambda row: _ttl_line(row, references),
+        )
+
+        yield ["", "## Key Decisions"]
+        decisions = select(Decision).where(Decision.plan_id == plan.id).order_by(Decision.created_at, Decision.id)
+        yield from self._paged_lines(
+            decisions,
+            lambda decision: f"- {decision.decision_text} (by {decision.author or 'unknown'})",
+        )
+
+    def _ttl_overview_statement(self, plan: Plan, coa: COA | None):
+        """One joined query resolves every name the TTL section prints, so the
+        query count is independent of the number of TTL items."""
+        statement = (
+            select(
+                TTL.id,
+                TTL.start_offset_hours,
+                TTL.end_offset_hours,
+                TTL.relative_to,
+                TTL.status,
+                Task.name.label("task_name"),
+                Phase.name.label("phase_name"),
+                Phase.sequence.label("phase_sequence"),
+                Area.name.label("area_name"),
+                Area.area_type,
+                COA.name.label("coa_name"),
+            )
+            .join(Task, Task.id == TTL.task_id)
+            .outerjoin(Phase, Phase.id == TTL.phase_id)
+            .outerjoin(Area, Area.id == TTL.area_id)
+            .outerjoin(COA, COA.id == TTL.coa_id)
+            .where(TTL.plan_id == plan.id)
+        )
+        if coa:
+            # Items without a COA apply to every COA
+            statement = statement.where(or_(TTL.coa_id == coa.id, TTL.coa_id.is_(None)))
+        return statement.order_by(Phase.sequence, TTL.start_offset_hours, TTL.id)
+
+    def _paged_lines(self, statement, render) -> Iterator[List[str]]:
+        rows = self.session.exec(statement.execution_options(yield_per=EXPORT_PAGE_SIZE))
+        for page in rows.partitions():
+            yield [render(row) for row in page]
+
+    def _filename(self, plan: Plan) -> str:
+        return f"CONOPS_plan_{plan.id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.md"
+
+
+def _reference_days(plan: Plan) -> Dict[str, Optional[datetime]]:
+    return {"M": plan.reference_m_day, "C": plan.reference_c_day, "D": plan.reference_d_day}
+
+
+def _absolute_time(references: Dict[str, Optional[datetime]], relative_to: Optional[str], hours: Optional[int]) -> str:
+    reference = references.get((relative_to or "D-Day")[:1].upper())
+    if reference is None or hours is None:
+        return "-"
+    return (reference + timedelta(hours=hours)).strftime("%Y-%m-%d %H:%MZ")
+
+
+def _offset(hours: Optional[int]) -> str:
+    return "?" if hours is None else f"{hours:+d}h"
+
+
+def _ttl_line(row, references: Dict[str, Optional[datetime]]) -> str:
+    phase = f"Phase {row.phase_sequence}: {row.phase_name}" if row.phase_name else "-"
+    area = f"{row.area_name} ({row.area_type})" if row.area_name else "-"
+    relative = row.relative_to or "D-Day"
+    window = f"{relative} {_offset(row.start_offset_hours)} to {_offset(row.end_offset_hours)}"
+    absolute = (
+        f"{_absolute_time(references, row.relative_to, row.start_offset_hours)} to "
+        f"{_absolute_time(references, row.relative_to, row.end_offset_hours)}"
+    )
+    status = row.status.value if hasattr(row.status, "value") else row.status
+    return (
+        f"- {row.task_name} | {phase} | {area} | {row.coa_name or 'All COAs'} :: "
+        f"{window} ({absolute}) [{status}]"
+    )
+
 
-        phases_section = ["## Phases"]
-        for phase in sorted(plan.phases, key=lambda p: p.sequence):
-            phases_section.append(f"- Phase {phase.sequence}: {phase.name} :: {phase.objectives or 'Objectives TBD'}")
+def _stream_product(product_id: int, plan_id: int) -> Iterator[str]:
+    # Rendering only reads. The body goes through a second session whose
+    # writer commits segment by segment, so no write transaction stays open
+    # while the client is downloading.
+    with session_scope(plan_id) as session, session_scope(plan_id) as write_session:
+        service = ExportService(session)
+        product = session.get(ProductCONOPS, product_id)
+        plan = session.get(Plan, product.plan_id)
+        coa = session.get(COA, product.coa_id) if product.coa_id else None
 
-        ttl_lines = ["## TTL Overview"]
-        for ttl in ttl_items:
-            ttl_lines.append(
-                f"- Task {ttl.task_id} in phase {ttl.phase_id or '-'} at area {ttl.area_id or '-'} :: {ttl.relative_to} +{ttl.start_offset_hours}h"
+        writer = ContentStore(write_session).writer()
+        summary: List[str] = []
+        summary_len = 0
+        completed = False
+        try:
+            for chunk in service.iter_conops(plan=plan, coa=coa):
+                yield chunk
+                writer.write(chunk)
+                if summary_len < 200:
+                    summary.append(chunk[: 200 - summary_len])
+                    summary_len += len(summary[-1])
+            content_id = writer.close()
+            # The product counts as complete once it points at its content
+            write_session.execute(
+                update(ProductCONOPS)
+                .where(ProductCONOPS.id == product_id)
+                .values(content_id=content_id, summary="".join(summary))
             )
+            write_session.commit()
+            completed = True
+        finally:
+            if not completed:
+                # Client went away or rendering failed: drop the partial product
+                writer.abort()
+                write_session.execute(delete(ProductCONOPS).where(ProductCONOPS.id == product_id))
+                write_session.commit()
 
-        decision_lines = ["## Key Decisions"]
-        for decision in plan.decisions:
-            decision_lines.append(f"- {decision.decision_text} (by {decision.author or 'unknown'})")
 
-        parts = header + [""] + phases_section + [""] + ttl_lines + [""] + decision_lines
-        return "\n".join(parts)
+def _stream_stored(content_id: int, plan_id: int) -> Iterator[str]:
+    with session_scope(plan_id) as session:
+        yield from ContentStore(session).iter_text(content_id)
 
 
 __all__ = ["ExportService"]
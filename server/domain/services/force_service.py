@@ -1,36 +1,248 @@
 from __future__ import annotations
 
-from typing import List
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
 
+from sqlalchemy import delete, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
-from server.db.models import UnitGeneric, UnitReal
+from server.db.models import UnitGeneric, UnitReal, UnitRollup
+from server.domain import schemas
+from server.domain.services.ric_catalogue import RICCatalogue, RICEntry, get_ric_catalogue
+
+UNSPECIFIED_SERVICE = "UNSPECIFIED"
 
 
 class ForceService:
-    def __init__(self, session: Session) -> None:
+    def __init__(self, session: Session, catalogue: Optional[RICCatalogue] = None) -> None:
         self.session = session
+        self.catalogue = catalogue or get_ric_catalogue()
 
     def list_generic_units(self) -> List[UnitGeneric]:
         return list(self.session.exec(select(UnitGeneric)).all())
 
+    def get_generic_unit(self, unit_id: int) -> UnitGeneric:
+        unit = self.session.get(UnitGeneric, unit_id)
+        if not unit:
+            raise ValueError(f"Generic unit {unit_id} not found")
+        return unit
+
     def create_generic_unit(self, payload: dict) -> UnitGeneric:
         unit = UnitGeneric(**payload)
         self.session.add(unit)
-        self.session.commit()
+        try:
+            self.session.commit()
+        except IntegrityError as exc:
+            self.session.rollback()
+            raise LookupError(f"Generic unit with RIC code {unit.ric_code} already exists") from exc
         self.session.refresh(unit)
         return unit
 
+    def resolve_generic_ric(self, unit_id: int) -> RICEntry:
+        unit = self.get_generic_unit(unit_id)
+        if not unit.ric_code:
+            raise ValueError(f"Generic unit {unit_id} has no RIC code")
+        entry = self.catalogue.get(unit.ric_code)
+        if not entry:
+            raise ValueError(f"RIC code {unit.ric_code} not found")
+        return entry
+
     def list_real_units(self) -> List[UnitReal]:
         statement = select(UnitReal)
         return list(self.session.exec(statement).all())
 
+    def get_real_unit(self, unit_id: int) -> UnitReal:
+        unit = self.session.get(UnitReal, unit_id)
+        if not unit:
+            raise ValueError(f"Unit {unit_id} not found")
+        return unit
+
+    def list_child_units(self, unit_id: int) -> List[UnitReal]:
+        self.get_real_unit(unit_id)
+        statement = select(UnitReal).where(UnitReal.parent_id == unit_id)
+        return list(self.session.exec(statement).all())
+
     def create_real_unit(self, payload: dict) -> UnitReal:
         unit = UnitReal(**payload)
+        if unit.parent_id is not None:
+            self.get_real_unit(unit.parent_id)
+        self._fill_strength(unit)
         self.session.add(unit)
+        try:
+            self.session.flush()
+        except IntegrityError as exc:
+            self.session.rollback()
+            raise LookupError(f"Real unit with UIC {unit.uic} already exists") from exc
+
+        # Only the new unit's ancestors change, so the roll-up costs O(depth)
+        own = {unit.parent_service or UNSPECIFIED_SERVICE: (unit.personnel or 0, unit.vehicles or 0, 1)}
+        self._add_totals([unit.id, *self._ancestors(unit.parent_id)], own)
+        self.session.commit()
+        self.session.refresh(unit)
+        return unit
+
+    def update_real_unit(self, unit_id: int, payload: dict) -> UnitReal:
+        """Apply ``payload`` and move the unit's roll-up contribution: its
+        subtree totals leave the old ancestors and join the new ones, and a
+        strength or service change adjusts its own row on the way."""
+        unit = self.get_real_unit(unit_id)
+        old_ancestors = self._ancestors(unit.parent_id)
+        old_service = unit.parent_service or UNSPECIFIED_SERVICE
+        old_own = (unit.personnel or 0, unit.vehicles or 0)
+
+        for key, value in payload.items():
+            if key != "id":
+                setattr(unit, key, value)
+        try:
+            self.session.flush()
+        except IntegrityError as exc:
+            self.session.rollback()
+            raise LookupError(f"Real unit with UIC {unit.uic} already exists") from exc
+        new_ancestors = self._ancestors(unit.parent_id)
+        if unit.parent_id is not None and not new_ancestors:
+            self.session.rollback()
+            raise ValueError(f"Unit {payload['parent_id']} not found")
+        if unit_id in new_ancestors:
+            self.session.rollback()
+            raise LookupError(f"Real unit {unit_id} cannot be placed under its own subordinate")
+
+        self._add_totals(old_ancestors, self._subtree_totals(unit.id), sign=-1)
+        own_delta: Dict[str, Tuple[int, int, int]] = defaultdict(lambda: (0, 0, 0))
+        own_delta[old_service] = (-old_own[0], -old_own[1], -1)
+        service = unit.parent_service or UNSPECIFIED_SERVICE
+        p, v, n = own_delta[service]
+        own_delta[service] = (p + (unit.personnel or 0), v + (unit.vehicles or 0), n + 1)
+        self._add_totals([unit.id], own_delta)
+        self._add_totals(new_ancestors, self._subtree_totals(unit.id))
         self.session.commit()
         self.session.refresh(unit)
         return unit
 
+    def delete_real_unit(self, unit_id: int) -> None:
+        unit = self.get_real_unit(unit_id)
+        if self.session.exec(select(UnitReal.id).where(UnitReal.parent_id == unit_id)).first() is not None:
+            raise LookupError(f"Real unit {unit_id} still has subordinate units")
+        self._add_totals(self._ancestors(unit.parent_id), self._subtree_totals(unit_id), sign=-1)
+        self.session.execute(delete(UnitRollup).where(UnitRollup.unit_id == unit_id))
+        self.session.delete(unit)
+        self.session.commit()
+
+    # Roll-ups ---------------------------------------------------------
+    def get_rollup(self, unit_id: int) -> schemas.UnitRollupRead:
+        unit = self.get_real_unit(unit_id)
+        rows = self.session.exec(select(UnitRollup).where(UnitRollup.unit_id == unit_id)).all()
+
+        totals = schemas.ForceTotals()
+        by_service: Dict[str, schemas.ForceTotals] = {}
+        for row in rows:
+            by_service[row.service] = schemas.ForceTotals(
+                personnel=row.personnel, vehicles=row.vehicles, unit_count=row.unit_count
+            )
+            totals.personnel += row.personnel
+            totals.vehicles += row.vehicles
+            totals.unit_count += row.unit_count
+        return schemas.UnitRollupRead(
+            unit_id=unit.id, name=unit.name, echelon=unit.echelon, totals=totals, by_service=by_service
+        )
+
+    def rebuild_rollups(self) -> int:
+        """Recompute every roll-up row from scratch, e.g. after a bulk load."""
+        units = self.session.exec(
+            select(UnitReal.id, UnitReal.parent_id, UnitReal.parent_service, UnitReal.personnel, UnitReal.vehicles)
+        ).all()
+        parents = {row.id: row.parent_id for row in units}
+
+        totals: Dict[Tuple[int, str], List[int]] = defaultdict(lambda: [0, 0, 0])
+        for row in units:
+            service = row.parent_service or UNSPECIFIED_SERVICE
+            for ancestor_id in _walk_up(row.id, parents):
+                bucket = totals[(ancestor_id, service)]
+                bucket[0] += row.personnel or 0
+                bucket[1] += row.vehicles or 0
+                bucket[2] += 1
+
+        self.session.execute(delete(UnitRollup))
+        if totals:
+            self.session.execute(
+                insert(UnitRollup),
+                [
+                    {"unit_id": unit_id, "service": service, "personnel": p, "vehicles": v, "unit_count": n}
+                    for (unit_id, service), (p, v, n) in totals.items()
+                ],
+            )
+        self.session.commit()
+        return len(totals)
+
+    def _fill_strength(self, unit: UnitReal) -> None:
+        if unit.personnel is not None and unit.vehicles is not None:
+            return
+        if unit.generic_unit_id is None:
+            return
+        generic = self.get_generic_unit(unit.generic_unit_id)
+        entry = self.catalogue.get(generic.ric_code) if generic.ric_code else None
+        if not entry:
+            return
+        if unit.personnel is None:
+            unit.personnel = entry.personnel
+        if unit.vehicles is None:
+            unit.vehicles = entry.vehicles
+
+    def _ancestors(self, parent_id: Optional[int]) -> List[int]:
+        """``parent_id`` and its ancestors, nearest first; empty when the
+        parent does not exist."""
+        chain: List[int] = []
+        while parent_id is not None and parent_id not in chain:
+            parent = self.session.get(UnitReal, parent_id)
+            if parent is None:
+                break
+            chain.append(parent_id)
+            parent_id = parent.parent_id
+        return chain
+
+    def _subtree_totals(self, unit_id: int) -> Dict[str, Tuple[int, int, int]]:
+        # Columns, not entities: rows loaded earlier would not see the SQL increments
+        rows = self.session.exec(
+            select(UnitRollup.service, UnitRollup.personnel, UnitRollup.vehicles, UnitRollup.unit_count).where(
+                UnitRollup.unit_id == unit_id
+            )
+        ).all()
+        return {service: (personnel, vehicles, count) for service, personnel, vehicles, count in rows}
+
+    def _add_totals(self, chain: List[int], totals: Dict[str, Tuple[int, int, int]], sign: int = 1) -> None:
+        if not chain:
+            return
+        # Make sure every row exists, then increment in SQL: concurrent writes
+        # under one parent neither lose updates nor collide on the insert
+        dialect = postgresql if self.session.get_bind().dialect.name == "postgresql" else sqlite
+        for service, (personnel, vehicles, count) in totals.items():
+            if not (personnel or vehicles or count):
+                continue
+            empty = [{"unit_id": unit_id, "service": service, "personnel": 0, "vehicles": 0, "unit_count": 0} for unit_id in chain]
+            self.session.execute(
+                dialect.insert(UnitRollup).values(empty).on_conflict_do_nothing(index_elements=["unit_id", "service"])
+            )
+            self.session.execute(
+                update(UnitRollup)
+                .where(UnitRollup.unit_id.in_(chain), UnitRollup.service == service)
+                .values(
+                    personnel=UnitRollup.personnel + sign * personnel,
+                    vehicles=UnitRollup.vehicles + sign * vehicles,
+                    unit_count=UnitRollup.unit_count + sign * count,
+                )
+            )
+        # A service with no units left under an ancestor drops out of its roll-up
+        self.session.execute(delete(UnitRollup).where(UnitRollup.unit_id.in_(chain), UnitRollup.unit_count <= 0))
+
+
+def _walk_up(unit_id: int, parents: Dict[int, Optional[int]]):
+    seen = set()
+    current: Optional[int] = unit_id
+    while current is not None and current not in seen:
+        seen.add(current)
+        yield current
+        current = parents.get(current)
+
 
 __all__ = ["ForceService"]
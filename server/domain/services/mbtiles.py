@@ -0,0 +1,254 @@
+"""Offline basemap tiles served straight from ``.mbtiles`` files.
+
+The tilesets are the ones listed in ``infra/tiles/tileserver.json``, so the
+same config works with or without the tileserver-gl container. Each file
+is opened read-only and ``immutable`` (SQLite skips locking and change
+detection) with memory-mapped I/O, one connection per worker thread.
+Tiles are kept in a byte-bounded LRU together with a strong ETag, so
+panning back over recently seen tiles never touches SQLite. Replacing a
+file needs a restart.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_CONFIG = Path(__file__).resolve().parents[3] / "infra" / "tiles" / "tileserver.json"
+
+TILESERVER_CONFIG = os.getenv("TILESERVER_CONFIG", str(_DEFAULT_CONFIG))
+# Set to use an external tileserver-gl for the basemap instead of these routes
+TILESERVER_URL = os.getenv("TILESERVER_URL", "")
+# Directory holding the .mbtiles files; defaults to the config's paths.root
+MBTILES_DIR = os.getenv("MBTILES_DIR")
+MBTILES_MMAP_SIZE = int(os.getenv("MBTILES_MMAP_SIZE", str(1024 * 1024 * 1024)))
+MBTILES_CACHE_MB = int(os.getenv("MBTILES_CACHE_MB", "64"))
+MBTILES_MAX_AGE = int(os.getenv("MBTILES_MAX_AGE", "86400"))
+
+_CONTENT_TYPES = {
+    "pbf": "application/x-protobuf",
+    "mvt": "application/vnd.mapbox-vector-tile",
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+
+@dataclass(frozen=True)
+class Tile:
+    data: bytes
+    etag: str
+    content_type: str
+    # "gzip" when the stored blob is already compressed, as vector tiles usually are
+    encoding: Optional[str]
+
+
+class MBTiles:
+    """Read-only access to one ``.mbtiles`` file."""
+
+    def __init__(self, tileset_id: str, path: Path, name: Optional[str] = None, attribution: Optional[str] = None) -> None:
+        self.id = tileset_id
+        self.path = path
+        self.name = name
+        self.attribution = attribution
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+            connection.execute(f"PRAGMA mmap_size = {MBTILES_MMAP_SIZE}")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    @cached_property
+    def metadata(self) -> Dict[str, str]:
+        return dict(self._connection().execute("SELECT name, value FROM metadata"))
+
+    @property
+    def format(self) -> str:
+        return self.metadata.get("format", "pbf")
+
+    def tile(self, z: int, x: int, y: int) -> Optional[Tile]:
+        # MBTiles rows count from the south (TMS), XYZ from the north
+        row = self._connection().execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (z, x, (1 << z) - 1 - y),
+        ).fetchone()
+        if row is None:
+            return None
+        data = bytes(row[0])
+        return Tile(
+            data=data,
+            etag='"' + hashlib.blake2b(data, digest_size=12).hexdigest() + '"',
+            content_type=_CONTENT_TYPES.get(self.format, "application/octet-stream"),
+            encoding="gzip" if data[:2] == b"\x1f\x8b" else None,
+        )
+
+    def tilejson(self, tiles_url: str) -> dict:
+        """TileJSON 3.0 built from the file's metadata table."""
+        metadata = self.metadata
+        tilejson: dict = {
+            "tilejson": "3.0.0",
+            "name": metadata.get("name") or self.name or self.id,
+            "scheme": "xyz",
+            "format": self.format,
+            "tiles": [tiles_url],
+            "minzoom": int(metadata.get("minzoom", 0)),
+            "maxzoom": int(metadata.get("maxzoom", 14)),
+        }
+        for key in ("bounds", "center"):
+            if metadata.get(key):
+                tilejson[key] = [float(part) for part in metadata[key].split(",")]
+        attribution = self.attribution or metadata.get("attribution")
+        if attribution:
+            tilejson["attribution"] = attribution
+        if metadata.get("json"):
+            try:
+                tilejson["vector_layers"] = json.loads(metadata["json"]).get("vector_layers", [])
+            except ValueError:
+                logger.warning("Ignoring malformed metadata json in %s", self.path)
+        return tilejson
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+
+class TileCache:
+    """LRU of tiles bounded by total size. Missing tiles are remembered too,
+    since panning over empty areas asks for them repeatedly."""
+
+    def __init__(self, max_bytes: int = MBTILES_CACHE_MB * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._tiles: "OrderedDict[Tuple[str, int, int, int], Optional[Tile]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, int, int, int]) -> Tuple[bool, Optional[Tile]]:
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+                return True, self._tiles[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Tuple[str, int, int, int], tile: Optional[Tile]) -> None:
+        size = len(tile.data) if tile else 0
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._tiles.pop(key, None)
+            self.size -= len(previous.data) if previous else 0
+            self._tiles[key] = tile
+            self.size += size
+            # The entry cap bounds remembered misses, which take no bytes
+            while self.size > self.max_bytes or len(self._tiles) > self.max_bytes // 64:
+                _, evicted = self._tiles.popitem(last=False)
+                self.size -= len(evicted.data) if evicted else 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"tiles": len(self._tiles), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+
+class TilesetCatalogue:
+    """The tilesets named in ``tileserver.json`` whose files are present."""
+
+    def __init__(self, config_path: str = TILESERVER_CONFIG, cache: Optional[TileCache] = None) -> None:
+        self.cache = cache or TileCache()
+        self.tilesets: Dict[str, MBTiles] = {}
+        self.configured: List[str] = []
+        self.basemap_id: Optional[str] = None
+        self._load(Path(config_path))
+
+    def _load(self, config_path: Path) -> None:
+        try:
+            config = json.loads(config_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            logger.info("No tileset config at %s (%s)", config_path, exc)
+            return
+        root = Path(MBTILES_DIR) if MBTILES_DIR else config_path.parent / config.get("options", {}).get("paths", {}).get("root", ".")
+        entries = [dict(entry) for entry in config.get("tilesets", [])]
+        # tileserver-gl's own layout keys data sources by id
+        entries += [{"id": tileset_id, **entry} for tileset_id, entry in config.get("data", {}).items()]
+        for entry in entries:
+            tileset_id, filename = entry.get("id"), entry.get("mbtiles")
+            if not tileset_id or not filename:
+                continue
+            self.configured.append(tileset_id)
+            if self.basemap_id is None and entry.get("type", "baselayer") == "baselayer":
+                self.basemap_id = tileset_id
+            path = root / filename
+            if not path.is_file():
+                logger.warning("Tileset %s: %s not found", tileset_id, path)
+                continue
+            self.tilesets[tileset_id] = MBTiles(tileset_id, path, entry.get("name"), entry.get("attribution"))
+
+    def get(self, tileset_id: str) -> MBTiles:
+        tileset = self.tilesets.get(tileset_id)
+        if tileset is None:
+            raise ValueError(f"Tileset {tileset_id} not found")
+        return tileset
+
+    def basemap_tilejson_url(self, tiles_root: str) -> Optional[str]:
+        """Where map styles load the basemap from: ``TILESERVER_URL`` when
+        set, otherwise the built-in route under ``tiles_root``."""
+        if self.basemap_id is None:
+            return None
+        if TILESERVER_URL:
+            return f"{TILESERVER_URL.rstrip('/')}/data/{self.basemap_id}.json"
+        if self.basemap_id in self.tilesets:
+            return f"{tiles_root.rstrip('/')}/{self.basemap_id}.json"
+        return None
+
+    def cached(self, tileset_id: str, z: int, x: int, y: int) -> Tuple[bool, Optional[Tile]]:
+        """Cache-only lookup, cheap enough for the event loop; ``(False,
+        None)`` means the tile has to be read with ``tile``."""
+        self.get(tileset_id)
+        if not (0 <= z <= 30 and 0 <= x < (1 << z) and 0 <= y < (1 << z)):
+            return True, None
+        return self.cache.get((tileset_id, z, x, y))
+
+    def tile(self, tileset_id: str, z: int, x: int, y: int) -> Optional[Tile]:
+        found, tile = self.cached(tileset_id, z, x, y)
+        return tile if found else self.load(tileset_id, z, x, y)
+
+    def load(self, tileset_id: str, z: int, x: int, y: int) -> Optional[Tile]:
+        """Read a tile from its file into the cache."""
+        tile = self.get(tileset_id).tile(z, x, y)
+        self.cache.put((tileset_id, z, x, y), tile)
+        return tile
+
+    def close(self) -> None:
+        for tileset in self.tilesets.values():
+            tileset.close()
+
+
+@lru_cache(maxsize=1)
+def get_tileset_catalogue() -> TilesetCatalogue:
+    return TilesetCatalogue()
+
+
+__all__ = ["MBTILES_MAX_AGE", "MBTiles", "Tile", "TileCache", "TilesetCatalogue", "get_tileset_catalogue"]
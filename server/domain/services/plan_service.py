@@ -6,6 +6,7 @@ from sqlmodel import Session, select
 
 from server.db.models import Area, COA, Plan, Phase, Task, TTL, TaskCategory
 from server.domain import schemas
+from server.domain.services.spatial_service import area_bbox
 
 
 class PlanningService:
@@ -50,7 +51,8 @@ class PlanningService:
     # Areas
     def create_area(self, plan_id: int, data: schemas.AreaCreate) -> Area:
         plan = self.get_plan(plan_id)
-        area = Area(plan_id=plan.id, **data.model_dump())
+        min_x, min_y, max_x, max_y = area_bbox(data.geojson)
+        area = Area(plan_id=plan.id, min_x=min_x, min_y=min_y, max_x=max_x, max_y=max_y, **data.model_dump())
         self.session.add(area)
         self.session.commit()
         self.session.refresh(area)
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import bisect
+import csv
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PATH = Path(__file__).resolve().parents[3] / "infra" / "seed" / "ric_codes.csv"
+
+RIC_CATALOGUE_PATH = os.getenv("RIC_CATALOGUE_PATH", str(_DEFAULT_PATH))
+RIC_RELOAD_INTERVAL = float(os.getenv("RIC_RELOAD_INTERVAL", "2.0"))
+
+# Used when no seed file is present so the demo endpoints keep answering
+_FALLBACK_ENTRIES = (
+    ("INF-BN", "Infantry Battalion", 720, 120, None),
+    ("ARM-CO", "Armored Company", 160, 60, None),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class RICEntry:
+    code: str
+    name: str
+    personnel: Optional[int]
+    vehicles: Optional[int]
+    category: Optional[str]
+
+    def as_dict(self) -> dict:
+        return {
+            "code": self.code,
+            "name": self.name,
+            "personnel": self.personnel,
+            "vehicles": self.vehicles,
+            "category": self.category,
+        }
+
+
+class _RICIndex:
+    """Immutable snapshot of the catalogue: a hash map for exact lookups and a
+    sorted code array for prefix range scans."""
+
+    __slots__ = ("by_code", "codes", "version", "source", "loaded_at")
+
+    def __init__(self, entries: Iterable[RICEntry], version: Tuple[int, int], source: Optional[str]) -> None:
+        self.by_code: Dict[str, RICEntry] = {entry.code: entry for entry in entries}
+        self.codes: List[str] = sorted(self.by_code)
+        self.version = version
+        self.source = source
+        self.loaded_at = time.time()
+
+    def prefix(self, prefix: str, limit: int) -> List[RICEntry]:
+        start = bisect.bisect_left(self.codes, prefix)
+        matches: List[RICEntry] = []
+        for code in self.codes[start:start + limit]:
+            if not code.startswith(prefix):
+                break
+            matches.append(self.by_code[code])
+        return matches
+
+
+class RICCatalogue:
+    """In-memory RIC catalogue loaded from a CSV/YAML seed file.
+
+    Lookups read the current index snapshot without locking. The file is
+    loaded on first use. After that it is polled at most every
+    ``reload_interval`` seconds from a background thread: a changed file is
+    parsed into a fresh index and swapped in with one reference assignment,
+    so readers never wait for a reload and always see either the old or the
+    new catalogue. A file that fails to parse is logged and the last good
+    index stays in service.
+    """
+
+    def __init__(self, path: Optional[str] = RIC_CATALOGUE_PATH, reload_interval: float = RIC_RELOAD_INTERVAL) -> None:
+        self.path = Path(path) if path else None
+        self.reload_interval = reload_interval
+        self._reload_lock = threading.Lock()
+        self._next_check = 0.0
+        self._index: Optional[_RICIndex] = None
+        # File version that last failed to parse, so it is not retried every poll
+        self._failed_version: Optional[Tuple[int, int]] = None
+
+    # Lookups ----------------------------------------------------------
+    def get(self, code: str) -> Optional[RICEntry]:
+        return self._current().by_code.get(normalize_code(code))
+
+    def prefix(self, prefix: str, limit: int = 50) -> List[RICEntry]:
+        return self._current().prefix(normalize_code(prefix), limit)
+
+    def batch(self, codes: Iterable[str]) -> Dict[str, Optional[RICEntry]]:
+        index = self._current()
+        return {code: index.by_code.get(normalize_code(code)) for code in codes}
+
+    def stats(self) -> dict:
+        index = self._current()
+        return {
+            "source": index.source,
+            "entries": len(index.codes),
+            "version": list(index.version),
+            "loaded_at": index.loaded_at,
+        }
+
+    # Reloading --------------------------------------------------------
+    def reload(self, force: bool = False) -> bool:
+        """Rebuild the index if the seed file changed. Returns True on swap."""
+        if not self._reload_lock.acquire(blocking=force):
+            # Another thread is already rebuilding; keep serving the old index
+            return False
+        try:
+            if not force and self._index is not None and self._file_version() in (self._index.version, self._failed_version):
+                return False
+            return self._load()
+        finally:
+            self._reload_lock.release()
+
+    def _current(self) -> _RICIndex:
+        index = self._index
+        if index is None:
+            with self._reload_lock:
+                if self._index is None:
+                    self._next_check = time.monotonic() + self.reload_interval
+                    self._load()
+            return self._index
+        now = time.monotonic()
+        if self.reload_interval >= 0 and now >= self._next_check:
+            self._next_check = now + self.reload_interval
+            threading.Thread(target=self.reload, name="ric-reload", daemon=True).start()
+        return index
+
+    def _load(self) -> bool:
+        """Build and publish a new index; the caller holds the reload lock."""
+        version = self._file_version()
+        try:
+            index = self._build_index()
+        except Exception as exc:  # noqa: BLE001
+            # A half-written seed file must not take the catalogue down
+            logger.warning("RIC catalogue load from %s failed: %s", self.path, exc)
+            self._failed_version = version
+            if self._index is None:
+                # Nothing to keep yet: serve an empty catalogue until the file changes
+                self._index = _RICIndex((), version, str(self.path))
+            return False
+        self._index = index
+        return True
+
+    def _file_version(self) -> Tuple[int, int]:
+        if not self.path:
+            return (0, 0)
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return (0, 0)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _build_index(self) -> _RICIndex:
+        version = self._file_version()
+        if version == (0, 0):
+            entries = (RICEntry(*row) for row in _FALLBACK_ENTRIES)
+            return _RICIndex(entries, version, None)
+        return _RICIndex(_read_entries(self.path), version, str(self.path))
+
+
+def normalize_code(code: str) -> str:
+    return code.strip().upper()
+
+
+def _read_entries(path: Path) -> Iterator[RICEntry]:
+    with path.open(newline="", encoding="utf-8") as handle:
+        if path.suffix.lower() in (".yaml", ".yml"):
+            import yaml
+
+            rows = yaml.safe_load(handle) or []
+        else:
+            rows = csv.DictReader(handle)
+
+        for row in rows:
+            code = row.get("code") or row.get("ric_code")
+            if not code:
+                continue
+            yield RICEntry(
+                code=normalize_code(str(code)),
+                name=str(row.get("name") or code),
+                personnel=_to_int(row.get("personnel")),
+                vehicles=_to_int(row.get("vehicles")),
+                category=row.get("category") or None,
+            )
+
+
+def _to_int(value) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    return int(value)
+
+
+@lru_cache(maxsize=1)
+def get_ric_catalogue() -> RICCatalogue:
+    return RICCatalogue()
+
+
+__all__ = ["RICCatalogue", "RICEntry", "get_ric_catalogue", "normalize_code"]
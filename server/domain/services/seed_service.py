@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, SQLModel
+
+from server.db.models import TTRRule, UnitGeneric, UnitReal
+from server.domain import schemas
+from server.domain.services.force_service import ForceService
+from server.domain.services.ric_catalogue import RICCatalogue, get_ric_catalogue, normalize_code
+
+_DEFAULT_SEED_DIR = Path(__file__).resolve().parents[3] / "infra" / "seed"
+
+SEED_DIR = os.getenv("SEED_DIR", str(_DEFAULT_SEED_DIR))
+SEED_BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "500"))
+SEED_COPY_BATCH_SIZE = int(os.getenv("SEED_COPY_BATCH_SIZE", "20000"))
+
+SEED_KINDS = ("units_generic", "units_real", "ttr_rules")
+_EXTENSIONS = (".yaml", ".yml", ".csv", ".jsonl")
+
+
+class SeedService:
+    """Streams seed files into the database, upserting by natural key.
+
+    Rows are read lazily and written in batches of ``INSERT ... ON CONFLICT
+    DO UPDATE`` against the natural key's unique index: ``executemany`` on
+    SQLite, ``COPY`` into a staging table on Postgres. Each batch commits on
+    its own, and re-running a load only rewrites existing rows, so loads are
+    idempotent and resumable, also when two run at once.
+    """
+
+    def __init__(self, session: Session, catalogue: Optional[RICCatalogue] = None) -> None:
+        self.session = session
+        self.catalogue = catalogue or get_ric_catalogue()
+        self.use_copy = session.get_bind().dialect.name == "postgresql"
+
+    def load_directory(self, directory: str = SEED_DIR, kinds: Sequence[str] = SEED_KINDS) -> List[schemas.SeedLoadResult]:
+        results = []
+        for kind in SEED_KINDS:
+            if kind not in kinds:
+                continue
+            path = find_seed_file(directory, kind)
+            if path:
+                results.append(self.load_file(kind, path))
+        return results
+
+    def load_file(self, kind: str, path: Path) -> schemas.SeedLoadResult:
+        started = time.perf_counter()
+        if kind == "units_generic":
+            counts = self._upsert(UnitGeneric, "ric_code", self._generic_rows(path))
+        elif kind == "units_real":
+            counts = self._load_real_units(path)
+        elif kind == "ttr_rules":
+            counts = self._upsert(TTRRule, "name", self._ttr_rows(path))
+        else:
+            raise ValueError(f"Unknown seed kind {kind}")
+
+        inserted, updated, skipped = counts
+        return schemas.SeedLoadResult(
+            kind=kind,
+            file=str(path),
+            inserted=inserted,
+            updated=updated,
+            skipped=skipped,
+            seconds=round(time.perf_counter() - started, 3),
+        )
+
+    # Row shaping ------------------------------------------------------
+    def _generic_rows(self, path: Path) -> Iterator[dict]:
+        for row in iter_seed_rows(path):
+            ric_code = row.get("ric_code") or row.get("code")
+            yield {
+                "ric_code": normalize_code(str(ric_code)) if ric_code else None,
+                "name": row.get("name"),
+                "category": row.get("category"),
+                "description": row.get("description"),
+                "factors_of_merit": _as_text(row.get("factors_of_merit")),
+            }
+
+    def _ttr_rows(self, path: Path) -> Iterator[dict]:
+        for row in iter_seed_rows(path):
+            yield {
+                "name": row.get("name"),
+                "description": row.get("description"),
+                "rule_script": _as_text(row.get("rule_script") or row.get("rule")),
+            }
+
+    def _load_real_units(self, path: Path) -> Tuple[int, int, int]:
+        generic_ids = dict(
+            self.session.execute(select(UnitGeneric.ric_code, UnitGeneric.id).where(UnitGeneric.ric_code.is_not(None))).all()
+        )
+
+        def rows() -> Iterator[dict]:
+            for row in iter_seed_rows(path):
+                ric_code = row.get("generic_ric_code") or row.get("ric_code")
+                ric_code = normalize_code(str(ric_code)) if ric_code else None
+                entry = self.catalogue.get(ric_code) if ric_code else None
+                personnel = row.get("personnel")
+                vehicles = row.get("vehicles")
+                yield {
+                    # Files without a uic column key units by name
+                    "uic": row.get("uic") or row.get("name"),
+                    "name": row.get("name"),
+                    "parent_service": row.get("parent_service") or row.get("service"),
+                    "echelon": row.get("echelon"),
+                    "home_station": row.get("home_station"),
+                    "generic_unit_id": generic_ids.get(ric_code),
+                    "personnel": int(personnel) if personnel not in (None, "") else (entry.personnel if entry else None),
+                    "vehicles": int(vehicles) if vehicles not in (None, "") else (entry.vehicles if entry else None),
+                }
+
+        counts = self._upsert(UnitReal, "uic", rows())
+        self._link_parents(path)
+        ForceService(self.session, self.catalogue).rebuild_rollups()
+        return counts
+
+    def _link_parents(self, path: Path) -> None:
+        """Second pass: parents may appear after their children in the file.
+        ``parent`` holds the parent's uic (its name in files without one)."""
+        pairs = ((row.get("uic") or row.get("name"), row.get("parent")) for row in iter_seed_rows(path) if "parent" in row)
+        for chunk in _chunks(((uic, parent) for uic, parent in pairs if uic), SEED_BATCH_SIZE):
+            uics = {uic for uic, _ in chunk} | {parent for _, parent in chunk if parent}
+            ids = dict(self.session.execute(select(UnitReal.uic, UnitReal.id).where(UnitReal.uic.in_(uics))).all())
+            params = [
+                {"b_id": ids[uic], "b_parent_id": ids.get(parent) if parent else None}
+                for uic, parent in chunk
+                if uic in ids
+            ]
+            if params:
+                table = UnitReal.__table__
+                self.session.connection().execute(
+                    update(table).where(table.c.id == bindparam("b_id")).values(parent_id=bindparam("b_parent_id")),
+                    params,
+                )
+            self.session.commit()
+
+    # Upsert -----------------------------------------------------------
+    def _upsert(self, model: Type[SQLModel], key: str, rows: Iterable[dict]) -> Tuple[int, int, int]:
+        inserted = updated = skipped = 0
+        batch_size = SEED_COPY_BATCH_SIZE if self.use_copy else SEED_BATCH_SIZE
+        for chunk in _chunks(rows, batch_size):
+            unique: Dict[str, dict] = {}
+            for row in chunk:
+                if row.get(key) in (None, "") or not row.get("name"):
+                    skipped += 1
+                    continue
+                unique[row[key]] = row  # last occurrence in a batch wins
+            if not unique:
+                continue
+            batch = list(unique.values())
+            if self.use_copy:
+                ins, upd = self._copy_upsert(model, key, batch)
+            else:
+                ins, upd = self._executemany_upsert(model, key, batch)
+            self.session.commit()
+            inserted += ins
+            updated += upd
+        return inserted, updated, skipped
+
+    def _executemany_upsert(self, model: Type[SQLModel], key: str, batch: List[dict]) -> Tuple[int, int]:
+        table = model.__table__
+        # Only for the counts: the upsert itself does not depend on it
+        existing = self.session.execute(
+            select(table.c[key]).where(table.c[key].in_([row[key] for row in batch]))
+        ).scalars().all()
+
+        statement = sqlite_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[key],
+            set_={col: statement.excluded[col] for col in batch[0] if col != key},
+        )
+        self.session.connection().execute(statement, batch)
+        updated = len(existing)
+        return len(batch) - updated, updated
+
+    def _copy_upsert(self, model: Type[SQLModel], key: str, batch: List[dict]) -> Tuple[int, int]:
+        table = model.__table__.name
+        columns = list(batch[0])
+        column_list = ", ".join(columns)
+        assignments = ", ".join(f"{col} = EXCLUDED.{col}" for col in columns if col != key)
+
+        buffer = io.StringIO()
+        for row in batch:
+            buffer.write("\t".join(_copy_value(row.get(col)) for col in columns))
+            buffer.write("\n")
+        buffer.seek(0)
+
+        cursor = self.session.connection().connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS seed_stage_{table} ON COMMIT DELETE ROWS "
+                f"AS SELECT {column_list} FROM {table} WITH NO DATA"
+            )
+            cursor.copy_expert(f"COPY seed_stage_{table} ({column_list}) FROM STDIN", buffer)
+            # xmax is 0 only on rows the statement inserted
+            cursor.execute(
+                f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM seed_stage_{table} "
+                f"ON CONFLICT ({key}) DO UPDATE SET {assignments} RETURNING xmax = 0"
+            )
+            flags = [row[0] for row in cursor.fetchall()]
+            inserted = sum(flags)
+            updated = len(flags) - inserted
+        finally:
+            cursor.close()
+        return inserted, updated
+
+
+def find_seed_file(directory: str, kind: str) -> Optional[Path]:
+    for extension in _EXTENSIONS:
+        path = Path(directory) / f"{kind}{extension}"
+        if path.exists():
+            return path
+    return None
+
+
+def iter_seed_rows(path: Path) -> Iterator[dict]:
+    """Yield seed rows one at a time from a CSV, JSONL or YAML list file."""
+    suffix = path.suffix.lower()
+    with path.open(newline="", encoding="utf-8") as handle:
+        if suffix == ".csv":
+            for row in csv.DictReader(handle):
+                yield {k: (v if v != "" else None) for k, v in row.items()}
+        elif suffix == ".jsonl":
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _iter_yaml_sequence(handle)
+
+
+def _iter_yaml_sequence(handle) -> Iterator[dict]:
+    # Compose one list item at a time instead of materialising the whole document
+    import yaml
+
+    loader = yaml.SafeLoader(handle)
+    try:
+        loader.get_event()  # StreamStart
+        if loader.check_event(yaml.StreamEndEvent):
+            return
+        loader.get_event()  # DocumentStart
+        if not loader.check_event(yaml.SequenceStartEvent):
+            raise ValueError("Seed YAML must be a top-level list of mappings")
+        loader.get_event()
+        while not loader.check_event(yaml.SequenceEndEvent):
+            node = loader.compose_node(None, None)
+            yield loader.construct_document(node)
+    finally:
+        loader.dispose()
+
+
+def _chunks(rows: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _as_text(value) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    text = str(value)
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+__all__ = ["SeedService", "SEED_DIR", "SEED_KINDS", "find_seed_file", "iter_seed_rows"]
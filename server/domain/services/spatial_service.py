@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from server.db.models import Area, Plan, TTL
+from server.domain import schemas
+from server.domain.geo import BBox, RTree, Shape, parse_geojson
+
+SPATIAL_INDEX_PLANS = int(os.getenv("SPATIAL_INDEX_PLANS", "64"))
+
+
+class PlanAreaIndex:
+    """R-tree over one plan's area bounding boxes, valid for one plan
+    revision. GeoJSON is parsed the first time an area is a candidate.
+
+    ``version`` fingerprints the areas themselves, so caches of rendered
+    areas (vector tiles) survive revisions that changed something else.
+    """
+
+    def __init__(self, revision: int, rows: List[Tuple[int, float, float, float, float, str, str, str]]) -> None:
+        self.revision = revision
+        self.tree: RTree[int] = RTree(((row[1], row[2], row[3], row[4]), row[0]) for row in rows)
+        self.bbox: Optional[BBox] = (
+            (min(row[1] for row in rows), min(row[2] for row in rows), max(row[3] for row in rows), max(row[4] for row in rows))
+            if rows
+            else None
+        )
+        self.properties: Dict[int, Dict[str, str]] = {row[0]: {"name": row[6], "area_type": row[7]} for row in rows}
+        self._geojson: Dict[int, str] = {row[0]: row[5] for row in rows}
+        self._shapes: Dict[int, Optional[Shape]] = {}
+        digest = hashlib.sha1()
+        for row in sorted(rows, key=lambda row: row[0]):
+            digest.update(repr((row[0], row[5], row[6], row[7])).encode())
+        self.version = digest.hexdigest()[:16]
+
+    def __contains__(self, area_id: int) -> bool:
+        return area_id in self._geojson
+
+    def shape(self, area_id: int) -> Optional[Shape]:
+        if area_id not in self._shapes:
+            try:
+                self._shapes[area_id] = parse_geojson(self._geojson[area_id])
+            except ValueError:
+                self._shapes[area_id] = None
+        return self._shapes[area_id]
+
+    def query(self, box: BBox) -> List[int]:
+        matches = []
+        for area_id in self.tree.search(box):
+            shape = self.shape(area_id)
+            if shape is not None and shape.intersects_bbox(box):
+                matches.append(area_id)
+        return sorted(matches)
+
+
+class AreaIndexCache:
+    """Per-plan ``PlanAreaIndex`` instances, least recently used evicted.
+
+    Any change to a plan bumps ``Plan.revision``, so a cached index is
+    reused only while the revision it was built at is still current.
+    """
+
+    def __init__(self, max_plans: int = SPATIAL_INDEX_PLANS) -> None:
+        self.max_plans = max_plans
+        self._indexes: "OrderedDict[int, PlanAreaIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session: Session, plan: Plan) -> PlanAreaIndex:
+        with self._lock:
+            index = self._indexes.get(plan.id)
+            if index is not None and index.revision == plan.revision:
+                self._indexes.move_to_end(plan.id)
+                return index
+        rows = session.exec(
+            select(Area.id, Area.min_x, Area.min_y, Area.max_x, Area.max_y, Area.geojson, Area.name, Area.area_type)
+            .where(Area.plan_id == plan.id, Area.min_x.is_not(None))
+        ).all()
+        index = PlanAreaIndex(plan.revision, rows)
+        with self._lock:
+            current = self._indexes.get(plan.id)
+            if current is None or current.revision <= index.revision:
+                self._indexes[plan.id] = index
+                self._indexes.move_to_end(plan.id)
+            while len(self._indexes) > self.max_plans:
+                self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, plan_id: Optional[int] = None) -> None:
+        with self._lock:
+            if plan_id is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(plan_id, None)
+
+
+class SpatialService:
+    """Bbox and point queries over plan areas.
+
+    On PostGIS the ``geom`` column and its GiST index answer the query in
+    the database; elsewhere a per-plan in-process R-tree narrows the areas
+    to candidates whose geometry is then tested exactly.
+    """
+
+    def __init__(self, session: Session, cache: Optional[AreaIndexCache] = None) -> None:
+        self.session = session
+        self.cache = cache or get_area_index_cache()
+
+    def search(
+        self,
+        plan_id: int,
+        bbox: Optional[BBox] = None,
+        point: Optional[Tuple[float, float]] = None,
+        include_geojson: bool = True,
+    ) -> schemas.AreaSearchResult:
+        plan = self.session.get(Plan, plan_id)
+        if not plan:
+            raise ValueError(f"Plan {plan_id} not found")
+        if point is not None:
+            box: Optional[BBox] = (point[0], point[1], point[0], point[1])
+        else:
+            box = bbox
+
+        if box is None:
+            areas = self.session.exec(select(Area).where(Area.plan_id == plan_id).order_by(Area.id)).all()
+        else:
+            area_ids = self.area_ids(plan, box)
+            areas = self.session.exec(select(Area).where(Area.id.in_(area_ids)).order_by(Area.id)).all() if area_ids else []
+
+        ttl_items = []
+        if areas:
+            ttl_items = self.session.exec(
+                select(TTL)
+                .where(TTL.plan_id == plan_id, TTL.area_id.in_([area.id for area in areas]))
+                .order_by(TTL.area_id, TTL.start_offset_hours, TTL.id)
+            ).all()
+
+        area_reads = [schemas.AreaRead.model_validate(area) for area in areas]
+        if not include_geojson:
+            for area in area_reads:
+                area.geojson = None
+        return schemas.AreaSearchResult(
+            areas=area_reads,
+            ttl=[schemas.TTLRead.model_validate(item) for item in ttl_items],
+        )
+
+    def area_ids(self, plan: Plan, box: BBox) -> List[int]:
+        bind = self.session.get_bind()
+        if _has_postgis(bind):
+            return self._postgis_area_ids(plan.id, box)
+        return self.cache.get(self.session, plan).query(box)
+
+    def _postgis_area_ids(self, plan_id: int, box: BBox) -> List[int]:
+        if box[0] == box[2] and box[1] == box[3]:
+            target = "ST_SetSRID(ST_MakePoint(:min_x, :min_y), 4326)"
+        else:
+            target = "ST_MakeEnvelope(:min_x, :min_y, :max_x, :max_y, 4326)"
+        statement = text(
+            f"SELECT id FROM area WHERE plan_id = :plan_id AND geom && {target} "
+            f"AND ST_Intersects(geom, {target}) ORDER BY id"
+        )
+        params = {"plan_id": plan_id, "min_x": box[0], "min_y": box[1], "max_x": box[2], "max_y": box[3]}
+        return list(self.session.execute(statement, params).scalars())
+
+
+def area_bbox(geojson: str) -> BBox:
+    """Bounding box stored on ``Area``; raises ``ValueError`` for bad GeoJSON."""
+    return parse_geojson(geojson).bbox
+
+
+@lru_cache(maxsize=None)
+def _has_postgis(bind: Engine) -> bool:
+    if bind.dialect.name != "postgresql":
+        return False
+    return any(column["name"] == "geom" for column in inspect(bind).get_columns("area"))
+
+
+@lru_cache(maxsize=1)
+def get_area_index_cache() -> AreaIndexCache:
+    return AreaIndexCache()
+
+
+__all__ = ["AreaIndexCache", "PlanAreaIndex", "SpatialService", "area_bbox", "get_area_index_cache"]
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from sqlmodel import Session
+
+from server.db.models import Plan
+from server.domain.mvt import BUFFER, EXTENT, Feature, MercatorShape, encode_layer, project, simplify_shape, tile_bounds
+from server.domain.services.spatial_service import AreaIndexCache, PlanAreaIndex, get_area_index_cache
+
+AREA_LAYER = "areas"
+TILE_CACHE_TILES = int(os.getenv("TILE_CACHE_TILES", "4096"))
+TILE_MAX_ZOOM = int(os.getenv("TILE_MAX_ZOOM", "20"))
+# Douglas-Peucker tolerance in tile units (1/4096 of a tile side)
+TILE_SIMPLIFY = float(os.getenv("TILE_SIMPLIFY", "1.0"))
+
+
+class PlanTileSource:
+    """One version of a plan's areas, projected to Web Mercator once and
+    simplified once per zoom level; each tile only clips and encodes."""
+
+    def __init__(self, index: PlanAreaIndex) -> None:
+        self.index = index
+        self.version = index.version
+        self._projected: Dict[int, Optional[MercatorShape]] = {}
+        self._simplified: Dict[Tuple[int, int], Optional[MercatorShape]] = {}
+
+    def render(self, z: int, x: int, y: int) -> bytes:
+        features = []
+        for area_id in sorted(self.index.tree.search(tile_bounds(z, x, y, BUFFER))):
+            shape = self._shape(area_id, z)
+            if shape is not None and not shape.is_empty():
+                features.append(Feature(area_id, shape, self.index.properties[area_id]))
+        return encode_layer(AREA_LAYER, features, z, x, y)
+
+    def _shape(self, area_id: int, z: int) -> Optional[MercatorShape]:
+        key = (area_id, z)
+        if key not in self._simplified:
+            if area_id not in self._projected:
+                shape = self.index.shape(area_id)
+                self._projected[area_id] = project(shape) if shape is not None else None
+            projected = self._projected[area_id]
+            tolerance = TILE_SIMPLIFY / (EXTENT * 2**z)
+            self._simplified[key] = simplify_shape(projected, tolerance) if projected is not None else None
+        return self._simplified[key]
+
+
+class AreaTileCache:
+    """Encoded area tiles, least recently used evicted.
+
+    Tiles are stored with the ``PlanAreaIndex.version`` they were rendered
+    from. Creating, editing or deleting an area changes that version, so a
+    stale tile is re-rendered on its next request; edits elsewhere in the
+    plan leave the tiles valid.
+    """
+
+    def __init__(
+        self,
+        max_tiles: int = TILE_CACHE_TILES,
+        index_cache: Optional[AreaIndexCache] = None,
+    ) -> None:
+        self.max_tiles = max_tiles
+        self.index_cache = index_cache or get_area_index_cache()
+        self._tiles: "OrderedDict[Tuple[int, int, int, int], Tuple[str, bytes]]" = OrderedDict()
+        self._sources: Dict[int, PlanTileSource] = {}
+        self._lock = threading.Lock()
+
+    def tile(self, session: Session, plan: Plan, z: int, x: int, y: int) -> Tuple[str, bytes]:
+        index = self.index_cache.get(session, plan)
+        key = (plan.id, z, x, y)
+        with self._lock:
+            cached = self._tiles.get(key)
+            if cached is not None and cached[0] == index.version:
+                self._tiles.move_to_end(key)
+                return cached
+            source = self._sources.get(plan.id)
+            if source is None or source.version != index.version:
+                source = self._sources[plan.id] = PlanTileSource(index)
+        data = source.render(z, x, y)
+        with self._lock:
+            self._tiles[key] = (index.version, data)
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+        return index.version, data
+
+    def invalidate(self, plan_id: Optional[int] = None) -> None:
+        with self._lock:
+            if plan_id is None:
+                self._tiles.clear()
+                self._sources.clear()
+                return
+            self._sources.pop(plan_id, None)
+            for key in [key for key in self._tiles if key[0] == plan_id]:
+                del self._tiles[key]
+
+
+class AreaTileService:
+    """Vector tiles of plan areas, with the TileJSON and MapLibre style
+    that put them over the offline basemap."""
+
+    def __init__(self, session: Session, cache: Optional[AreaTileCache] = None) -> None:
+        self.session = session
+        self.cache = cache or get_area_tile_cache()
+
+    def tile(self, plan_id: int, z: int, x: int, y: int) -> Tuple[str, bytes]:
+        if not (0 <= z <= TILE_MAX_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z):
+            raise ValueError(f"Tile {z}/{x}/{y} is out of range")
+        return self.cache.tile(self.session, self._plan(plan_id), z, x, y)
+
+    def tilejson(self, plan_id: int, tiles_url: str) -> dict:
+        """TileJSON 3.0 for the area layer. ``tiles_url`` is the tile route
+        with ``{z}/{x}/{y}`` placeholders; the area version is appended so
+        browsers can keep tiles until an area changes."""
+        plan = self._plan(plan_id)
+        index = self.cache.index_cache.get(self.session, plan)
+        separator = "&" if "?" in tiles_url else "?"
+        return {
+            "tilejson": "3.0.0",
+            "name": f"{plan.name} areas",
+            "scheme": "xyz",
+            "tiles": [f"{tiles_url}{separator}v={index.version}"],
+            "minzoom": 0,
+            "maxzoom": TILE_MAX_ZOOM,
+            "bounds": list(index.bbox) if index.bbox else [-180, -85.0511, 180, 85.0511],
+            "vector_layers": [
+                {"id": AREA_LAYER, "fields": {"name": "String", "area_type": "String"}, "minzoom": 0, "maxzoom": TILE_MAX_ZOOM}
+            ],
+        }
+
+    def style(self, plan_id: int, tilejson_url: str, basemap: Optional[str] = None) -> dict:
+        """MapLibre style: the plan's areas drawn over the offline basemap
+        whose TileJSON is at ``basemap``, if any."""
+        self._plan(plan_id)
+        sources: dict = {"areas": {"type": "vector", "url": tilejson_url}}
+        layers: list = [{"id": "background", "type": "background", "paint": {"background-color": "#0f172a"}}]
+        if basemap:
+            sources["basemap"] = {"type": "vector", "url": basemap}
+            layers += _BASEMAP_LAYERS
+        layers += [
+            {
+                "id": "areas-fill",
+                "type": "fill",
+                "source": "areas",
+                "source-layer": AREA_LAYER,
+                "filter": ["==", ["geometry-type"], "Polygon"],
+                "paint": {"fill-color": "#38bdf8", "fill-opacity": 0.15},
+            },
+            {
+                "id": "areas-outline",
+                "type": "line",
+                "source": "areas",
+                "source-layer": AREA_LAYER,
+                "paint": {"line-color": "#38bdf8", "line-width": 1.5},
+            },
+        ]
+        return {"version": 8, "name": "COPDify areas", "sources": sources, "layers": layers}
+
+    def _plan(self, plan_id: int) -> Plan:
+        plan = self.session.get(Plan, plan_id)
+        if not plan:
+            raise ValueError(f"Plan {plan_id} not found")
+        return plan
+
+
+# A few OpenMapTiles-schema layers, enough to orient the areas
+_BASEMAP_LAYERS = [
+    {
+        "id": "basemap-water",
+        "type": "fill",
+        "source": "basemap",
+        "source-layer": "water",
+        "paint": {"fill-color": "#1e3a5f"},
+    },
+    {
+        "id": "basemap-buildings",
+        "type": "fill",
+        "source": "basemap",
+        "source-layer": "building",
+        "minzoom": 13,
+        "paint": {"fill-color": "#1e293b"},
+    },
+    {
+        "id": "basemap-roads",
+        "type": "line",
+        "source": "basemap",
+        "source-layer": "transportation",
+        "paint": {"line-color": "#475569", "line-width": 1},
+    },
+]
+
+
+@lru_cache(maxsize=1)
+def get_area_tile_cache() -> AreaTileCache:
+    return AreaTileCache()
+
+
+__all__ = ["AREA_LAYER", "AreaTileCache", "AreaTileService", "PlanTileSource", "get_area_tile_cache"]
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from server.db.models import Area, DecisionPoint, Plan
+from server.domain import schemas
+from server.domain.geo import BBox, RTree, Shape, parse_geojson
+from server.domain.services.audit_writer import AuditWriter, get_audit_writer
+from server.domain.services.spatial_service import PlanAreaIndex, get_area_index_cache
+from server.domain.triggers import AreaRef, TriggerSpec, normalize_unit, parse_trigger
+
+TRIGGER_CACHE_PLANS = int(os.getenv("TRIGGER_CACHE_PLANS", "64"))
+TRIGGER_AUDIT = os.getenv("TRIGGER_AUDIT", "1") not in ("0", "false", "False")
+
+
+@dataclass(frozen=True)
+class CompiledTrigger:
+    decision_point_id: int
+    name: str
+    condition: str
+    shape: Shape
+    distance_km: float
+    units: Optional[FrozenSet[str]]
+    bbox: BBox
+
+    def covers(self, lon: float, lat: float) -> bool:
+        if self.distance_km:
+            return self.shape.distance_km(lon, lat) <= self.distance_km
+        return self.shape.contains_point(lon, lat)
+
+
+@dataclass
+class CompiledPlan:
+    revision: int
+    triggers: Dict[int, CompiledTrigger]
+    expressions: Dict[int, Tuple[str, Optional[str]]]  # id -> (name, trigger_geo)
+    errors: Dict[int, str]
+    tree: RTree
+
+
+class TriggerEvaluator:
+    """Evaluates position reports against one plan's geospatial triggers.
+
+    Triggers are compiled once per plan revision into shapes held in an
+    R-tree, so a report is tested only against triggers whose (buffered)
+    bounding box contains it. For each unit the evaluator remembers which
+    triggers covered its last position: a trigger fires on the transition,
+    ``enter``/``within`` when the unit comes inside and ``exit`` when it
+    leaves. That state lives in this process only.
+    """
+
+    def __init__(self, plan_id: int) -> None:
+        self.plan_id = plan_id
+        self.compiled: Optional[CompiledPlan] = None
+        self.last_events: Dict[int, schemas.TriggerEventRead] = {}
+        self._inside: Dict[str, FrozenSet[int]] = {}
+        self._last_seen: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def revision(self) -> Optional[int]:
+        return self.compiled.revision if self.compiled else None
+
+    def load(self, compiled: CompiledPlan) -> None:
+        with self._lock:
+            if self.compiled is None or compiled.revision >= self.compiled.revision:
+                self.compiled = compiled
+
+    def evaluate(self, reports: List[schemas.PositionReport]) -> schemas.TriggerEvaluation:
+        now = datetime.now(timezone.utc)
+        events: List[schemas.TriggerEventRead] = []
+        skipped = 0
+        ordered = sorted(((_utc(report.time) or now, report) for report in reports), key=lambda pair: pair[0])
+        with self._lock:
+            compiled = self.compiled
+            for time, report in ordered:
+                unit = normalize_unit(report.unit)
+                last = self._last_seen.get(unit)
+                if last is not None and time < last:
+                    skipped += 1
+                    continue
+                self._last_seen[unit] = time
+
+                lon, lat = report.lon, report.lat
+                inside = frozenset(
+                    trigger.decision_point_id
+                    for trigger in compiled.tree.search((lon, lat, lon, lat))
+                    if (trigger.units is None or unit in trigger.units) and trigger.covers(lon, lat)
+                )
+                before = self._inside.get(unit, frozenset())
+                if inside == before:
+                    continue
+                self._inside[unit] = inside
+                for dp_id in inside - before:
+                    trigger = compiled.triggers[dp_id]
+                    if trigger.condition != "exit":
+                        events.append(self._fire(trigger, report, time))
+                for dp_id in before - inside:
+                    trigger = compiled.triggers.get(dp_id)
+                    if trigger is not None and trigger.condition == "exit":
+                        events.append(self._fire(trigger, report, time))
+        return schemas.TriggerEvaluation(processed=len(reports) - skipped, skipped=skipped, events=events)
+
+    def _fire(self, trigger: CompiledTrigger, report: schemas.PositionReport, time: datetime) -> schemas.TriggerEventRead:
+        event = schemas.TriggerEventRead(
+            decision_point_id=trigger.decision_point_id,
+            name=trigger.name,
+            condition=trigger.condition,
+            unit=report.unit,
+            lat=report.lat,
+            lon=report.lon,
+            time=time,
+        )
+        self.last_events[trigger.decision_point_id] = event
+        return event
+
+    def status(self) -> List[schemas.DecisionPointTriggerRead]:
+        with self._lock:
+            compiled = self.compiled
+            inside: Dict[int, List[str]] = {}
+            for unit, dp_ids in self._inside.items():
+                for dp_id in dp_ids:
+                    inside.setdefault(dp_id, []).append(unit)
+        return [
+            schemas.DecisionPointTriggerRead(
+                decision_point_id=dp_id,
+                name=name,
+                expression=expression,
+                condition=compiled.triggers[dp_id].condition if dp_id in compiled.triggers else None,
+                error=compiled.errors.get(dp_id),
+                units_inside=sorted(inside.get(dp_id, [])),
+                last_event=self.last_events.get(dp_id),
+            )
+            for dp_id, (name, expression) in sorted(compiled.expressions.items())
+        ]
+
+
+def _utc(time: Optional[datetime]) -> Optional[datetime]:
+    """Aware UTC, so report times compare however the client sent them.
+    Times without an offset are taken to be UTC."""
+    if time is None:
+        return None
+    if time.tzinfo is None:
+        return time.replace(tzinfo=timezone.utc)
+    return time.astimezone(timezone.utc)
+
+
+class TriggerEvaluatorCache:
+    """One ``TriggerEvaluator`` per recently used plan."""
+
+    def __init__(self, max_plans: int = TRIGGER_CACHE_PLANS) -> None:
+        self.max_plans = max_plans
+        self._evaluators: "OrderedDict[int, TriggerEvaluator]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, plan_id: int) -> TriggerEvaluator:
+        with self._lock:
+            evaluator = self._evaluators.get(plan_id)
+            if evaluator is None:
+                evaluator = self._evaluators[plan_id] = TriggerEvaluator(plan_id)
+            self._evaluators.move_to_end(plan_id)
+            while len(self._evaluators) > self.max_plans:
+                self._evaluators.popitem(last=False)
+            return evaluator
+
+
+class TriggerService:
+    def __init__(
+        self,
+        session: Session,
+        cache: Optional[TriggerEvaluatorCache] = None,
+        audit: Optional[AuditWriter] = None,
+    ) -> None:
+        self.session = session
+        self.cache = cache or get_trigger_cache()
+        self.audit = audit or get_audit_writer()
+
+    def evaluate(self, plan_id: int, reports: List[schemas.PositionReport]) -> schemas.TriggerEvaluation:
+        evaluator = self._evaluator(plan_id)
+        result = evaluator.evaluate(reports)
+        if result.events and TRIGGER_AUDIT:
+            self.audit.record_many(
+                [
+                    {
+                        "plan_id": plan_id,
+                        "action": "decision_point_triggered",
+                        "actor": event.unit,
+                        "payload": event.model_dump_json(),
+                    }
+                    for event in result.events
+                ]
+            )
+        return result
+
+    def status(self, plan_id: int) -> List[schemas.DecisionPointTriggerRead]:
+        return self._evaluator(plan_id).status()
+
+    def _evaluator(self, plan_id: int) -> TriggerEvaluator:
+        plan = self.session.get(Plan, plan_id)
+        if not plan:
+            raise ValueError(f"Plan {plan_id} not found")
+        evaluator = self.cache.get(plan_id)
+        if evaluator.revision != plan.revision:
+            evaluator.load(self.compile(plan))
+        return evaluator
+
+    def compile(self, plan: Plan) -> CompiledPlan:
+        areas = get_area_index_cache().get(self.session, plan)
+        names: Dict[str, List[int]] = {}
+        for area_id, name in self.session.exec(select(Area.id, Area.name).where(Area.plan_id == plan.id)):
+            names.setdefault(name.casefold(), []).append(area_id)
+
+        triggers: Dict[int, CompiledTrigger] = {}
+        expressions: Dict[int, Tuple[str, Optional[str]]] = {}
+        errors: Dict[int, str] = {}
+        rows = self.session.exec(
+            select(DecisionPoint.id, DecisionPoint.name, DecisionPoint.trigger_geo, DecisionPoint.location_area_id)
+            .where(DecisionPoint.plan_id == plan.id)
+        )
+        for dp_id, name, trigger_geo, location_area_id in rows:
+            try:
+                spec = parse_trigger(trigger_geo, has_location=location_area_id is not None)
+                if spec is None:
+                    continue
+                expressions[dp_id] = (name, trigger_geo)
+                shape = self._target_shape(spec, location_area_id, areas, names)
+            except ValueError as exc:
+                expressions[dp_id] = (name, trigger_geo)
+                errors[dp_id] = str(exc)
+                continue
+            triggers[dp_id] = CompiledTrigger(
+                decision_point_id=dp_id,
+                name=name,
+                condition=spec.condition,
+                shape=shape,
+                distance_km=spec.distance_km,
+                units=spec.units,
+                bbox=shape.buffered_bbox(spec.distance_km) if spec.distance_km else shape.bbox,
+            )
+        tree = RTree((trigger.bbox, trigger) for trigger in triggers.values())
+        return CompiledPlan(plan.revision, triggers, expressions, errors, tree)
+
+    @staticmethod
+    def _target_shape(
+        spec: TriggerSpec, location_area_id: Optional[int], areas: PlanAreaIndex, names: Dict[str, List[int]]
+    ) -> Shape:
+        target = spec.target
+        if isinstance(target, tuple):
+            if not spec.distance_km:
+                raise ValueError("ENTER and EXIT need an area; use WITHIN for a position")
+            lon, lat = target
+            return Shape(points=[(lon, lat)], bbox=(lon, lat, lon, lat))
+        if target == "location":
+            if location_area_id is None:
+                raise ValueError("LOCATION used but the decision point has no location area")
+            area_id = location_area_id
+        elif isinstance(target, AreaRef):
+            if target.area_id is not None:
+                area_id = target.area_id
+            else:
+                matches = names.get(target.name.casefold(), [])
+                if len(matches) != 1:
+                    raise ValueError(f"{'No' if not matches else 'More than one'} area named {target.name!r}")
+                area_id = matches[0]
+        else:
+            return parse_geojson(target)
+        if area_id not in areas:
+            raise ValueError(f"Area {area_id} is not a valid area of this plan")
+        shape = areas.shape(area_id)
+        if shape is None:
+            raise ValueError(f"Area {area_id} has invalid GeoJSON")
+        return shape
+
+
+@lru_cache(maxsize=1)
+def get_trigger_cache() -> TriggerEvaluatorCache:
+    return TriggerEvaluatorCache()
+
+
+__all__ = ["CompiledTrigger", "TriggerEvaluator", "TriggerEvaluatorCache", "TriggerService", "get_trigger_cache"]
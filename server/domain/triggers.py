@@ -0,0 +1,182 @@
+"""The ``DecisionPoint.trigger_geo`` expression language.
+
+::
+
+    trigger   := condition [ "BY" unit { "," unit } ]
+    condition := "ENTER" target
+               | "EXIT" target
+               | "WITHIN" number ( "km" | "m" ) "OF" target
+    target    := "LOCATION"                  the decision point's location area
+               | "AREA" ( id | 'name' )      an area of the same plan
+               | lon "," lat                 a fixed position
+    unit      := name | 'quoted name'
+
+Keywords are case-insensitive. ``BY`` limits the trigger to reports from
+the listed units; without it any unit counts. A ``trigger_geo`` holding a
+GeoJSON document means ``ENTER`` that geometry, and a decision point with
+only a ``location_area_id`` means ``ENTER LOCATION``.
+
+Examples::
+
+    ENTER AREA 'OBJ FALCON'
+    EXIT LOCATION BY '1 MECH BDE', 2-12 INF
+    WITHIN 5 km OF AREA 12
+    WITHIN 800 m OF 24.93, 60.17
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import FrozenSet, List, Optional, Tuple, Union
+
+CONDITIONS = ("enter", "exit", "within")
+
+# Numbers must stand alone (or run into km/m) so unit names like 2-12 stay whole
+_TOKEN = re.compile(r"\s*(?:'([^']*)'|\"([^\"]*)\"|(-?\d+(?:\.\d+)?)(?=[\s,]|$|(?i:k?m)(?:[\s,]|$))|(,)|([^\s,'\"]+))")
+
+
+@dataclass(frozen=True)
+class AreaRef:
+    area_id: Optional[int] = None
+    name: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class TriggerSpec:
+    condition: str
+    # "location", an AreaRef, a (lon, lat) pair or a GeoJSON document
+    target: Union[str, AreaRef, Tuple[float, float]]
+    distance_km: float = 0.0
+    units: Optional[FrozenSet[str]] = None
+
+
+def parse_trigger(expression: Optional[str], has_location: bool = False) -> Optional[TriggerSpec]:
+    """``None`` when the decision point has no geospatial trigger; raises
+    ``ValueError`` with the offending token for malformed expressions."""
+    expression = (expression or "").strip()
+    if not expression:
+        return TriggerSpec("enter", "location") if has_location else None
+    if expression.startswith("{"):
+        return TriggerSpec("enter", expression)
+    return _Parser(expression).trigger()
+
+
+def normalize_unit(unit: str) -> str:
+    return " ".join(unit.split()).casefold()
+
+
+class _Parser:
+    def __init__(self, expression: str) -> None:
+        self.tokens: List[Tuple[str, str]] = []
+        position = 0
+        while position < len(expression):
+            match = _TOKEN.match(expression, position)
+            if not match or match.end() == position:
+                raise ValueError(f"Unexpected {expression[position:].strip()[:20]!r}")
+            quoted = match.group(1) if match.group(1) is not None else match.group(2)
+            if quoted is not None:
+                self.tokens.append(("quoted", quoted))
+            elif match.group(3) is not None:
+                self.tokens.append(("number", match.group(3)))
+            elif match.group(4) is not None:
+                self.tokens.append(("comma", ","))
+            elif match.group(5) is not None:
+                self.tokens.append(("word", match.group(5)))
+            position = match.end()
+        self.position = 0
+
+    def trigger(self) -> TriggerSpec:
+        keyword = self._keyword()
+        distance = 0.0
+        if keyword in ("enter", "exit"):
+            target = self._target()
+        elif keyword == "within":
+            distance = self._number()
+            unit = self._keyword()
+            if unit not in ("km", "m"):
+                raise ValueError(f"Expected km or m, got {unit!r}")
+            if unit == "m":
+                distance /= 1000
+            self._expect("of")
+            target = self._target()
+        else:
+            raise ValueError(f"Expected ENTER, EXIT or WITHIN, got {keyword!r}")
+
+        units = None
+        if self._peek_keyword() == "by":
+            self.position += 1
+            names = [self._unit()]
+            while self._peek() == ("comma", ","):
+                self.position += 1
+                names.append(self._unit())
+            units = frozenset(normalize_unit(name) for name in names)
+        if self.position < len(self.tokens):
+            raise ValueError(f"Unexpected {self.tokens[self.position][1]!r}")
+        return TriggerSpec(keyword, target, distance, units)
+
+    def _target(self) -> Union[str, AreaRef, Tuple[float, float]]:
+        kind, value = self._next("a target")
+        if kind == "word" and value.lower() == "location":
+            return "location"
+        if kind == "word" and value.lower() == "area":
+            kind, value = self._next("an area id or name")
+            if kind == "number" and value.isdigit():
+                return AreaRef(area_id=int(value))
+            if kind in ("quoted", "word"):
+                return AreaRef(name=value)
+            raise ValueError(f"Expected an area id or name, got {value!r}")
+        if kind == "number":
+            lon = float(value)
+            self._expect_comma()
+            lat = self._number()
+            if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+                raise ValueError(f"Position {lon}, {lat} is out of range")
+            return lon, lat
+        raise ValueError(f"Expected LOCATION, AREA or lon, lat, got {value!r}")
+
+    def _unit(self) -> str:
+        parts = []
+        while self.position < len(self.tokens) and self.tokens[self.position][0] != "comma":
+            parts.append(self.tokens[self.position][1])
+            self.position += 1
+        if not parts:
+            raise ValueError("Expected a unit name")
+        return " ".join(parts)
+
+    def _peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _peek_keyword(self) -> Optional[str]:
+        token = self._peek()
+        return token[1].lower() if token and token[0] == "word" else None
+
+    def _next(self, expected: str) -> Tuple[str, str]:
+        token = self._peek()
+        if token is None:
+            raise ValueError(f"Expected {expected} at end of expression")
+        self.position += 1
+        return token
+
+    def _keyword(self) -> str:
+        kind, value = self._next("a keyword")
+        if kind != "word":
+            raise ValueError(f"Expected a keyword, got {value!r}")
+        return value.lower()
+
+    def _number(self) -> float:
+        kind, value = self._next("a number")
+        if kind != "number":
+            raise ValueError(f"Expected a number, got {value!r}")
+        return float(value)
+
+    def _expect(self, keyword: str) -> None:
+        if self._keyword() != keyword:
+            raise ValueError(f"Expected {keyword.upper()}")
+
+    def _expect_comma(self) -> None:
+        kind, value = self._next("','")
+        if kind != "comma":
+            raise ValueError(f"Expected ',', got {value!r}")
+
+
+__all__ = ["AreaRef", "CONDITIONS", "TriggerSpec", "normalize_unit", "parse_trigger"]
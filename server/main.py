@@ -1,8 +1,20 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from server.api import planning, forces, ttr, exports, audit, factors
-from server.db.base import init_db
+from server.api import planning, forces, ttr, exports, audit, factors, seed, tiles, triggers
+from server.api.health import get_warmup, readiness, router as health_router
+from server.api.middleware import CompressionMiddleware, ETagMiddleware
+from server.db.async_base import ASYNC_DB, dispose_async_engine, get_async_engine
+from server.db.base import engine, init_db, replica_engine, replicas, shards
+from server.db.events import AuditActorMiddleware
+from server.db.profiles import pool_status
+from server.db.replica import ReadYourWritesMiddleware
+from server.domain.services.audit_archive import get_audit_retention
+from server.domain.services.audit_writer import get_audit_writer
+from server.domain.services.export_jobs import get_export_runner
+from server.domain.services.mbtiles import get_tileset_catalogue
 
 app = FastAPI(title="COPDify", version="0.1.0")
 
@@ -13,6 +25,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# ETags are hashed from the identity body, so compression wraps them
+app.add_middleware(ETagMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(AuditActorMiddleware)
+if replicas:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+if ASYNC_DB:
+    if shards:
+        raise RuntimeError("ASYNC_DB does not support STORAGE_MODE=sharded")
+    from server.api import async_reads
+
+    # Registered first so these paths win over their sync twins
+    app.include_router(async_reads.router, prefix="/api")
 
 app.include_router(planning.router, prefix="/api")
 app.include_router(forces.router, prefix="/api")
@@ -20,13 +46,51 @@ app.include_router(ttr.router, prefix="/api")
 app.include_router(exports.router, prefix="/api")
 app.include_router(audit.router, prefix="/api")
 app.include_router(factors.router, prefix="/api")
+app.include_router(seed.router, prefix="/api")
+app.include_router(triggers.router, prefix="/api")
+app.include_router(tiles.router, prefix="/api")
+app.include_router(health_router)
 
 
 @app.on_event("startup")
 async def startup_event() -> None:
+    # One version query; caches and pools warm in the background
     init_db()
+    if replicas:
+        replicas.start()
+    get_audit_retention().start()
+    get_export_runner().start()
+    get_warmup().start(asyncio.get_running_loop())
+
+
+@app.on_event("shutdown")
+def shutdown_event() -> None:
+    get_audit_retention().stop()
+    get_export_runner().shutdown()
+    get_audit_writer().shutdown()
+    get_tileset_catalogue().close()
+    if replicas:
+        replicas.stop()
+    if shards:
+        shards.dispose()
+
+
+@app.on_event("shutdown")
+async def dispose_async_db() -> None:
+    await dispose_async_engine()
+
+
+# Older probes still call /health; answer them with the readiness check
+app.add_api_route("/health", readiness, methods=["GET"], tags=["Health"])
 
 
-@app.get("/health")
-async def healthcheck() -> dict[str, str]:
-    return {"status": "ok"}
+@app.get("/health/pool")
+def pool_metrics() -> dict:
+    metrics = {"sync": pool_status(engine)}
+    if replica_engine is not None:
+        metrics["replica"] = pool_status(replica_engine)
+    if ASYNC_DB:
+        metrics["async"] = pool_status(get_async_engine().sync_engine)
+    if shards:
+        metrics["shards"] = shards.stats()
+    return metrics
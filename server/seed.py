@@ -0,0 +1,34 @@
+"""Load seed files into the database.
+
+Usage: python -m server.seed [--dir infra/seed] [units_generic units_real ttr_rules]
+"""
+from __future__ import annotations
+
+import argparse
+
+from sqlmodel import Session
+
+from server.db.base import engine, init_db
+from server.domain.services.seed_service import SEED_DIR, SEED_KINDS, SeedService
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Load COPDify seed data")
+    parser.add_argument("kinds", nargs="*", help=f"Subset of {', '.join(SEED_KINDS)} (default: all)")
+    parser.add_argument("--dir", default=SEED_DIR, help="Directory holding the seed files")
+    args = parser.parse_args(argv)
+    unknown = set(args.kinds) - set(SEED_KINDS)
+    if unknown:
+        parser.error(f"unknown seed kinds: {', '.join(sorted(unknown))}")
+
+    init_db()
+    with Session(engine) as session:
+        for result in SeedService(session).load_directory(args.dir, args.kinds or SEED_KINDS):
+            print(
+                f"{result.kind:<14} {result.inserted:>8} inserted {result.updated:>8} updated "
+                f"{result.skipped:>6} skipped  {result.seconds:.2f}s  ({result.file})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Tests for the audit log routes and retention.
+
+Run with ``python -m pytest -q test_audit.py``. Storage mode is read at
+import time, so the sharded case runs the app in a subprocess.
+"""
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlmodel import Session, create_engine, select
+
+from server.db.migrations import upgrade
+from server.db.models import AuditLog
+from server.domain.services.audit_archive import AuditArchive, AuditRetention
+from server.domain.services.audit_service import AuditService
+from server.domain.services.audit_writer import AuditWriter
+
+ROOT = Path(__file__).resolve().parent
+
+_SHARDED_CLIENT = """
+import json
+from fastapi.testclient import TestClient
+from server.main import app
+from server.domain.services.audit_writer import get_audit_writer
+
+with TestClient(app, base_url="http://t/api") as client:
+    first = client.post("/plans/", json={"name": "A"}).json()["id"]
+    second = client.post("/plans/", json={"name": "B"}).json()["id"]
+    client.post("/decisions", json={"plan_id": first, "decision_text": "Go"})
+    get_audit_writer().flush()
+    print(json.dumps({
+        "plans": [first, second],
+        "all": client.get("/audit/logs").json()["items"],
+        "first": client.get("/audit/logs", params={"plan_id": first}).json()["items"],
+        "second": client.get("/audit/logs", params={"plan_id": second}).json()["items"],
+    }))
+"""
+
+
+def _run_sharded(tmp_path: Path, script: str) -> dict:
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(ROOT),
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'catalogue.db'}",
+        "STORAGE_MODE": "sharded",
+        "SHARD_DIR": str(tmp_path / "shards"),
+        "AUDIT_ARCHIVE_DIR": str(tmp_path / "archive"),
+        "AUDIT_RETENTION_DAYS": "0",
+        "AUTO_MIGRATE": "1",
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_plan_filter_reads_the_catalogue_with_sharded_storage(tmp_path):
+    result = _run_sharded(tmp_path, _SHARDED_CLIENT)
+    first, second = result["plans"]
+    assert any(row["plan_id"] == first for row in result["all"])
+    assert result["first"]
+    assert all(row["plan_id"] == first for row in result["first"])
+    assert {row["action"] for row in result["first"]} >= {"plan.insert", "decision.insert"}
+    # One event per decision: the session hook's, not a second explicit one
+    assert [row["action"] for row in result["first"] if row["action"].startswith("decision")] == ["decision.insert"]
+    assert all(row["plan_id"] == second for row in result["second"])
+
+
+# Retention ------------------------------------------------------------
+def _database(tmp_path: Path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    upgrade(engine)
+    return engine
+
+
+def _add_rows(session, times, plan_id=1):
+    rows = [AuditLog(action="plan.update", plan_id=plan_id, created_at=time) for time in times]
+    session.add_all(rows)
+    session.commit()
+    return [row.id for row in rows]
+
+
+def test_retention_keeps_rows_committed_during_a_run(tmp_path):
+    now = datetime(2026, 5, 1)
+    old = now - timedelta(days=100)
+    archive = AuditArchive(str(tmp_path / "archive"))
+    retention = AuditRetention(archive, retention_days=90, segment_rows=10)
+    with Session(_database(tmp_path)) as session:
+        _add_rows(session, [old + timedelta(minutes=i) for i in range(5)])
+        write_segment = archive.write_segment
+
+        def write_then_commit_late(rows):
+            manifest = write_segment(rows)
+            # The write-behind writer commits an older event after the select
+            late.extend(_add_rows(session, [old - timedelta(minutes=1)]))
+            return manifest
+
+        late = []
+        archive.write_segment = write_then_commit_late
+        assert retention.run(session, now=now).archived == 5
+        archive.write_segment = write_segment
+        assert session.exec(select(AuditLog.id)).all() == late
+
+        assert retention.run(session, now=now).archived == 1
+        assert session.exec(select(AuditLog.id)).all() == []
+
+
+def test_retention_finishes_an_interrupted_purge(tmp_path):
+    now = datetime(2026, 5, 1)
+    archive = AuditArchive(str(tmp_path / "archive"))
+    with Session(_database(tmp_path)) as session:
+        ids = _add_rows(session, [now - timedelta(days=100, minutes=i) for i in range(3)])
+        rows = session.exec(select(AuditLog).order_by(AuditLog.created_at, AuditLog.id)).all()
+        # Written, then the process died before deleting
+        archive.write_segment([row.model_dump(exclude={"plan"}) for row in rows])
+        assert len(session.exec(select(AuditLog.id)).all()) == len(ids)
+
+        result = AuditRetention(archive, retention_days=90).run(session, now=now)
+        assert result.archived == 0
+        assert session.exec(select(AuditLog.id)).all() == []
+
+
+# Pagination -----------------------------------------------------------
+def _pages(service, **filters):
+    ids, cursor = [], None
+    while True:
+        page = service.list_logs(limit=3, cursor=cursor, **filters)
+        ids.extend(item.id for item in page.items)
+        if page.next_cursor is None:
+            return ids
+        cursor = page.next_cursor
+
+
+def test_keyset_pages_continue_into_the_archive(tmp_path):
+    now = datetime(2026, 5, 1)
+    archive = AuditArchive(str(tmp_path / "archive"))
+    with Session(_database(tmp_path)) as session:
+        # Two plans interleaved, most of them past retention, and a tie on created_at;
+        # the second page holds the last two live rows and the newest archived one
+        times = [now - timedelta(days=100 - i * 10) for i in range(10)] + [now - timedelta(days=10)]
+        ids = [_add_rows(session, [time], plan_id=1 + i % 2)[0] for i, time in enumerate(times)]
+        newest_first = [id_ for _, id_ in sorted(zip(times, ids), reverse=True)]
+        assert AuditRetention(archive, retention_days=45, segment_rows=2).run(session, now=now).archived == 6
+        assert len(archive.segments()) == 3
+        assert len(session.exec(select(AuditLog.id)).all()) == 5
+
+        service = AuditService(session, writer=AuditWriter(write_behind=False), archive=archive)
+        assert _pages(service) == newest_first
+        assert _pages(service, plan_id=2) == [id_ for id_ in newest_first if ids.index(id_) % 2 == 1]
+        assert _pages(service, include_archived=False) == newest_first[:5]
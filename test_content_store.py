@@ -0,0 +1,96 @@
+"""Tests for the compressed content store.
+
+Run with ``python -m pytest -q test_content_store.py``.
+"""
+import hashlib
+
+import pytest
+from sqlmodel import Session, create_engine, select
+
+from server.db.migrations import upgrade
+from server.db.models import ProductContentSegment
+from server.domain.services import content_store
+from server.domain.services.content_store import ContentStore, _delta_ops
+
+DOCUMENT = "".join(f"- Phase {i}: objective line {i} of the plan\n" for i in range(200))
+
+
+@pytest.fixture
+def store(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'content.db'}")
+    upgrade(engine)
+    with Session(engine) as session:
+        yield ContentStore(session)
+
+
+def _edit(text, i):
+    return text.replace(f"line {i} ", f"line {i} (amended) ")
+
+
+def test_delta_ops_rebuild_the_text():
+    new = _edit(DOCUMENT, 7) + "- Annex A\n"
+    base_lines = DOCUMENT.splitlines(keepends=True)
+    ops = _delta_ops(DOCUMENT, new)
+    assert "".join("".join(base_lines[op[0]:op[1]]) if isinstance(op, list) else op for op in ops) == new
+    assert [op for op in ops if isinstance(op, str)] == ["- Phase 7: objective line 7 (amended) of the plan\n", "- Annex A\n"]
+
+
+def test_put_reuses_an_identical_body(store):
+    first = store.put(DOCUMENT)
+    assert first.encoding == "zlib"
+    assert first.stored_size < first.size
+    assert store.put(DOCUMENT).id == first.id
+    assert store.read(first.id) == DOCUMENT
+
+
+def test_small_edits_are_stored_as_deltas(store):
+    base = store.put(DOCUMENT)
+    edited = store.put(_edit(DOCUMENT, 3), base_id=base.id)
+    assert (edited.encoding, edited.base_id, edited.depth) == ("delta", base.id, 1)
+    assert store.read(edited.id) == _edit(DOCUMENT, 3)
+
+
+def test_delta_chains_are_capped(store):
+    texts, stored, base_id = [], [], None
+    for i in range(content_store.CONTENT_MAX_DELTA_DEPTH + 3):
+        texts.append(_edit(texts[-1] if texts else DOCUMENT, i))
+        stored.append(store.put(texts[-1], base_id=base_id))
+        base_id = stored[-1].id
+    depths = [item.depth for item in stored]
+    assert max(depths) == content_store.CONTENT_MAX_DELTA_DEPTH
+    # The version past the cap starts a new chain
+    restart = depths.index(content_store.CONTENT_MAX_DELTA_DEPTH) + 1
+    assert (stored[restart].encoding, stored[restart].depth) == ("zlib", 0)
+    assert depths[restart + 1] == 1
+    assert [store.read(item.id) for item in stored] == texts
+
+
+def test_iter_text_round_trips_across_segments(store, monkeypatch):
+    monkeypatch.setattr(content_store, "CONTENT_SEGMENT_BYTES", 64)
+    # Hashes keep zlib from shrinking it to one segment; the multi-byte
+    # characters put segment edges inside them
+    text = "".join(f"Übung {i}: Zürich–Genève € {hashlib.sha256(bytes(i)).hexdigest()}\n" for i in range(2000))
+    writer = store.writer()
+    for start in range(0, len(text), 37):
+        writer.write(text[start:start + 37])
+    content_id = writer.close()
+    store.session.commit()
+
+    segments = store.session.exec(
+        select(ProductContentSegment.seq).where(ProductContentSegment.content_id == content_id)
+    ).all()
+    assert len(segments) > 1
+    assert "".join(store.iter_text(content_id)) == text
+    # A second identical body is folded into the first
+    again = store.writer()
+    again.write(text)
+    assert again.close() == content_id
+
+
+def test_diff_reads_both_sides_once(store):
+    base = store.put(DOCUMENT)
+    edited = store.put(_edit(DOCUMENT, 5), base_id=base.id)
+    lines = list(store.diff(base.id, edited.id, "old", "new"))
+    assert lines[:2] == ["--- old\n", "+++ new\n"]
+    assert "-- Phase 5: objective line 5 of the plan\n" in lines
+    assert "+- Phase 5: objective line 5 (amended) of the plan\n" in lines
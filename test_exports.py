@@ -0,0 +1,97 @@
+"""Tests for the CONOPS export cache and product diffs.
+
+Run with ``python -m pytest -q test_exports.py``.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session, create_engine
+
+from server.api import exports
+from server.db import events
+from server.db.base import get_session
+from server.db.migrations import upgrade
+from server.db.models import COA, Phase, Plan
+from server.domain import schemas
+from server.domain.services.export_service import ExportService
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    # Change events would go to the process-wide writer and its database
+    monkeypatch.setattr(events, "AUDIT_CHANGES", False)
+    engine = create_engine(f"sqlite:///{tmp_path / 'exports.db'}")
+    upgrade(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def plan(session):
+    plan = Plan(name="Northern Shield", scope="Corps")
+    session.add(plan)
+    session.commit()
+    session.add(Phase(plan_id=plan.id, name="Shape", sequence=1))
+    session.commit()
+    session.refresh(plan)
+    return plan
+
+
+def _export(session, plan, coa=None):
+    return ExportService(session).generate_conops(
+        schemas.ConopsExportRequest(plan_id=plan.id, coa_id=coa.id if coa else None)
+    )
+
+
+def test_export_is_cached_until_the_plan_changes(session, plan):
+    first = _export(session, plan)
+    assert not first.cached
+    again = _export(session, plan)
+    assert (again.cached, again.product_id, again.content) == (True, first.product_id, first.content)
+
+    revision = plan.revision
+    session.add(Phase(plan_id=plan.id, name="Decisive", sequence=2))
+    session.commit()
+    session.refresh(plan)
+    assert plan.revision > revision
+    assert ExportService(session).find_cached(plan, None) is None
+
+    changed = _export(session, plan)
+    assert not changed.cached
+    assert changed.product_id != first.product_id
+    assert "Phase 2: Decisive" in changed.content
+    assert ExportService(session).find_cached(plan, None).id == changed.product_id
+
+
+def test_cache_is_keyed_by_coa(session, plan):
+    coa = COA(plan_id=plan.id, name="COA 1")
+    session.add(coa)
+    session.commit()
+    session.refresh(plan)
+    without = _export(session, plan)
+    with_coa = _export(session, plan, coa)
+    assert not with_coa.cached
+    assert with_coa.product_id != without.product_id
+    assert "Selected COA: COA 1" in with_coa.content
+    assert _export(session, plan, coa).product_id == with_coa.product_id
+    assert _export(session, plan).product_id == without.product_id
+
+
+def test_diff_route_streams_a_unified_diff(session, plan):
+    first = _export(session, plan).product_id
+    session.add(Phase(plan_id=plan.id, name="Decisive", sequence=2))
+    session.commit()
+    session.refresh(plan)
+    second = _export(session, plan).product_id
+
+    app = FastAPI()
+    app.include_router(exports.router, prefix="/api")
+    app.dependency_overrides[get_session] = lambda: session
+    client = TestClient(app)
+    response = client.get(f"/api/exports/products/{first}/diff/{second}", params={"plan_id": plan.id})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/x-diff")
+    lines = response.text.splitlines()
+    assert lines[:2] == [f"--- product_{first}", f"+++ product_{second}"]
+    assert "+- Phase 2: Decisive :: Objectives TBD" in lines
+    assert client.get(f"/api/exports/products/{first}/diff/999", params={"plan_id": plan.id}).status_code == 404
@@ -0,0 +1,106 @@
+"""Tests for the real unit roll-ups.
+
+Run with ``python -m pytest -q test_forces.py``.
+"""
+import pytest
+from sqlmodel import Session, create_engine, select
+
+from server.db import events
+from server.db.migrations import upgrade
+from server.db.models import UnitRollup
+from server.domain.services.force_service import ForceService
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    # Change events would go to the process-wide writer and its database
+    monkeypatch.setattr(events, "AUDIT_CHANGES", False)
+    engine = create_engine(f"sqlite:///{tmp_path / 'forces.db'}")
+    upgrade(engine)
+    with Session(engine) as session:
+        yield ForceService(session)
+
+
+def _unit(service, name, parent_id=None, personnel=10, vehicles=1, parent_service="Army"):
+    payload = {"name": name, "parent_id": parent_id, "personnel": personnel, "vehicles": vehicles}
+    return service.create_real_unit({**payload, "parent_service": parent_service}).id
+
+
+def _rollups(service):
+    rows = service.session.exec(
+        select(UnitRollup.unit_id, UnitRollup.service, UnitRollup.personnel, UnitRollup.vehicles, UnitRollup.unit_count)
+    ).all()
+    return sorted(tuple(row) for row in rows)
+
+
+def _assert_matches_rebuild(service):
+    incremental = _rollups(service)
+    service.rebuild_rollups()
+    assert _rollups(service) == incremental
+
+
+@pytest.fixture
+def tree(service):
+    bde = _unit(service, "1 Bde", personnel=100, vehicles=10)
+    first = _unit(service, "1 Bn", bde)
+    second = _unit(service, "2 Bn", bde)
+    coy = _unit(service, "A Coy", first, personnel=5, vehicles=2)
+    return bde, first, second, coy
+
+
+def test_create_adds_to_every_ancestor(service, tree):
+    bde, first, _, _ = tree
+    assert service.get_rollup(bde).totals.model_dump() == {"personnel": 125, "vehicles": 14, "unit_count": 4}
+    assert service.get_rollup(first).totals.model_dump() == {"personnel": 15, "vehicles": 3, "unit_count": 2}
+    _assert_matches_rebuild(service)
+
+
+def test_strength_update_moves_the_totals(service, tree):
+    bde, first, _, coy = tree
+    service.update_real_unit(coy, {"personnel": 50})
+    assert service.get_rollup(first).totals.personnel == 60
+    assert service.get_rollup(bde).totals.personnel == 170
+    _assert_matches_rebuild(service)
+
+
+def test_reparent_moves_the_subtree(service, tree):
+    bde, first, second, coy = tree
+    service.update_real_unit(first, {"parent_id": second})
+    assert service.get_rollup(second).totals.model_dump() == {"personnel": 25, "vehicles": 4, "unit_count": 3}
+    assert service.get_rollup(bde).totals.unit_count == 4
+    _assert_matches_rebuild(service)
+
+    service.update_real_unit(first, {"parent_id": None})
+    assert service.get_rollup(second).totals.unit_count == 1
+    assert service.get_rollup(bde).totals.model_dump() == {"personnel": 110, "vehicles": 11, "unit_count": 2}
+    _assert_matches_rebuild(service)
+
+
+def test_service_change_moves_the_row(service, tree):
+    bde, _, _, coy = tree
+    service.update_real_unit(coy, {"parent_service": "Marines"})
+    by_service = service.get_rollup(bde).by_service
+    assert by_service["Marines"].model_dump() == {"personnel": 5, "vehicles": 2, "unit_count": 1}
+    assert by_service["Army"].unit_count == 3
+    _assert_matches_rebuild(service)
+
+
+def test_delete_removes_the_leaf(service, tree):
+    bde, first, _, coy = tree
+    with pytest.raises(LookupError):
+        service.delete_real_unit(first)
+    service.delete_real_unit(coy)
+    assert service.get_rollup(first).totals.model_dump() == {"personnel": 10, "vehicles": 1, "unit_count": 1}
+    assert service.get_rollup(bde).totals.unit_count == 3
+    _assert_matches_rebuild(service)
+
+
+def test_cycles_and_missing_parents_are_rejected(service, tree):
+    bde, first, _, coy = tree
+    with pytest.raises(LookupError):
+        service.update_real_unit(bde, {"parent_id": coy})
+    with pytest.raises(ValueError):
+        service.update_real_unit(first, {"parent_id": 999})
+    assert service.get_real_unit(bde).parent_id is None
+    assert service.get_real_unit(first).parent_id == bde
+    _assert_matches_rebuild(service)
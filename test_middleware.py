@@ -0,0 +1,105 @@
+"""Tests for the ETag and compression middleware.
+
+Run with ``python -m pytest -q test_middleware.py``.
+"""
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from server.api.middleware import CompressionMiddleware, ETagMiddleware
+
+BODY = "line of plan content\n" * 200
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/doc")
+    def doc():
+        return PlainTextResponse(BODY)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((line for line in BODY.splitlines(keepends=True)), media_type="text/plain")
+
+    # As in server.main: compression wraps the ETags
+    app.add_middleware(ETagMiddleware)
+    app.add_middleware(CompressionMiddleware)
+    return app
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(_app())
+
+
+def _get(client, path, accept_encoding="identity", if_none_match=None):
+    headers = {"Accept-Encoding": accept_encoding}
+    if if_none_match:
+        headers["If-None-Match"] = if_none_match
+    # The body as sent, still encoded
+    with client.stream("GET", path, headers=headers) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_identity_response_has_an_etag(client):
+    response, raw = _get(client, "/doc")
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert raw.decode() == BODY
+    assert response.headers["etag"].startswith('"')
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_gzip_response_has_a_suffixed_etag(client):
+    identity = _get(client, "/doc")[0].headers["etag"]
+    response, raw = _get(client, "/doc", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw).decode() == BODY
+    assert response.headers["etag"] == identity[:-1] + '-gzip"'
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_gzip_etag_revalidates_as_gzip(client):
+    etag = _get(client, "/doc", "gzip")[0].headers["etag"]
+    response, raw = _get(client, "/doc", "gzip", if_none_match=etag)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert raw == b""
+
+
+def test_identity_etag_revalidates_as_identity(client):
+    etag = _get(client, "/doc")[0].headers["etag"]
+    response, raw = _get(client, "/doc", if_none_match=etag)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_gzip_etag_does_not_match_without_gzip(client):
+    etag = _get(client, "/doc", "gzip")[0].headers["etag"]
+    response, raw = _get(client, "/doc", if_none_match=etag)
+    assert response.status_code == 200
+    assert raw.decode() == BODY
+    assert response.headers["etag"] == etag.replace('-gzip"', '"')
+
+
+def test_small_bodies_are_not_compressed(client):
+    response, raw = _get(client, "/small", "gzip")
+    assert "content-encoding" not in response.headers
+    assert raw == b"ok"
+
+
+def test_streams_are_compressed_without_an_etag(client):
+    response, raw = _get(client, "/stream", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "etag" not in response.headers
+    assert gzip.decompress(raw).decode() == BODY
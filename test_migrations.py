@@ -0,0 +1,86 @@
+"""Tests for the schema migrations.
+
+Run with ``python -m pytest -q test_migrations.py``.
+"""
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from server.db.migrations import HEAD, current_version, ensure_schema, upgrade
+
+# Tables as they were before versioned migrations; the baseline creates the rest
+_PRE_MIGRATION_SCHEMA = [
+    """CREATE TABLE plan (
+        id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, description VARCHAR, scope VARCHAR, theater VARCHAR,
+        reference_m_day DATETIME, reference_c_day DATETIME, reference_d_day DATETIME, created_at DATETIME NOT NULL
+    )""",
+    """CREATE TABLE productconops (
+        id INTEGER PRIMARY KEY, plan_id INTEGER NOT NULL REFERENCES plan (id), coa_id INTEGER,
+        generated_at DATETIME NOT NULL, summary VARCHAR, content VARCHAR NOT NULL
+    )""",
+    """CREATE TABLE unitgeneric (
+        id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, category VARCHAR, ric_code VARCHAR,
+        description VARCHAR, factors_of_merit VARCHAR
+    )""",
+    """CREATE TABLE unitreal (
+        id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, parent_service VARCHAR, echelon VARCHAR,
+        home_station VARCHAR, generic_unit_id INTEGER REFERENCES unitgeneric (id)
+    )""",
+    """CREATE TABLE auditlog (
+        id INTEGER PRIMARY KEY, plan_id INTEGER REFERENCES plan (id), action VARCHAR NOT NULL,
+        actor VARCHAR, payload VARCHAR, created_at DATETIME NOT NULL
+    )""",
+    "INSERT INTO plan (id, name, created_at) VALUES (1, 'Plan', '2025-01-01 00:00:00')",
+    "INSERT INTO productconops (plan_id, generated_at, content) VALUES (1, '2025-01-02 00:00:00', '# CONOPS')",
+    "INSERT INTO unitgeneric (name, ric_code) VALUES ('HQ', 'HQ-BDE'), ('HQ again', 'HQ-BDE'), ('Inf', 'INF')",
+    "INSERT INTO unitreal (name, generic_unit_id) VALUES ('1 Bn', 2), ('A Coy', 1), ('A Coy', 3)",
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'copdify.db'}")
+
+
+def _columns(engine, table):
+    return {info["name"]: info for info in inspect(engine).get_columns(table)}
+
+
+def test_pre_migration_database_upgrades_to_head(engine):
+    with engine.begin() as conn:
+        for statement in _PRE_MIGRATION_SCHEMA:
+            conn.execute(text(statement))
+
+    upgrade(engine)
+
+    with engine.connect() as conn:
+        assert current_version(conn) == HEAD
+        # Step 2 rebuilt the table on SQLite without losing the legacy body
+        assert conn.execute(text("SELECT content FROM productconops")).scalar_one() == "# CONOPS"
+        assert conn.execute(text("SELECT revision FROM plan")).scalar_one() == 0
+        # Step 5 merged the duplicate RIC code and repointed its reference
+        assert conn.execute(text("SELECT id, name FROM unitgeneric ORDER BY id")).all() == [(1, "HQ"), (3, "Inf")]
+        units = conn.execute(text("SELECT name, uic, generic_unit_id FROM unitreal ORDER BY id")).all()
+    # Repeated real unit names survive; only unique ones become their uic
+    assert units == [("1 Bn", "1 Bn", 1), ("A Coy", None, 1), ("A Coy", None, 3)]
+
+    assert _columns(engine, "productconops")["content"]["nullable"]
+    assert {"plan_revision", "content_id"} <= set(_columns(engine, "productconops"))
+    assert {"parent_id", "personnel", "vehicles", "uic"} <= set(_columns(engine, "unitreal"))
+    indexes = {index["name"] for index in inspect(engine).get_indexes("auditlog")}
+    assert {"ix_auditlog_created", "ix_auditlog_plan_created"} <= indexes
+    assert upgrade(engine) == []
+
+
+def test_empty_database_is_created_at_startup(engine):
+    ensure_schema(engine, auto_migrate=False)
+    with engine.connect() as conn:
+        assert current_version(conn) == HEAD
+
+
+def test_out_of_date_database_needs_an_upgrade(engine):
+    upgrade(engine, target=HEAD - 1)
+    with pytest.raises(RuntimeError, match="AUTO_MIGRATE"):
+        ensure_schema(engine, auto_migrate=False)
+    ensure_schema(engine, auto_migrate=True)
+    with engine.connect() as conn:
+        assert current_version(conn) == HEAD
@@ -0,0 +1,167 @@
+"""Tests for the decision point trigger language and evaluator.
+
+Run with ``python -m pytest -q test_triggers.py``; no server or database
+is needed.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from server.domain import schemas
+from server.domain.geo import RTree, parse_geojson
+from server.domain.services.trigger_service import CompiledPlan, CompiledTrigger, TriggerEvaluator
+from server.domain.triggers import AreaRef, TriggerSpec, normalize_unit, parse_trigger
+
+SQUARE = '{"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]]}'
+T0 = datetime(2026, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+# Parser -------------------------------------------------------------
+def test_enter_area_by_quoted_name():
+    assert parse_trigger("ENTER AREA 'OBJ FALCON'") == TriggerSpec("enter", AreaRef(name="OBJ FALCON"))
+
+
+def test_keywords_are_case_insensitive():
+    assert parse_trigger("enter area 12") == TriggerSpec("enter", AreaRef(area_id=12))
+
+
+def test_exit_location_by_units():
+    spec = parse_trigger("EXIT LOCATION BY '1 MECH BDE', 2-12 INF")
+    assert spec.condition == "exit"
+    assert spec.target == "location"
+    assert spec.units == frozenset({"1 mech bde", "2-12 inf"})
+
+
+def test_within_metres_is_converted_to_km():
+    spec = parse_trigger("WITHIN 800 m OF 24.93, 60.17")
+    assert spec.condition == "within"
+    assert spec.distance_km == pytest.approx(0.8)
+    assert spec.target == (24.93, 60.17)
+
+
+def test_within_km_of_area():
+    assert parse_trigger("WITHIN 5km OF AREA 12") == TriggerSpec("within", AreaRef(area_id=12), 5.0)
+
+
+def test_geojson_means_enter():
+    assert parse_trigger(SQUARE) == TriggerSpec("enter", SQUARE)
+
+
+def test_empty_expression_uses_location_area():
+    assert parse_trigger(None) is None
+    assert parse_trigger("  ", has_location=True) == TriggerSpec("enter", "location")
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "ARRIVE AREA 1",
+        "ENTER",
+        "ENTER AREA",
+        "WITHIN 5 miles OF LOCATION",
+        "WITHIN 5 km LOCATION",
+        "WITHIN 1 km OF 200, 10",
+        "ENTER LOCATION BY",
+        "ENTER LOCATION NOW",
+        "ENTER AREA 'unterminated",
+    ],
+)
+def test_malformed_expressions_raise(expression):
+    with pytest.raises(ValueError):
+        parse_trigger(expression)
+
+
+def test_normalize_unit():
+    assert normalize_unit("  1  Mech\tBDE ") == "1 mech bde"
+
+
+# Evaluator ----------------------------------------------------------
+def _trigger(dp_id, condition, shape, distance_km=0.0, units=None):
+    return CompiledTrigger(
+        decision_point_id=dp_id,
+        name=f"DP {dp_id}",
+        condition=condition,
+        shape=shape,
+        distance_km=distance_km,
+        units=units,
+        bbox=shape.buffered_bbox(distance_km) if distance_km else shape.bbox,
+    )
+
+
+def _evaluator(*triggers):
+    evaluator = TriggerEvaluator(plan_id=1)
+    evaluator.load(
+        CompiledPlan(
+            revision=1,
+            triggers={trigger.decision_point_id: trigger for trigger in triggers},
+            expressions={trigger.decision_point_id: (trigger.name, None) for trigger in triggers},
+            errors={},
+            tree=RTree((trigger.bbox, trigger) for trigger in triggers),
+        )
+    )
+    return evaluator
+
+
+def _report(lon, lat, time=None, unit="A COY"):
+    return schemas.PositionReport(unit=unit, lon=lon, lat=lat, time=time)
+
+
+def _fired(result):
+    return [(event.decision_point_id, event.condition) for event in result.events]
+
+
+def test_enter_fires_once_on_the_transition():
+    evaluator = _evaluator(_trigger(1, "enter", parse_geojson(SQUARE)))
+    assert _fired(evaluator.evaluate([_report(2, 2, T0)])) == []
+    assert _fired(evaluator.evaluate([_report(0.5, 0.5, T0 + timedelta(minutes=1))])) == [(1, "enter")]
+    assert _fired(evaluator.evaluate([_report(0.6, 0.6, T0 + timedelta(minutes=2))])) == []
+    assert _fired(evaluator.evaluate([_report(2, 2, T0 + timedelta(minutes=3))])) == []
+    assert _fired(evaluator.evaluate([_report(0.5, 0.5, T0 + timedelta(minutes=4))])) == [(1, "enter")]
+
+
+def test_exit_fires_on_leaving():
+    evaluator = _evaluator(_trigger(1, "exit", parse_geojson(SQUARE)))
+    assert _fired(evaluator.evaluate([_report(0.5, 0.5, T0)])) == []
+    assert _fired(evaluator.evaluate([_report(2, 2, T0 + timedelta(minutes=1))])) == [(1, "exit")]
+
+
+def test_within_uses_the_distance():
+    point = parse_geojson('{"type": "Point", "coordinates": [24.93, 60.17]}')
+    evaluator = _evaluator(_trigger(1, "within", point, distance_km=1.0))
+    # About 1.1 km north, then about 0.55 km north
+    assert _fired(evaluator.evaluate([_report(24.93, 60.18, T0)])) == []
+    assert _fired(evaluator.evaluate([_report(24.93, 60.175, T0 + timedelta(minutes=1))])) == [(1, "within")]
+
+
+def test_units_limit_the_trigger():
+    evaluator = _evaluator(_trigger(1, "enter", parse_geojson(SQUARE), units=frozenset({"1 mech bde"})))
+    assert _fired(evaluator.evaluate([_report(0.5, 0.5, T0, unit="A COY")])) == []
+    assert _fired(evaluator.evaluate([_report(0.5, 0.5, T0, unit="1 Mech  BDE")])) == [(1, "enter")]
+
+
+def test_batch_is_evaluated_in_time_order():
+    evaluator = _evaluator(_trigger(1, "enter", parse_geojson(SQUARE)))
+    result = evaluator.evaluate([_report(0.5, 0.5, T0 + timedelta(minutes=1)), _report(2, 2, T0)])
+    assert result.skipped == 0
+    assert _fired(result) == [(1, "enter")]
+    assert evaluator.status()[0].units_inside == ["a coy"]
+
+
+def test_reports_older_than_the_last_are_skipped():
+    evaluator = _evaluator(_trigger(1, "enter", parse_geojson(SQUARE)))
+    evaluator.evaluate([_report(2, 2, T0)])
+    result = evaluator.evaluate([_report(0.5, 0.5, T0 - timedelta(minutes=1))])
+    assert (result.processed, result.skipped) == (0, 1)
+    assert _fired(result) == []
+
+
+def test_naive_and_aware_times_compare_as_utc():
+    evaluator = _evaluator(_trigger(1, "exit", parse_geojson(SQUARE)))
+    # 12:00 UTC, sent with a +02:00 offset
+    evaluator.evaluate([_report(0.5, 0.5, datetime(2026, 5, 1, 14, 0, tzinfo=timezone(timedelta(hours=2))))])
+    # Naive times are UTC: 11:59 is older and skipped, 12:01 is newer
+    result = evaluator.evaluate([_report(2, 2, datetime(2026, 5, 1, 11, 59))])
+    assert (result.processed, result.skipped) == (0, 1)
+    result = evaluator.evaluate([_report(2, 2, datetime(2026, 5, 1, 12, 1))])
+    assert _fired(result) == [(1, "exit")]
+    assert result.events[0].time == datetime(2026, 5, 1, 12, 1, tzinfo=timezone.utc)